@@ -0,0 +1,107 @@
+"""
+Benchmark and regression check: NaN-safe JSON encoding
+
+Compares data.json_encoding.dumps_records against the previous path
+(to_dict('records'), clean_nan_for_json, json.dumps per record) on
+feature- and prediction-shaped DataFrames with NaN and inf values,
+asserting that both decode to the same documents.
+
+Usage:
+    python benchmarks/bench_json_encoding.py [rows ...]
+
+Defaults to 100k rows.
+"""
+import sys
+import os
+import time
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.feature_store import clean_nan_for_json
+from data.json_encoding import dumps_records
+
+logging.basicConfig(level=logging.WARNING)
+
+DEFAULT_ROW_COUNTS = [100_000]
+
+
+def legacy_dumps_records(df: pd.DataFrame):
+    """Previous per-record encoding, kept as the reference"""
+    return [json.dumps(clean_nan_for_json(record)) for record in df.to_dict('records')]
+
+
+def make_price_features(num_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Rows shaped like compute_price_features output"""
+    rng = np.random.default_rng(seed)
+    mean_price = rng.gamma(2.0, 50.0, num_rows)
+    std_price = rng.gamma(1.0, 5.0, num_rows)
+
+    return pd.DataFrame({
+        'pricebook_item_id': np.arange(num_rows),
+        'mean_price': mean_price,
+        'std_price': std_price,
+        'min_price': mean_price - std_price,
+        'max_price': mean_price + std_price,
+        'price_range': 2 * std_price,
+        'coefficient_variation': std_price / mean_price,
+        'purchase_count': rng.integers(1, 100, num_rows),
+        'total_quantity': rng.integers(1, 500, num_rows).astype(float),
+        'days_since_first_purchase': rng.integers(0, 700, num_rows),
+        'days_since_last_purchase': rng.integers(0, 365, num_rows),
+    })
+
+
+def make_predictions(num_rows: int, seed: int = 7) -> pd.DataFrame:
+    """Rows shaped like ProfitPredictor.predict output, with NaN/inf"""
+    rng = np.random.default_rng(seed)
+    predicted = rng.normal(10.0, 5.0, num_rows)
+    predicted[rng.random(num_rows) < 0.05] = np.nan
+    actual = rng.normal(10.0, 5.0, num_rows)
+    actual[rng.random(num_rows) < 0.01] = np.inf
+
+    return pd.DataFrame({
+        'predicted_profit_percentage': predicted,
+        'actual_profit_percentage': actual,
+        'is_at_risk': predicted < 5.0,
+        'stage': rng.choice(['design', 'build', 'handover'], num_rows),
+    })
+
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(name: str, df: pd.DataFrame):
+    legacy, legacy_seconds = time_call(legacy_dumps_records, df)
+    encoded, encoded_seconds = time_call(dumps_records, df)
+
+    assert [json.loads(document) for document in legacy] == \
+        [json.loads(document) for document in encoded]
+    assert not any('NaN' in document or 'Infinity' in document for document in encoded)
+
+    print(f"{name:<18} {len(df):>9,} rows | legacy {legacy_seconds:6.2f}s | "
+          f"encoder {encoded_seconds:6.3f}s | speedup {legacy_seconds / encoded_seconds:5.1f}x")
+
+
+def main():
+    row_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS
+
+    print("=" * 80)
+    print("JSON encoding: clean_nan_for_json + json.dumps vs dumps_records")
+    print("=" * 80)
+
+    for num_rows in row_counts:
+        run('price features', make_price_features(num_rows))
+        run('predictions', make_predictions(num_rows))
+
+    print("\nOutputs identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark and regression check: per-line-item price scoring
+
+Checks PriceAnomalyDetector.score_line_items against a direct
+leave-one-out computation on a small sample, then times it on millions
+of synthetic line items.
+
+Usage:
+    python benchmarks/bench_line_item_scoring.py [rows ...]
+
+Defaults to 1M and 5M line items.
+"""
+import sys
+import os
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.price_anomaly import PriceAnomalyDetector, price_check, MIN_OTHER_PRICES_FOR_LINE_ITEM_CHECK
+
+logging.basicConfig(level=logging.WARNING)
+
+DEFAULT_ROW_COUNTS = [1_000_000, 5_000_000]
+LINE_ITEMS_PER_ITEM = 10
+
+
+def make_line_items(num_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic line items with a few outliers, missing prices and items"""
+    rng = np.random.default_rng(seed)
+    num_items = max(num_rows // LINE_ITEMS_PER_ITEM, 1)
+
+    item_ids = rng.integers(0, num_items, num_rows).astype(float)
+    base_price = rng.gamma(2.0, 50.0, num_items)
+    prices = base_price[item_ids.astype(int)] * rng.normal(1.0, 0.05, num_rows)
+    prices[rng.random(num_rows) < 0.001] *= 10
+
+    df = pd.DataFrame({
+        'id': np.arange(1, num_rows + 1),
+        'pricebook_item_id': item_ids,
+        'unit_price': prices.round(2),
+    })
+    df.loc[rng.random(num_rows) < 0.01, 'pricebook_item_id'] = np.nan
+    df.loc[rng.random(num_rows) < 0.02, 'unit_price'] = np.nan
+    return df
+
+
+def reference_scores(df: pd.DataFrame) -> pd.DataFrame:
+    """Direct leave-one-out check per line item (quadratic, small inputs only)"""
+    rows = []
+    for _, line_item in df.iterrows():
+        others = df[(df['pricebook_item_id'] == line_item['pricebook_item_id'])
+                    & (df['id'] != line_item['id'])]['unit_price'].dropna()
+        check = price_check(line_item['unit_price'], others.mean() if len(others) else np.nan,
+                            others.std(), len(others))
+        if len(others) < MIN_OTHER_PRICES_FOR_LINE_ITEM_CHECK:
+            check.update(is_anomaly=False, z_score=np.nan)
+        rows.append(check)
+    return pd.DataFrame(rows, index=df.index)
+
+
+def check_against_reference():
+    sample = make_line_items(2_000, seed=1)
+    sample = sample[sample['pricebook_item_id'].notna() & sample['unit_price'].notna()]
+
+    scores = PriceAnomalyDetector().score_line_items(sample)
+    expected = reference_scores(sample)
+
+    for column in ['z_score', 'mean_price', 'std_price', 'price_deviation']:
+        np.testing.assert_allclose(scores[column], expected[column], rtol=1e-9, atol=1e-9)
+    assert (scores['is_anomaly'] == expected['is_anomaly']).all()
+    assert (scores['num_historical_prices'] == expected['num_historical_prices']).all()
+
+
+def run(num_rows: int):
+    line_items = make_line_items(num_rows)
+
+    start = time.perf_counter()
+    scores = PriceAnomalyDetector().score_line_items(line_items)
+    seconds = time.perf_counter() - start
+
+    print(f"{num_rows:>10,} line items | {seconds:6.2f}s | "
+          f"{num_rows / seconds / 1e6:5.2f}M rows/s | {int(scores['is_anomaly'].sum()):,} flagged")
+
+
+def main():
+    row_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS
+
+    check_against_reference()
+
+    print("=" * 70)
+    print("score_line_items (leave-one-out z-scores per line item)")
+    print("=" * 70)
+
+    for num_rows in row_counts:
+        run(num_rows)
+
+    print("\nMatches reference on sample")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: detect_single_price latency with an in-memory PriceStatsIndex
+
+Loads synthetic per-item price statistics into a PriceStatsIndex, runs
+detect_single_price for random items and prices, and reports p50/p99
+latency. Results are checked against price_check on the source frame.
+No database access is needed (or made) for indexed items.
+
+Usage:
+    python benchmarks/bench_price_stats_index.py [items ...]
+
+Defaults to 100k and 1M pricebook items, 100k checks each.
+"""
+import sys
+import os
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.price_stats_index import PriceStatsIndex
+from models.price_anomaly import PriceAnomalyDetector, price_check
+
+logging.basicConfig(level=logging.WARNING)
+
+DEFAULT_ITEM_COUNTS = [100_000, 1_000_000]
+NUM_CHECKS = 100_000
+
+
+def make_price_stats(num_items: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic FeatureStore.get_price_stats() output with sparse item ids"""
+    rng = np.random.default_rng(seed)
+    price_count = rng.integers(1, 200, num_items)
+    std_price = rng.gamma(1.0, 5.0, num_items)
+    std_price[price_count == 1] = np.nan
+
+    return pd.DataFrame({
+        'pricebook_item_id': rng.permutation(num_items * 3)[:num_items],
+        'purchase_count': price_count,
+        'price_count': price_count,
+        'mean_price': rng.gamma(2.0, 50.0, num_items),
+        'std_price': std_price,
+    })
+
+
+def run(num_items: int):
+    stats_df = make_price_stats(num_items)
+
+    index = PriceStatsIndex()
+    start = time.perf_counter()
+    index.load_frame(stats_df)
+    load_seconds = time.perf_counter() - start
+
+    detector = PriceAnomalyDetector(stats_index=index)
+
+    rng = np.random.default_rng(7)
+    rows = rng.integers(0, num_items, NUM_CHECKS)
+    item_ids = stats_df['pricebook_item_id'].to_numpy()[rows].tolist()
+    prices = rng.gamma(2.0, 50.0, NUM_CHECKS).tolist()
+
+    latencies = np.empty(NUM_CHECKS)
+    results = []
+    for i, (item_id, price) in enumerate(zip(item_ids, prices)):
+        start = time.perf_counter_ns()
+        results.append(detector.detect_single_price(item_id, price))
+        latencies[i] = time.perf_counter_ns() - start
+
+    # Spot-check against the source statistics (NaN std for single prices)
+    for i in range(0, NUM_CHECKS, NUM_CHECKS // 100):
+        row = stats_df.iloc[rows[i]]
+        expected = price_check(prices[i], row['mean_price'], row['std_price'], int(row['price_count']))
+        assert pd.Series(results[i]).equals(pd.Series(expected))
+
+    p50, p99 = np.percentile(latencies / 1000, [50, 99])
+    print(f"{num_items:>10,} items | load {load_seconds:5.2f}s | "
+          f"{index.nbytes / 1e6:6.1f} MB | "
+          f"p50 {p50:6.1f}us | p99 {p99:6.1f}us | max {latencies.max() / 1000:8.1f}us")
+
+
+def main():
+    item_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ITEM_COUNTS
+
+    print("=" * 80)
+    print(f"detect_single_price with PriceStatsIndex ({NUM_CHECKS:,} checks)")
+    print("=" * 80)
+
+    for num_items in item_counts:
+        run(num_items)
+
+
+if __name__ == '__main__':
+    main()
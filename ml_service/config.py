@@ -18,16 +18,37 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith('postgres://'):
     DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
 
+# Connection Pool (shared by extractors and the feature store)
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))  # Max connections checked out at once
+DB_POOL_TIMEOUT = 30  # Seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_SECONDS = 30  # Ping connections idle for longer than this before reuse
+
 # Redis Configuration (for Celery task queue)
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
 # Model Storage
 MODELS_DIR = os.path.join(os.path.dirname(__file__), 'trained_models')
 os.makedirs(MODELS_DIR, exist_ok=True)
+MODEL_REGISTRY_PATH = os.path.join(MODELS_DIR, 'registry.json')  # Manifest of published models
+MODEL_REGISTRY_HISTORY = 20  # Published versions kept in the manifest per model
+MODEL_RELOAD_CHECK_SECONDS = 30  # How often loaded models check the registry for a newer one
 
 # Feature Store Configuration
 FEATURES_TABLE = 'ml_features'
 PREDICTIONS_TABLE = 'ml_predictions'
+PRICE_STATS_TABLE = 'ml_price_stats'  # Running per-item price statistics (Welford)
+PRICE_STATS_REFRESH_SECONDS = 300  # In-memory price stats index refresh interval
+FEATURE_STORAGE_MODE = os.getenv('FEATURE_STORAGE_MODE', 'jsonb')  # 'jsonb' (one ml_features table) or 'columnar' (typed table per feature type)
+PARTITION_PREDICTIONS = os.getenv('PARTITION_PREDICTIONS', 'false').lower() == 'true'  # Monthly range partitions on predicted_at
+PREDICTION_PARTITION_MONTHS_AHEAD = 3  # Monthly partitions created ahead of time
+PREDICTION_RETENTION_DAYS = int(os.getenv('PREDICTION_RETENTION_DAYS', '365'))  # Older predictions are pruned
+FEATURE_WRITE_BATCH_SIZE = 1000  # Rows per INSERT statement for bulk feature writes
+FEATURE_READ_CHUNK_SIZE = 10000  # Entities per query/chunk for bulk feature reads
+PREDICTION_BUFFER_ROWS = 5000  # Buffered prediction writer: flush after this many rows
+PREDICTION_BUFFER_SECONDS = 30  # ...or once the oldest buffered row is this old
+PREDICTION_BUFFER_MAX_RETAINED_ROWS = 100000  # Rows kept for retry after failed writes; the oldest beyond this are dropped
+INCREMENTAL_FEATURES = os.getenv('INCREMENTAL_FEATURES', 'false').lower() == 'true'  # Only recompute features for changed entities
+FEATURE_FULL_REFRESH_DAYS = 28  # Recompute all features once the oldest stored features are this old
 
 # Training Configuration
 ISOLATION_FOREST_PARAMS = {
@@ -35,10 +56,33 @@ ISOLATION_FOREST_PARAMS = {
     'random_state': 42,
     'n_estimators': 100
 }
+ANOMALY_SCORE_QUANTILES = 101  # Training score quantiles saved with the model to calibrate confidence
+MIN_OTHER_PRICES_FOR_LINE_ITEM_CHECK = 3  # score_line_items: other purchases of an item needed before flagging a line item
 
 # Data Extraction Settings
 LOOKBACK_DAYS = 365  # How far back to look for historical data
 MIN_SAMPLES_FOR_TRAINING = 50  # Minimum records needed to train
+EXTRACTION_CHUNK_SIZE = int(os.getenv('EXTRACTION_CHUNK_SIZE', '50000'))  # Rows per streamed chunk
+EXTRACTION_MAX_WORKERS = int(os.getenv('EXTRACTION_MAX_WORKERS', '3'))  # Concurrent queries in extract_all_data
+USE_COPY_EXTRACTION = os.getenv('USE_COPY_EXTRACTION', 'false').lower() == 'true'  # COPY ... TO STDOUT for bulk reads
+
+# Batch Scoring
+SCORING_WORKERS = int(os.getenv('SCORING_WORKERS', '1'))  # Scoring processes (1 = score in-process)
+SCORING_SLICES_PER_WORKER = 4  # Row slices per worker, to even out load across the pool
+
+# Scoring Server
+SCORING_SERVER_HOST = os.getenv('SCORING_SERVER_HOST', '127.0.0.1')
+SCORING_SERVER_PORT = int(os.getenv('SCORING_SERVER_PORT', '8500'))
+SCORING_BATCH_MAX_ROWS = 5000  # Rows scored together in one micro-batch
+SCORING_BATCH_MAX_WAIT_MS = 5  # How long a micro-batch waits for more requests
+SCORING_REQUEST_TIMEOUT_SECONDS = 30  # Give up on a queued request after this long
+SCORING_LATENCY_WINDOW = 10000  # Recent requests kept per endpoint for latency percentiles
+
+# Incremental Extraction (local snapshot cache)
+INCREMENTAL_EXTRACTION = os.getenv('INCREMENTAL_EXTRACTION', 'false').lower() == 'true'  # Opt-in: read from the Parquet snapshots
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), 'snapshots')
+SNAPSHOT_FULL_REFRESH_DAYS = 28  # Rebuild snapshots from scratch to drop deleted rows
+SNAPSHOT_OVERLAP_MINUTES = 10  # Re-read this much before the watermark to catch late commits
 
 # Logging
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -0,0 +1,154 @@
+"""
+Process-wide PostgreSQL connection pool
+
+DatabaseExtractor and FeatureStore check connections out of a shared pool
+instead of opening one per instance, so the TCP/TLS/auth handshake is paid
+once per connection rather than once per call.
+"""
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+DB_POOL_MAX_SIZE = config.DB_POOL_MAX_SIZE
+DB_POOL_TIMEOUT = config.DB_POOL_TIMEOUT
+DB_POOL_HEALTHCHECK_SECONDS = config.DB_POOL_HEALTHCHECK_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections
+
+    - At most max_size connections are checked out at once; getconn blocks
+      up to timeout seconds for one to be returned.
+    - Connections idle for longer than DB_POOL_HEALTHCHECK_SECONDS are
+      pinged before reuse; broken ones are discarded and replaced.
+    - Returned connections are rolled back so each checkout starts clean.
+    """
+
+    def __init__(self, database_url: str, max_size: int = DB_POOL_MAX_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT):
+        self.database_url = database_url
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = deque()  # (connection, last_used) pairs, most recent last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        """Check a pooled connection before handing it out"""
+        if conn.closed:
+            return False
+        if conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - last_used < DB_POOL_HEALTHCHECK_SECONDS:
+            return True
+
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        logger.warning("Discarding broken database connection")
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """Check out a healthy connection, reconnecting if needed"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError(
+                f"No database connection available within {self.timeout}s "
+                f"(pool size {self.max_size})"
+            )
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, last_used = self._idle.pop()
+
+                if self._is_healthy(conn, last_used):
+                    return conn
+                self._discard(conn)
+
+            conn = psycopg2.connect(self.database_url)
+            logger.info("Database connection established")
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        """Return a connection to the pool"""
+        try:
+            if conn.closed:
+                return
+            # Ends any open (or failed) transaction left by the caller
+            conn.rollback()
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        except psycopg2.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        """Close all idle connections"""
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                if not conn.closed:
+                    conn.close()
+        logger.info("Database connection pool closed")
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(database_url: str) -> ConnectionPool:
+    """
+    Get the process-wide pool for a database URL
+
+    Pools are not shared across fork(): a child process starts with fresh
+    pools and never touches connections inherited from its parent.
+    """
+    global _pools_pid
+
+    with _pools_lock:
+        if os.getpid() != _pools_pid:
+            _pools.clear()
+            _pools_pid = os.getpid()
+
+        pool = _pools.get(database_url)
+        if pool is None:
+            pool = ConnectionPool(database_url)
+            _pools[database_url] = pool
+        return pool
+
+
+def close_all_pools():
+    """Close every pool in this process (e.g. on shutdown)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
@@ -3,9 +3,16 @@ Data extraction from Rails PostgreSQL database
 """
 import psycopg2
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 from datetime import datetime, timedelta
 import logging
-from typing import Optional, Dict, List
+import io
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Dict, List, Iterator, Union, Callable
 
 import sys
 import os
@@ -13,29 +20,102 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
 DATABASE_URL = config.DATABASE_URL
 LOOKBACK_DAYS = config.LOOKBACK_DAYS
+EXTRACTION_CHUNK_SIZE = config.EXTRACTION_CHUNK_SIZE
+EXTRACTION_MAX_WORKERS = config.EXTRACTION_MAX_WORKERS
+USE_COPY_EXTRACTION = config.USE_COPY_EXTRACTION
+INCREMENTAL_EXTRACTION = config.INCREMENTAL_EXTRACTION
+SNAPSHOT_OVERLAP_MINUTES = config.SNAPSHOT_OVERLAP_MINUTES
+from data.snapshots import SnapshotCache, merge_snapshot
+from data.connection_pool import get_pool
 
 logger = logging.getLogger(__name__)
 
+# PostgreSQL type OIDs -> Arrow types used when parsing COPY output.
+# Chosen so the resulting DataFrame has the same dtypes pd.read_sql_query
+# produces (NUMERIC is coerced to float, as read_sql_query does).
+COPY_COLUMN_TYPES = {
+    16: pa.bool_(),            # boolean
+    20: pa.int64(),            # bigint
+    21: pa.int64(),            # smallint
+    23: pa.int64(),            # integer
+    700: pa.float64(),         # real
+    701: pa.float64(),         # double precision
+    1700: pa.float64(),        # numeric
+    1082: pa.date32(),         # date
+    1114: pa.timestamp('us'),  # timestamp without time zone
+}
+
+
+def _frame_from_copy(buf: io.BytesIO, description) -> pd.DataFrame:
+    """
+    Parse COPY ... (FORMAT csv) output into a DataFrame
+
+    Args:
+        buf: Buffer holding the CSV output (no header)
+        description: cursor.description of the same query
+    """
+    column_names = [col.name for col in description]
+
+    if buf.getbuffer().nbytes == 0:
+        # Same as read_sql_query on an empty result: object columns
+        return pd.DataFrame(columns=column_names)
+
+    column_types = {
+        col.name: COPY_COLUMN_TYPES.get(col.type_code, pa.string())
+        for col in description
+    }
+
+    table = pa_csv.read_csv(
+        buf,
+        read_options=pa_csv.ReadOptions(column_names=column_names),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            null_values=[''],
+            strings_can_be_null=True,
+            # COPY writes NULL unquoted and empty strings as ""
+            quoted_strings_can_be_null=False,
+            true_values=['t'],
+            false_values=['f'],
+        ),
+    )
+    # Arrow keeps timestamps in microseconds; read_sql_query gives datetime64[ns]
+    df = table.to_pandas(coerce_temporal_nanoseconds=True)
+
+    for col in description:
+        if df[col.name].isna().all():
+            # read_sql_query leaves all-NULL columns as object/None
+            df[col.name] = pd.Series([None] * len(df), dtype=object)
+        elif col.type_code == 1184:
+            # timestamp with time zone: let pandas parse the UTC offset
+            df[col.name] = pd.to_datetime(df[col.name], utc=True)
+
+    return df
+
 
 class DatabaseExtractor:
     """Extract data from Rails database for ML processing"""
 
-    def __init__(self, database_url: str = DATABASE_URL):
+    def __init__(self, database_url: str = DATABASE_URL,
+                 use_copy: bool = USE_COPY_EXTRACTION):
         self.database_url = database_url
+        self.use_copy = use_copy
         self.conn = None
 
     def connect(self):
-        """Establish database connection"""
-        if not self.conn or self.conn.closed:
-            self.conn = psycopg2.connect(self.database_url)
-            logger.info("Database connection established")
+        """Check out a connection from the shared pool"""
+        if self.conn is not None and self.conn.closed:
+            # Connection was lost; hand it back so the pool replaces it
+            self.close()
+        if self.conn is None:
+            self.conn = get_pool(self.database_url).getconn()
         return self.conn
 
     def close(self):
-        """Close database connection"""
-        if self.conn and not self.conn.closed:
-            self.conn.close()
-            logger.info("Database connection closed")
+        """Return the connection to the shared pool"""
+        if self.conn is not None:
+            get_pool(self.database_url).putconn(self.conn)
+            self.conn = None
 
     def __enter__(self):
         self.connect()
@@ -44,8 +124,82 @@ class DatabaseExtractor:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-    def extract_purchase_order_line_items(self,
-                                          days_back: int = LOOKBACK_DAYS) -> pd.DataFrame:
+    def stream_query(self, query: str, params=None,
+                     chunk_size: int = EXTRACTION_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Stream query results in DataFrame chunks
+
+        Uses a named (server-side) cursor so the result set stays in
+        PostgreSQL and only chunk_size rows are held in memory at a time.
+        Chunks have the same columns and value coercion as pd.read_sql_query.
+        The iterator must be consumed while the connection is open.
+        """
+        conn = self.connect()
+        cur = conn.cursor(name=f"ml_stream_{uuid.uuid4().hex}")
+        cur.itersize = chunk_size
+
+        try:
+            cur.execute(query, params)
+            num_rows = 0
+
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+
+                columns = [col[0] for col in cur.description]
+                num_rows += len(rows)
+                yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+            logger.info(f"Streamed {num_rows} rows")
+        finally:
+            cur.close()
+            # Named cursors live inside a transaction; end it so the
+            # connection is not left idle in transaction
+            if not conn.closed:
+                conn.rollback()
+
+    def read_copy(self, query: str, params=None) -> pd.DataFrame:
+        """
+        Run a query through COPY (...) TO STDOUT and parse it with Arrow
+
+        Avoids building a Python object per value: PostgreSQL streams CSV
+        into an in-memory buffer which is parsed by a vectorized reader.
+        Column names and dtypes match pd.read_sql_query.
+        """
+        conn = self.connect()
+        cur = conn.cursor()
+        buf = io.BytesIO()
+
+        try:
+            # COPY does not accept bind parameters, so inline them safely
+            sql = cur.mogrify(query, params).decode()
+
+            # Fetch column names/types without reading any rows
+            cur.execute(f"SELECT * FROM ({sql}) AS copy_query LIMIT 0")
+            description = cur.description
+
+            cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", buf)
+        finally:
+            cur.close()
+
+        buf.seek(0)
+        return _frame_from_copy(buf, description)
+
+    def _read(self, query: str, params=None, bulk: bool = False) -> pd.DataFrame:
+        """
+        Run an extraction query into a single DataFrame
+
+        Bulk queries go through COPY when use_copy is enabled.
+        """
+        if bulk and self.use_copy:
+            return self.read_copy(query, params)
+        return pd.read_sql_query(query, self.connect(), params=params)
+
+    def extract_purchase_order_line_items(self, days_back: int = LOOKBACK_DAYS,
+                                          chunk_size: Optional[int] = None,
+                                          updated_since: Optional[datetime] = None
+                                          ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         Extract purchase order line items for price analysis
 
@@ -53,8 +207,21 @@ class DatabaseExtractor:
         - id, purchase_order_id, pricebook_item_id
         - description, quantity, unit_price, total_amount
         - supplier_id (from PO), created_at
+
+        If chunk_size is given, returns an iterator of DataFrame chunks
+        streamed from a server-side cursor instead.
+        If updated_since is given, only rows updated after it are returned,
+        counting edits to the joined purchase order, supplier and pricebook
+        item as updates of the line item (their columns are in the row).
         """
-        query = """
+        params = [days_back]
+        updated_clause = ""
+        if updated_since is not None:
+            updated_clause = """AND (poli.updated_at > %s OR po.updated_at > %s
+                 OR s.updated_at > %s OR pb.updated_at > %s)"""
+            params.extend([updated_since] * 4)
+
+        query = f"""
         SELECT
             poli.id,
             poli.purchase_order_id,
@@ -75,21 +242,29 @@ class DatabaseExtractor:
         LEFT JOIN suppliers s ON po.supplier_id = s.id
         LEFT JOIN pricebook_items pb ON poli.pricebook_item_id = pb.id
         WHERE poli.created_at >= NOW() - INTERVAL '%s days'
+        {updated_clause}
         ORDER BY poli.created_at DESC
         """
 
         logger.info(f"Extracting PO line items from last {days_back} days")
-        df = pd.read_sql_query(query, self.connect(), params=(days_back,))
+        if chunk_size:
+            return self.stream_query(query, params, chunk_size)
+
+        df = self._read(query, params, bulk=True)
         logger.info(f"Extracted {len(df)} purchase order line items")
         return df
 
-    def extract_constructions(self, days_back: int = LOOKBACK_DAYS) -> pd.DataFrame:
+    def extract_constructions(self, days_back: int = LOOKBACK_DAYS,
+                              chunk_size: Optional[int] = None
+                              ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         Extract construction/job data for profitability prediction
 
         Returns DataFrame with:
         - id, title, contract_value, live_profit, profit_percentage
         - stage, status, start_date, created_at
+
+        If chunk_size is given, returns an iterator of DataFrame chunks.
         """
         query = """
         SELECT
@@ -112,17 +287,23 @@ class DatabaseExtractor:
         """
 
         logger.info(f"Extracting constructions from last {days_back} days")
-        df = pd.read_sql_query(query, self.connect(), params=(days_back,))
+        if chunk_size:
+            return self.stream_query(query, (days_back,), chunk_size)
+
+        df = self._read(query, (days_back,))
         logger.info(f"Extracted {len(df)} constructions")
         return df
 
-    def extract_suppliers(self) -> pd.DataFrame:
+    def extract_suppliers(self, chunk_size: Optional[int] = None
+                          ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         Extract supplier data for performance tracking
 
         Returns DataFrame with:
         - id, name, rating, response_rate, avg_response_time
         - is_active, created_at
+
+        If chunk_size is given, returns an iterator of DataFrame chunks.
         """
         query = """
         SELECT
@@ -143,17 +324,23 @@ class DatabaseExtractor:
         """
 
         logger.info("Extracting suppliers")
-        df = pd.read_sql_query(query, self.connect())
+        if chunk_size:
+            return self.stream_query(query, None, chunk_size)
+
+        df = self._read(query)
         logger.info(f"Extracted {len(df)} suppliers")
         return df
 
-    def extract_pricebook_items(self) -> pd.DataFrame:
+    def extract_pricebook_items(self, chunk_size: Optional[int] = None
+                                ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         Extract pricebook items for price trend analysis
 
         Returns DataFrame with:
         - id, item_code, item_name, category, current_price
         - supplier_id, is_active, price_last_updated_at
+
+        If chunk_size is given, returns an iterator of DataFrame chunks.
         """
         query = """
         SELECT
@@ -172,19 +359,39 @@ class DatabaseExtractor:
         """
 
         logger.info("Extracting pricebook items")
-        df = pd.read_sql_query(query, self.connect())
+        if chunk_size:
+            return self.stream_query(query, None, chunk_size)
+
+        df = self._read(query)
         logger.info(f"Extracted {len(df)} pricebook items")
         return df
 
-    def extract_price_history(self, days_back: int = LOOKBACK_DAYS) -> pd.DataFrame:
+    def extract_price_history(self, days_back: int = LOOKBACK_DAYS,
+                              chunk_size: Optional[int] = None,
+                              updated_since: Optional[datetime] = None,
+                              by_supplier: bool = False
+                              ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         Extract price history for trend analysis
 
         Returns DataFrame with:
         - pricebook_item_id, old_price, new_price
         - supplier_id, created_at, change_reason
+
+        If chunk_size is given, returns an iterator of DataFrame chunks.
+        If updated_since is given, only rows updated after it are returned,
+        counting edits to the joined pricebook item as updates of the row.
+        With by_supplier, rows are ordered by supplier_id (then created_at)
+        instead of newest first, so chunks can be split on supplier.
         """
-        query = """
+        params = [days_back]
+        updated_clause = ""
+        if updated_since is not None:
+            updated_clause = "AND (ph.updated_at > %s OR pb.updated_at > %s)"
+            params.extend([updated_since] * 2)
+        order_by = "ph.supplier_id, ph.created_at" if by_supplier else "ph.created_at DESC"
+
+        query = f"""
         SELECT
             ph.id,
             ph.pricebook_item_id,
@@ -200,14 +407,238 @@ class DatabaseExtractor:
         FROM price_histories ph
         INNER JOIN pricebook_items pb ON ph.pricebook_item_id = pb.id
         WHERE ph.created_at >= NOW() - INTERVAL '%s days'
-        ORDER BY ph.created_at DESC
+        {updated_clause}
+        ORDER BY {order_by}
         """
 
         logger.info(f"Extracting price history from last {days_back} days")
-        df = pd.read_sql_query(query, self.connect(), params=(days_back,))
+        if chunk_size:
+            return self.stream_query(query, params, chunk_size)
+
+        df = self._read(query, params, bulk=True)
         logger.info(f"Extracted {len(df)} price history records")
         return df
 
+    def extract_price_feature_aggregates(self, days_back: int = LOOKBACK_DAYS,
+                                         item_ids: Optional[List[int]] = None,
+                                         chunk_size: Optional[int] = None
+                                         ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        Extract per-item price aggregates computed in PostgreSQL
+
+        Aggregates the same line items as extract_purchase_order_line_items
+        with GROUP BY, so only one row per pricebook item crosses the wire.
+        Pass the result to feature_store.price_features_from_aggregates() to
+        get the compute_price_features output.
+
+        Returns DataFrame with:
+        - pricebook_item_id, purchase_count, price_count
+        - mean_price, std_price (sample std), min_price, max_price
+        - total_quantity, first_purchase_at, last_purchase_at
+
+        Args:
+            days_back: Extraction window
+            item_ids: Restrict to these pricebook items
+            chunk_size: Stream the result in chunks of this many items
+        """
+        params = [days_back]
+        item_clause = ""
+        if item_ids is not None:
+            item_clause = "AND poli.pricebook_item_id = ANY(%s)"
+            params.append(list(item_ids))
+
+        # Prices are aggregated as float8 so results match pandas arithmetic
+        query = f"""
+        SELECT
+            poli.pricebook_item_id,
+            COUNT(*) AS purchase_count,
+            COUNT(poli.unit_price) AS price_count,
+            AVG(poli.unit_price::float8) AS mean_price,
+            STDDEV_SAMP(poli.unit_price::float8) AS std_price,
+            MIN(poli.unit_price::float8) AS min_price,
+            MAX(poli.unit_price::float8) AS max_price,
+            COALESCE(SUM(poli.quantity::float8), 0) AS total_quantity,
+            MIN(poli.created_at) AS first_purchase_at,
+            MAX(poli.created_at) AS last_purchase_at
+        FROM purchase_order_line_items poli
+        INNER JOIN purchase_orders po ON poli.purchase_order_id = po.id
+        WHERE poli.created_at >= NOW() - INTERVAL '%s days'
+        AND poli.pricebook_item_id IS NOT NULL
+        {item_clause}
+        GROUP BY poli.pricebook_item_id
+        HAVING COUNT(poli.unit_price) > 0
+        ORDER BY poli.pricebook_item_id
+        """
+
+        logger.info(f"Extracting price feature aggregates from last {days_back} days")
+        if chunk_size:
+            return self.stream_query(query, params, chunk_size)
+
+        df = self._read(query, params)
+        logger.info(f"Extracted price aggregates for {len(df)} items")
+        return df
+
+    def extract_line_items_since(self, created_since: Optional[datetime] = None,
+                                 chunk_size: int = EXTRACTION_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Stream priced line items created after created_since, oldest first
+
+        Covers the same line items as get_item_purchase_history, so running
+        statistics built from this stream match a full history scan.
+
+        Args:
+            created_since: Lower bound on created_at (exclusive); None for all
+
+        Yields DataFrames with:
+        - id, pricebook_item_id, unit_price, quantity, created_at
+        """
+        created_clause = ""
+        params: tuple = ()
+        if created_since is not None:
+            created_clause = "WHERE poli.created_at > %s"
+            params = (created_since,)
+
+        query = f"""
+        SELECT
+            poli.id,
+            poli.pricebook_item_id,
+            poli.unit_price,
+            poli.quantity,
+            poli.created_at
+        FROM purchase_order_line_items poli
+        INNER JOIN purchase_orders po ON poli.purchase_order_id = po.id
+        INNER JOIN pricebook_items pb ON poli.pricebook_item_id = pb.id
+        {created_clause}
+        ORDER BY poli.created_at, poli.id
+        """
+
+        logger.info(f"Extracting line items created since {created_since or 'the beginning'}")
+        return self.stream_query(query, params, chunk_size)
+
+    def extract_changed_entities(self, entity_type: str, since: datetime,
+                                 days_back: int = LOOKBACK_DAYS) -> pd.DataFrame:
+        """
+        Find entities whose features may have changed since a point in time
+
+        Returns DataFrame with:
+        - entity_id, changed_at (latest change affecting the entity)
+
+        Compare changed_at with each entity's computed_at to decide which
+        features are stale. Signals per entity type:
+        - pricebook_item: line items updated, or line items that have left
+          the days_back extraction window
+        - supplier: supplier rows or their purchase orders updated
+        - construction: construction rows or their purchase orders updated
+
+        Deleted rows leave no trace, so callers should still recompute
+        everything from time to time.
+        """
+        change_queries = {
+            'pricebook_item': """
+                SELECT poli.pricebook_item_id AS entity_id, poli.updated_at AS changed_at
+                FROM purchase_order_line_items poli
+                WHERE poli.updated_at > %(since)s
+                UNION ALL
+                SELECT poli.pricebook_item_id,
+                       poli.created_at + INTERVAL '%(days_back)s days'
+                FROM purchase_order_line_items poli
+                WHERE poli.created_at < NOW() - INTERVAL '%(days_back)s days'
+                AND poli.created_at >= %(since)s - INTERVAL '%(days_back)s days'
+            """,
+            'supplier': """
+                SELECT s.id AS entity_id, s.updated_at AS changed_at
+                FROM suppliers s
+                WHERE s.updated_at > %(since)s
+                UNION ALL
+                SELECT po.supplier_id, po.updated_at
+                FROM purchase_orders po
+                WHERE po.updated_at > %(since)s
+            """,
+            'construction': """
+                SELECT c.id AS entity_id, c.updated_at AS changed_at
+                FROM constructions c
+                WHERE c.updated_at > %(since)s
+                UNION ALL
+                SELECT po.construction_id, po.updated_at
+                FROM purchase_orders po
+                WHERE po.updated_at > %(since)s
+            """,
+        }
+        if entity_type not in change_queries:
+            raise ValueError(f"Change detection not supported for {entity_type}")
+
+        query = f"""
+        SELECT entity_id, MAX(changed_at) AS changed_at
+        FROM ({change_queries[entity_type]}) changes
+        WHERE entity_id IS NOT NULL
+        GROUP BY entity_id
+        """
+
+        df = self._read(query, {'since': since, 'days_back': days_back})
+        logger.info(f"Found {len(df)} {entity_type} entities changed since {since}")
+        return df
+
+    def database_now(self) -> datetime:
+        """
+        Current database time in UTC, comparable with the Rails timestamp columns
+
+        Rails writes timestamp (without time zone) columns in UTC, whatever
+        the session TimeZone, so NOW() is converted to UTC rather than cast.
+        """
+        cur = self.connect().cursor()
+        try:
+            cur.execute("SELECT NOW() AT TIME ZONE 'UTC'")
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def extract_incremental(self, name: str, days_back: int = LOOKBACK_DAYS,
+                            cache: Optional[SnapshotCache] = None) -> pd.DataFrame:
+        """
+        Extract a windowed dataset using a local snapshot and high-water mark
+
+        Only rows updated since the previous snapshot's watermark are fetched;
+        they are merged into the snapshot and rows older than the window are
+        dropped. The result matches a full extraction except for rows deleted
+        since the last full refresh (see SnapshotCache.needs_full_refresh).
+
+        Args:
+            name: 'po_line_items' or 'price_history'
+            days_back: Extraction window
+            cache: Snapshot cache (defaults to SNAPSHOT_DIR)
+        """
+        extract_methods = {
+            'po_line_items': self.extract_purchase_order_line_items,
+            'price_history': self.extract_price_history,
+        }
+        if name not in extract_methods:
+            raise ValueError(f"Incremental extraction not supported for {name}")
+
+        cache = cache or SnapshotCache()
+        extract = extract_methods[name]
+
+        # Take the watermark before reading so rows written during the
+        # extraction are picked up again next time
+        watermark = self.database_now()
+        snapshot_df, meta = cache.load(name)
+
+        if cache.needs_full_refresh(meta, days_back, watermark):
+            logger.info(f"Full extraction of {name} (rebuilding snapshot)")
+            df = extract(days_back=days_back)
+            cache.save(name, df, watermark, days_back, full_refresh_at=watermark)
+            return df
+
+        updated_since = meta['watermark'] - timedelta(minutes=SNAPSHOT_OVERLAP_MINUTES)
+        logger.info(f"Incremental extraction of {name} since {updated_since}")
+        delta_df = extract(days_back=days_back, updated_since=updated_since)
+
+        df = merge_snapshot(snapshot_df, delta_df,
+                            window_start=watermark - timedelta(days=days_back))
+        cache.save(name, df, watermark, days_back, full_refresh_at=meta['full_refresh_at'])
+
+        logger.info(f"Merged {len(delta_df)} new/updated rows into {name} snapshot ({len(df)} rows)")
+        return df
+
     def get_item_purchase_history(self, item_code: str = None,
                                    pricebook_item_id: int = None) -> pd.DataFrame:
         """
@@ -238,27 +669,88 @@ class DatabaseExtractor:
         ORDER BY poli.created_at DESC
         """
 
-        df = pd.read_sql_query(query, self.connect(), params=(param,))
+        df = self._read(query, (param,))
         return df
 
+    def extract_item_price_summaries(self, item_ids: List[int]) -> pd.DataFrame:
+        """
+        Price count, mean and sample std over the full purchase history of
+        many items, in one query
+
+        Covers the same line items as get_item_purchase_history. Items
+        without line items are absent from the result.
 
-def extract_all_data() -> Dict[str, pd.DataFrame]:
+        Returns DataFrame with:
+        - pricebook_item_id, purchase_count, price_count, mean_price, std_price
+        """
+        query = """
+        SELECT
+            poli.pricebook_item_id,
+            COUNT(*) AS purchase_count,
+            COUNT(poli.unit_price) AS price_count,
+            AVG(poli.unit_price::float8) AS mean_price,
+            STDDEV_SAMP(poli.unit_price::float8) AS std_price
+        FROM purchase_order_line_items poli
+        INNER JOIN purchase_orders po ON poli.purchase_order_id = po.id
+        INNER JOIN pricebook_items pb ON poli.pricebook_item_id = pb.id
+        WHERE poli.pricebook_item_id = ANY(%s)
+        GROUP BY poli.pricebook_item_id
+        """
+
+        return self._read(query, ([int(item_id) for item_id in item_ids],))
+
+
+def _timed_extract(name: str, extract: Callable[[DatabaseExtractor], pd.DataFrame]) -> pd.DataFrame:
+    """Run one extraction on its own connection and log how long it took"""
+    start = time.perf_counter()
+    with DatabaseExtractor() as extractor:
+        df = extract(extractor)
+    logger.info(f"Extracted {name}: {len(df)} records in {time.perf_counter() - start:.2f}s")
+    return df
+
+
+def extract_all_data(incremental: bool = INCREMENTAL_EXTRACTION,
+                     max_workers: int = EXTRACTION_MAX_WORKERS) -> Dict[str, pd.DataFrame]:
     """
     Extract all data needed for ML training
     Returns dictionary of DataFrames
-    """
-    logger.info("Starting full data extraction")
 
-    with DatabaseExtractor() as extractor:
-        data = {
-            'po_line_items': extractor.extract_purchase_order_line_items(),
-            'constructions': extractor.extract_constructions(),
-            'suppliers': extractor.extract_suppliers(),
-            'pricebook_items': extractor.extract_pricebook_items(),
-            'price_history': extractor.extract_price_history()
+    The queries run concurrently on up to max_workers connections, so the
+    wall time is roughly that of the slowest query rather than the sum.
+
+    With incremental=True the large windowed tables (PO line items and
+    price history) are served from the local snapshot cache and only rows
+    updated since the last run are read from the database.
+    """
+    logger.info(f"Starting full data extraction (max_workers={max_workers})")
+    start = time.perf_counter()
+
+    # Each task is called with its own DatabaseExtractor
+    if incremental:
+        extract_po_line_items = partial(DatabaseExtractor.extract_incremental, name='po_line_items')
+        extract_price_history = partial(DatabaseExtractor.extract_incremental, name='price_history')
+    else:
+        extract_po_line_items = DatabaseExtractor.extract_purchase_order_line_items
+        extract_price_history = DatabaseExtractor.extract_price_history
+
+    # Largest queries first so they start immediately
+    tasks = {
+        'po_line_items': extract_po_line_items,
+        'constructions': DatabaseExtractor.extract_constructions,
+        'suppliers': DatabaseExtractor.extract_suppliers,
+        'pricebook_items': DatabaseExtractor.extract_pricebook_items,
+        'price_history': extract_price_history
+    }
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers),
+                            thread_name_prefix='extract') as executor:
+        futures = {
+            name: executor.submit(_timed_extract, name, extract)
+            for name, extract in tasks.items()
         }
+        data = {name: future.result() for name, future in futures.items()}
 
-    logger.info("Data extraction complete")
+    logger.info(f"Data extraction complete in {time.perf_counter() - start:.2f}s")
     return data
 
 
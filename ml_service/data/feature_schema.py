@@ -0,0 +1,134 @@
+"""
+Feature Schemas for columnar feature storage
+
+Each feature type maps to its own table with one typed column per feature,
+matching the output of the compute_*_features functions. The feature store
+creates and migrates these tables from the definitions below, so adding a
+feature here (and to its compute function) is all that's needed.
+"""
+from typing import Dict, List
+
+# feature_type -> table, entity and typed feature columns (in output order)
+FEATURE_SCHEMAS = {
+    'price_features': {
+        'table': 'ml_price_features',
+        'entity_type': 'pricebook_item',
+        'entity_id_column': 'pricebook_item_id',
+        'columns': {
+            'mean_price': 'DOUBLE PRECISION',
+            'std_price': 'DOUBLE PRECISION',
+            'min_price': 'DOUBLE PRECISION',
+            'max_price': 'DOUBLE PRECISION',
+            'price_range': 'DOUBLE PRECISION',
+            'coefficient_variation': 'DOUBLE PRECISION',
+            'purchase_count': 'INTEGER',
+            'total_quantity': 'DOUBLE PRECISION',
+            'days_since_first_purchase': 'INTEGER',
+            'days_since_last_purchase': 'INTEGER'
+        }
+    },
+    'supplier_features': {
+        'table': 'ml_supplier_features',
+        'entity_type': 'supplier',
+        'entity_id_column': 'supplier_id',
+        'columns': {
+            'total_po_value': 'DOUBLE PRECISION',
+            'avg_po_value': 'DOUBLE PRECISION',
+            'total_purchase_orders': 'INTEGER',
+            'response_rate': 'DOUBLE PRECISION',
+            'rating': 'INTEGER',
+            'is_active': 'BOOLEAN'
+        }
+    },
+    'job_features': {
+        'table': 'ml_job_features',
+        'entity_type': 'construction',
+        'entity_id_column': 'construction_id',
+        'columns': {
+            'contract_value': 'DOUBLE PRECISION',
+            'live_profit': 'DOUBLE PRECISION',
+            'profit_percentage': 'DOUBLE PRECISION',
+            'total_po_value': 'DOUBLE PRECISION',
+            'purchase_orders_count': 'INTEGER',
+            'po_to_contract_ratio': 'DOUBLE PRECISION',
+            'stage': 'TEXT',
+            'status': 'TEXT'
+        }
+    }
+}
+
+# information_schema.columns data_type for each declared column type
+_INFORMATION_SCHEMA_TYPES = {
+    'DOUBLE PRECISION': 'double precision',
+    'INTEGER': 'integer',
+    'BIGINT': 'bigint',
+    'BOOLEAN': 'boolean',
+    'TEXT': 'text',
+    'TIMESTAMP': 'timestamp without time zone'
+}
+
+
+def get_feature_schema(feature_type: str) -> Dict:
+    """Get the columnar schema for a feature type (KeyError if it has none)"""
+    return FEATURE_SCHEMAS[feature_type]
+
+
+def has_feature_schema(feature_type: str) -> bool:
+    return feature_type in FEATURE_SCHEMAS
+
+
+def feature_columns(feature_type: str) -> List[str]:
+    """Feature column names for a feature type, in schema order"""
+    return list(FEATURE_SCHEMAS[feature_type]['columns'])
+
+
+def create_table_sql(feature_type: str) -> str:
+    """CREATE TABLE IF NOT EXISTS statement for a feature type's table"""
+    schema = FEATURE_SCHEMAS[feature_type]
+    column_definitions = (
+        [f"{schema['entity_id_column']} INTEGER PRIMARY KEY"]
+        + [f"{name} {sql_type}" for name, sql_type in schema['columns'].items()]
+        + ["computed_at TIMESTAMP NOT NULL DEFAULT NOW()",
+           "created_at TIMESTAMP NOT NULL DEFAULT NOW()",
+           "updated_at TIMESTAMP NOT NULL DEFAULT NOW()"]
+    )
+    columns_sql = ',\n            '.join(column_definitions)
+
+    return f"""
+        CREATE TABLE IF NOT EXISTS {schema['table']} (
+            {columns_sql}
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_{schema['table']}_computed_at
+            ON {schema['table']}(computed_at);
+        """
+
+
+def migration_sql(feature_type: str, existing_columns: Dict[str, str]) -> List[str]:
+    """
+    ALTER TABLE statements that bring an existing table up to the schema
+
+    Args:
+        feature_type: Feature type whose table is being migrated
+        existing_columns: column name -> information_schema data_type
+
+    New columns are added and columns whose type changed are converted in
+    place. Columns no longer in the schema are left alone, so older readers
+    keep working.
+    """
+    schema = FEATURE_SCHEMAS[feature_type]
+    statements = []
+
+    for name, sql_type in schema['columns'].items():
+        existing_type = existing_columns.get(name)
+        if existing_type is None:
+            statements.append(
+                f"ALTER TABLE {schema['table']} ADD COLUMN IF NOT EXISTS {name} {sql_type}"
+            )
+        elif existing_type != _INFORMATION_SCHEMA_TYPES.get(sql_type, sql_type.lower()):
+            statements.append(
+                f"ALTER TABLE {schema['table']} ALTER COLUMN {name} "
+                f"TYPE {sql_type} USING {name}::{sql_type}"
+            )
+
+    return statements
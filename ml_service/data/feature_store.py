@@ -4,10 +4,14 @@ Feature Store for ML Models
 Stores processed features in the database for efficient model training and inference.
 """
 import psycopg2
+from psycopg2.extras import execute_values
 import pandas as pd
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+import threading
+import time
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Iterable, Iterator, Set, Union
 
 import sys
 import os
@@ -16,13 +20,51 @@ import config
 DATABASE_URL = config.DATABASE_URL
 FEATURES_TABLE = config.FEATURES_TABLE
 PREDICTIONS_TABLE = config.PREDICTIONS_TABLE
+PRICE_STATS_TABLE = config.PRICE_STATS_TABLE
+FEATURE_STORAGE_MODE = config.FEATURE_STORAGE_MODE
+PARTITION_PREDICTIONS = config.PARTITION_PREDICTIONS
+PREDICTION_PARTITION_MONTHS_AHEAD = config.PREDICTION_PARTITION_MONTHS_AHEAD
+PREDICTION_RETENTION_DAYS = config.PREDICTION_RETENTION_DAYS
+FEATURE_WRITE_BATCH_SIZE = config.FEATURE_WRITE_BATCH_SIZE
+FEATURE_READ_CHUNK_SIZE = config.FEATURE_READ_CHUNK_SIZE
+EXTRACTION_CHUNK_SIZE = config.EXTRACTION_CHUNK_SIZE
+PREDICTION_BUFFER_ROWS = config.PREDICTION_BUFFER_ROWS
+PREDICTION_BUFFER_SECONDS = config.PREDICTION_BUFFER_SECONDS
+PREDICTION_BUFFER_MAX_RETAINED_ROWS = config.PREDICTION_BUFFER_MAX_RETAINED_ROWS
+SNAPSHOT_OVERLAP_MINUTES = config.SNAPSHOT_OVERLAP_MINUTES
+from data.connection_pool import get_pool
+from data.json_encoding import dumps, dumps_records
+from data.feature_schema import (
+    FEATURE_SCHEMAS, get_feature_schema, has_feature_schema, create_table_sql, migration_sql
+)
 import numpy as np
 import json
 
 logger = logging.getLogger(__name__)
 
+# Column holding the entity id in each compute_*_features output
+ENTITY_ID_COLUMNS = {
+    'pricebook_item': 'pricebook_item_id',
+    'supplier': 'supplier_id',
+    'construction': 'construction_id'
+}
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
 def clean_nan_for_json(obj):
-    """Replace NaN values with None for JSON serialization"""
+    """
+    Replace NaN values with None for JSON serialization
+
+    The feature store encodes with data.json_encoding, which does this
+    itself; kept for callers that use json.dumps directly.
+    """
     if isinstance(obj, dict):
         return {k: clean_nan_for_json(v) for k, v in obj.items()}
     elif isinstance(obj, list):
@@ -33,23 +75,43 @@ def clean_nan_for_json(obj):
         return obj
 
 
+STORAGE_MODES = ('jsonb', 'columnar')
+
+
 class FeatureStore:
-    """Manage ML features and predictions in PostgreSQL"""
+    """
+    Manage ML features and predictions in PostgreSQL
+
+    Features are stored either as JSONB documents in a single table
+    (storage_mode='jsonb') or, for feature types with a schema in
+    data.feature_schema, in one typed table per feature type
+    (storage_mode='columnar'). Feature types without a schema always use
+    the JSONB table.
+    """
 
-    def __init__(self, database_url: str = DATABASE_URL):
+    def __init__(self, database_url: str = DATABASE_URL,
+                 storage_mode: str = FEATURE_STORAGE_MODE):
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown feature storage mode: {storage_mode} "
+                             f"(expected one of {', '.join(STORAGE_MODES)})")
         self.database_url = database_url
+        self.storage_mode = storage_mode
         self.conn = None
 
     def connect(self):
-        """Establish database connection"""
-        if not self.conn or self.conn.closed:
-            self.conn = psycopg2.connect(self.database_url)
+        """Check out a connection from the shared pool"""
+        if self.conn is not None and self.conn.closed:
+            # Connection was lost; hand it back so the pool replaces it
+            self.close()
+        if self.conn is None:
+            self.conn = get_pool(self.database_url).getconn()
         return self.conn
 
     def close(self):
-        """Close database connection"""
-        if self.conn and not self.conn.closed:
-            self.conn.close()
+        """Return the connection to the shared pool"""
+        if self.conn is not None:
+            get_pool(self.database_url).putconn(self.conn)
+            self.conn = None
 
     def __enter__(self):
         self.connect()
@@ -58,10 +120,17 @@ class FeatureStore:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-    def create_tables(self):
+    def create_tables(self, partition_predictions: bool = PARTITION_PREDICTIONS):
         """
         Create feature store tables if they don't exist
         Run this once during setup
+
+        In columnar mode the typed feature tables are created, and existing
+        ones migrated, from the schemas in data.feature_schema.
+
+        With partition_predictions, a new predictions table is partitioned by
+        month on predicted_at. Upcoming monthly partitions are created on
+        every call, so run this before each training run.
         """
         create_features_table = f"""
         CREATE TABLE IF NOT EXISTS {FEATURES_TABLE} (
@@ -85,9 +154,124 @@ class FeatureStore:
             ON {FEATURES_TABLE}(computed_at);
         """
 
-        create_predictions_table = f"""
-        CREATE TABLE IF NOT EXISTS {PREDICTIONS_TABLE} (
-            id SERIAL PRIMARY KEY,
+        # One row per entity and feature type: older releases appended a new
+        # row on every run, so keep only the latest before adding the key
+        create_features_unique_key = f"""
+        DELETE FROM {FEATURES_TABLE}
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY feature_type, entity_type, entity_id
+                    ORDER BY computed_at DESC, id DESC
+                ) AS row_rank
+                FROM {FEATURES_TABLE}
+            ) ranked
+            WHERE row_rank > 1
+        );
+
+        CREATE UNIQUE INDEX idx_features_unique_entity
+            ON {FEATURES_TABLE}(feature_type, entity_type, entity_id);
+        """
+
+        # Running price statistics per pricebook item, merged in place as
+        # new line items arrive (see update_price_stats)
+        create_price_stats_table = f"""
+        CREATE TABLE IF NOT EXISTS {PRICE_STATS_TABLE} (
+            pricebook_item_id INTEGER PRIMARY KEY,
+            purchase_count BIGINT NOT NULL,
+            price_count BIGINT NOT NULL,
+            price_mean DOUBLE PRECISION NOT NULL,
+            price_m2 DOUBLE PRECISION NOT NULL,
+            min_price DOUBLE PRECISION,
+            max_price DOUBLE PRECISION,
+            total_quantity DOUBLE PRECISION NOT NULL,
+            first_purchase_at TIMESTAMP,
+            last_purchase_at TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+
+        -- Line items merged within the refresh overlap window, so a line
+        -- item read again by a later refresh is not counted twice
+        CREATE TABLE IF NOT EXISTS {PRICE_STATS_TABLE}_line_items (
+            line_item_id BIGINT PRIMARY KEY,
+            created_at TIMESTAMP NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_{PRICE_STATS_TABLE}_line_items_created_at
+            ON {PRICE_STATS_TABLE}_line_items(created_at);
+        """
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(create_features_table)
+            cur.execute("SELECT to_regclass('idx_features_unique_entity')")
+            if cur.fetchone()[0] is None:
+                logger.info("Adding unique key to feature store (removing superseded rows)")
+                cur.execute(create_features_unique_key)
+
+            if self.storage_mode == 'columnar':
+                self._create_feature_tables(cur)
+
+            cur.execute(create_price_stats_table)
+
+            partitioned = self._predictions_partitioned(cur)
+            if partitioned is None:
+                self._create_predictions_table(cur, partition_predictions)
+            elif partition_predictions and not partitioned:
+                logger.warning(
+                    f"{PREDICTIONS_TABLE} is not partitioned; run "
+                    f"FeatureStore().migrate_predictions_to_partitioned() to convert it"
+                )
+
+            if self._predictions_partitioned(cur):
+                self._create_prediction_partitions(cur, _month_start(date.today()),
+                                                   PREDICTION_PARTITION_MONTHS_AHEAD)
+
+            conn.commit()
+            logger.info("Feature store tables created successfully")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error creating feature store tables: {e}")
+            raise
+        finally:
+            cur.close()
+
+    def _create_feature_tables(self, cur):
+        """Create or migrate one typed table per feature schema"""
+        for feature_type, schema in FEATURE_SCHEMAS.items():
+            cur.execute(create_table_sql(feature_type))
+            cur.execute("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = %s
+            """, (schema['table'],))
+            existing_columns = dict(cur.fetchall())
+
+            for statement in migration_sql(feature_type, existing_columns):
+                logger.info(f"Migrating {schema['table']}: {statement}")
+                cur.execute(statement)
+
+    def _columnar(self, feature_type: str) -> bool:
+        """Whether a feature type is stored in its own typed table"""
+        return self.storage_mode == 'columnar' and has_feature_schema(feature_type)
+
+    def _predictions_partitioned(self, cur) -> Optional[bool]:
+        """Whether the predictions table is partitioned (None if it doesn't exist)"""
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+                    (PREDICTIONS_TABLE,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return row[0] == 'p'
+
+    def _create_predictions_table(self, cur, partitioned: bool):
+        """
+        Create the predictions table
+
+        Partitioned tables are range-partitioned by month on predicted_at,
+        with a default partition catching rows outside the monthly ones.
+        """
+        columns = """
             model_name VARCHAR(100) NOT NULL,
             model_version VARCHAR(50) NOT NULL,
             entity_id INTEGER NOT NULL,
@@ -96,8 +280,28 @@ class FeatureStore:
             confidence_score FLOAT,
             predicted_at TIMESTAMP NOT NULL DEFAULT NOW(),
             created_at TIMESTAMP NOT NULL DEFAULT NOW()
-        );
+        """
 
+        if partitioned:
+            create_table = f"""
+            CREATE TABLE IF NOT EXISTS {PREDICTIONS_TABLE} (
+                id BIGSERIAL,
+                {columns},
+                PRIMARY KEY (id, predicted_at)
+            ) PARTITION BY RANGE (predicted_at);
+
+            CREATE TABLE IF NOT EXISTS {PREDICTIONS_TABLE}_default
+                PARTITION OF {PREDICTIONS_TABLE} DEFAULT;
+            """
+        else:
+            create_table = f"""
+            CREATE TABLE IF NOT EXISTS {PREDICTIONS_TABLE} (
+                id SERIAL PRIMARY KEY,
+                {columns}
+            );
+            """
+
+        create_indexes = f"""
         CREATE INDEX IF NOT EXISTS idx_predictions_entity
             ON {PREDICTIONS_TABLE}(entity_type, entity_id);
 
@@ -108,16 +312,193 @@ class FeatureStore:
             ON {PREDICTIONS_TABLE}(predicted_at);
         """
 
+        cur.execute(create_table)
+        cur.execute(create_indexes)
+
+    def _create_prediction_partitions(self, cur, first_month: date, months_ahead: int):
+        """
+        Create monthly partitions from first_month through months_ahead months after today
+
+        Rows already in the default partition for a new month are moved into
+        it: PostgreSQL refuses to add a partition whose range the default
+        partition holds rows for.
+        """
+        last_month = _add_months(_month_start(date.today()), months_ahead)
+        existing = set(self._prediction_partitions(cur))
+        default_table = f"{PREDICTIONS_TABLE}_default"
+        month = first_month
+
+        while month <= last_month:
+            next_month = _add_months(month, 1)
+            name = f"{PREDICTIONS_TABLE}_p{month.strftime('%Y%m')}"
+            if name in existing:
+                month = next_month
+                continue
+
+            cur.execute(f"""
+            SELECT EXISTS (
+                SELECT 1 FROM {default_table} WHERE predicted_at >= %s AND predicted_at < %s
+            )
+            """, (month, next_month))
+
+            if cur.fetchone()[0]:
+                # Build the partition standalone, move the rows, then attach
+                cur.execute(f"CREATE TABLE {name} (LIKE {PREDICTIONS_TABLE} INCLUDING DEFAULTS)")
+                cur.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {default_table}
+                    WHERE predicted_at >= %s AND predicted_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """, (month, next_month))
+                logger.info(f"Moved {cur.rowcount} predictions from {default_table} to {name}")
+                cur.execute(f"""
+                ALTER TABLE {PREDICTIONS_TABLE} ATTACH PARTITION {name}
+                    FOR VALUES FROM (%s) TO (%s)
+                """, (month, next_month))
+            else:
+                cur.execute(f"""
+                CREATE TABLE {name}
+                    PARTITION OF {PREDICTIONS_TABLE}
+                    FOR VALUES FROM (%s) TO (%s)
+                """, (month, next_month))
+            month = next_month
+
+    def _prediction_partitions(self, cur) -> Dict[str, date]:
+        """Monthly partitions of the predictions table, mapped to their start month"""
+        cur.execute("""
+        SELECT child.relname
+        FROM pg_inherits
+        INNER JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        INNER JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = %s
+        """, (PREDICTIONS_TABLE,))
+
+        prefix = f"{PREDICTIONS_TABLE}_p"
+        partitions = {}
+        for (name,) in cur.fetchall():
+            if name.startswith(prefix):
+                partitions[name] = datetime.strptime(name[len(prefix):], '%Y%m').date()
+        return partitions
+
+    def ensure_prediction_partitions(self, months_ahead: int = PREDICTION_PARTITION_MONTHS_AHEAD):
+        """Create monthly prediction partitions up to months_ahead months from now"""
         conn = self.connect()
         cur = conn.cursor()
         try:
-            cur.execute(create_features_table)
-            cur.execute(create_predictions_table)
+            if self._predictions_partitioned(cur):
+                self._create_prediction_partitions(cur, _month_start(date.today()), months_ahead)
             conn.commit()
-            logger.info("Feature store tables created successfully")
         except Exception as e:
             conn.rollback()
-            logger.error(f"Error creating feature store tables: {e}")
+            logger.error(f"Error creating prediction partitions: {e}")
+            raise
+        finally:
+            cur.close()
+
+    def migrate_predictions_to_partitioned(self):
+        """
+        Convert an existing unpartitioned predictions table to monthly partitions
+
+        Copies all rows into a new partitioned table in one transaction.
+        The table is locked for the duration, so run it during a quiet period.
+        """
+        legacy_table = f"{PREDICTIONS_TABLE}_unpartitioned"
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            if self._predictions_partitioned(cur) is not False:
+                logger.info(f"{PREDICTIONS_TABLE} is already partitioned or missing; nothing to migrate")
+                return
+
+            cur.execute(f"SELECT MIN(predicted_at) FROM {PREDICTIONS_TABLE}")
+            oldest = cur.fetchone()[0]
+
+            cur.execute(f"ALTER TABLE {PREDICTIONS_TABLE} RENAME TO {legacy_table}")
+            for index in (f'{PREDICTIONS_TABLE}_pkey', 'idx_predictions_entity',
+                          'idx_predictions_model', 'idx_predictions_predicted_at'):
+                cur.execute(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_unpartitioned")
+
+            self._create_predictions_table(cur, partitioned=True)
+            first_month = _month_start(oldest.date() if oldest else date.today())
+            self._create_prediction_partitions(cur, first_month, PREDICTION_PARTITION_MONTHS_AHEAD)
+
+            cur.execute(f"""
+            INSERT INTO {PREDICTIONS_TABLE}
+            SELECT id, model_name, model_version, entity_id, entity_type,
+                   prediction_value, confidence_score, predicted_at, created_at
+            FROM {legacy_table}
+            """)
+            cur.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{PREDICTIONS_TABLE}', 'id'),
+                          COALESCE((SELECT MAX(id) FROM {PREDICTIONS_TABLE}), 1))
+            """)
+            cur.execute(f"DROP TABLE {legacy_table}")
+
+            conn.commit()
+            logger.info(f"Migrated {PREDICTIONS_TABLE} to monthly partitions")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error migrating predictions table: {e}")
+            raise
+        finally:
+            cur.close()
+
+    def prune_predictions(self, retention_days: int = PREDICTION_RETENTION_DAYS,
+                          detach_only: bool = False) -> int:
+        """
+        Remove predictions older than retention_days
+
+        On a partitioned table, whole monthly partitions that end before the
+        cutoff are detached and dropped (or only detached, for archiving,
+        with detach_only=True), and old rows in the default partition are
+        deleted (kept with detach_only). On an unpartitioned table old rows
+        are deleted.
+
+        Returns:
+            Number of partitions removed, or rows deleted if unpartitioned
+        """
+        cutoff = datetime.now() - timedelta(days=retention_days)
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            partitioned = self._predictions_partitioned(cur)
+
+            if partitioned is None:
+                return 0
+
+            if not partitioned:
+                cur.execute(f"DELETE FROM {PREDICTIONS_TABLE} WHERE predicted_at < %s", (cutoff,))
+                removed = cur.rowcount
+                conn.commit()
+                logger.info(f"Deleted {removed} predictions older than {retention_days} days")
+                return removed
+
+            removed = 0
+            for name, month in sorted(self._prediction_partitions(cur).items()):
+                if datetime.combine(_add_months(month, 1), datetime.min.time()) > cutoff:
+                    continue
+                cur.execute(f"ALTER TABLE {PREDICTIONS_TABLE} DETACH PARTITION {name}")
+                if not detach_only:
+                    cur.execute(f"DROP TABLE {name}")
+                removed += 1
+
+            if not detach_only:
+                cur.execute(f"DELETE FROM {PREDICTIONS_TABLE}_default WHERE predicted_at < %s", (cutoff,))
+                if cur.rowcount:
+                    logger.info(f"Deleted {cur.rowcount} predictions older than {retention_days} days "
+                                f"from {PREDICTIONS_TABLE}_default")
+
+            conn.commit()
+            action = "Detached" if detach_only else "Dropped"
+            logger.info(f"{action} {removed} prediction partitions older than {retention_days} days")
+            return removed
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error pruning predictions: {e}")
             raise
         finally:
             cur.close()
@@ -127,19 +508,29 @@ class FeatureStore:
         """
         Store computed features for an entity
 
+        Replaces any features previously stored for the same entity and
+        feature type.
+
         Args:
             feature_type: Type of features (e.g., 'price_features', 'job_features')
             entity_id: ID of the entity (e.g., pricebook_item_id, construction_id)
             entity_type: Type of entity (e.g., 'pricebook_item', 'construction')
             features: Dictionary of computed features
         """
-        import json
+        if self._columnar(feature_type):
+            features_df = pd.DataFrame([features]).assign(entity_id=entity_id)
+            self._store_features_columnar(feature_type, features_df, 'entity_id')
+            logger.debug(f"Stored features for {entity_type} {entity_id}")
+            return
 
         query = f"""
         INSERT INTO {FEATURES_TABLE}
         (feature_type, entity_id, entity_type, features, computed_at)
-        VALUES (%s, %s, %s, %s, %s)
-        ON CONFLICT DO NOTHING
+        VALUES (%s, %s, %s, %s, NOW() AT TIME ZONE 'UTC')
+        ON CONFLICT (feature_type, entity_type, entity_id) DO UPDATE SET
+            features = EXCLUDED.features,
+            computed_at = EXCLUDED.computed_at,
+            updated_at = NOW()
         """
 
         conn = self.connect()
@@ -149,8 +540,7 @@ class FeatureStore:
                 feature_type,
                 entity_id,
                 entity_type,
-                json.dumps(clean_nan_for_json(features)),
-                datetime.now()
+                dumps(features)
             ))
             conn.commit()
             logger.debug(f"Stored features for {entity_type} {entity_id}")
@@ -161,11 +551,189 @@ class FeatureStore:
         finally:
             cur.close()
 
+    def store_features_bulk(self, feature_type: str, entity_type: str,
+                            features_df: pd.DataFrame,
+                            entity_id_column: Optional[str] = None,
+                            batch_size: int = FEATURE_WRITE_BATCH_SIZE,
+                            computed_at: Optional[datetime] = None) -> int:
+        """
+        Store computed features for many entities in one transaction
+
+        Rows are written with multi-row INSERTs of batch_size rows and a
+        single commit, instead of one INSERT and commit per entity. Existing
+        features for the same entities are replaced.
+
+        Args:
+            feature_type: Type of features (e.g., 'price_features', 'job_features')
+            entity_type: Type of entity (e.g., 'pricebook_item', 'construction')
+            features_df: One row of features per entity
+            entity_id_column: Column holding the entity id (defaults by entity_type)
+            batch_size: Rows per INSERT statement
+            computed_at: When the source data was read, in database UTC time
+                (defaults to the current database time). Change detection
+                compares it with the Rails updated_at columns.
+
+        Returns:
+            Number of rows written
+        """
+        if len(features_df) == 0:
+            return 0
+
+        computed_at = computed_at or self.database_now()
+
+        entity_id_column = entity_id_column or ENTITY_ID_COLUMNS[entity_type]
+        # A single INSERT ... ON CONFLICT cannot update the same row twice
+        features_df = features_df.drop_duplicates(subset=entity_id_column, keep='last')
+
+        if self._columnar(feature_type):
+            count = self._store_features_columnar(feature_type, features_df,
+                                                  entity_id_column, batch_size, computed_at)
+            logger.info(f"Stored {feature_type} for {count} {entity_type} entities")
+            return count
+
+        query = f"""
+        INSERT INTO {FEATURES_TABLE}
+        (feature_type, entity_id, entity_type, features, computed_at)
+        VALUES %s
+        ON CONFLICT (feature_type, entity_type, entity_id) DO UPDATE SET
+            features = EXCLUDED.features,
+            computed_at = EXCLUDED.computed_at,
+            updated_at = NOW()
+        """
+
+        entity_ids = features_df[entity_id_column].astype(int).tolist()
+        documents = dumps_records(features_df)
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            for start in range(0, len(documents), batch_size):
+                rows = [
+                    (feature_type, entity_id, entity_type, document, computed_at)
+                    for entity_id, document in zip(entity_ids[start:start + batch_size],
+                                                   documents[start:start + batch_size])
+                ]
+                execute_values(cur, query, rows, page_size=batch_size)
+            conn.commit()
+            logger.info(f"Stored {feature_type} for {len(documents)} {entity_type} entities")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error storing features: {e}")
+            raise
+        finally:
+            cur.close()
+
+        return len(documents)
+
+    def _store_features_columnar(self, feature_type: str, features_df: pd.DataFrame,
+                                 entity_id_column: str,
+                                 batch_size: int = FEATURE_WRITE_BATCH_SIZE,
+                                 computed_at: Optional[datetime] = None) -> int:
+        """
+        Upsert features into the typed table for a feature type
+
+        Columns missing from features_df are stored as NULL, as are NaN
+        values; columns not in the schema are ignored.
+        """
+        schema = get_feature_schema(feature_type)
+        columns = list(schema['columns'])
+        table_id_column = schema['entity_id_column']
+
+        query = f"""
+        INSERT INTO {schema['table']}
+        ({table_id_column}, {', '.join(columns)}, computed_at)
+        VALUES %s
+        ON CONFLICT ({table_id_column}) DO UPDATE SET
+            {', '.join(f'{column} = EXCLUDED.{column}' for column in columns)},
+            computed_at = EXCLUDED.computed_at,
+            updated_at = NOW()
+        """
+
+        # Object dtype turns numpy scalars into Python values psycopg2 can adapt
+        values = features_df.reindex(columns=columns).astype(object)
+        values = values.where(values.notna(), None)
+        values.insert(0, table_id_column, features_df[entity_id_column].astype(int).astype(object))
+        computed_at = computed_at or self.database_now()
+        rows = [row + (computed_at,) for row in values.itertuples(index=False, name=None)]
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            execute_values(cur, query, rows, page_size=batch_size)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error storing features: {e}")
+            raise
+        finally:
+            cur.close()
+
+        return len(rows)
+
+    def delete_features(self, feature_type: str, entity_type: str, entity_ids: Iterable[int]) -> int:
+        """
+        Remove the stored features of entities (e.g. ones no longer in the data)
+
+        Returns:
+            Number of rows deleted
+        """
+        entity_ids = [int(entity_id) for entity_id in entity_ids]
+        if not entity_ids:
+            return 0
+
+        if self._columnar(feature_type):
+            schema = get_feature_schema(feature_type)
+            query = f"DELETE FROM {schema['table']} WHERE {schema['entity_id_column']} = ANY(%s)"
+            params = (entity_ids,)
+        else:
+            query = f"""
+            DELETE FROM {FEATURES_TABLE}
+            WHERE feature_type = %s AND entity_type = %s AND entity_id = ANY(%s)
+            """
+            params = (feature_type, entity_type, entity_ids)
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(query, params)
+            deleted = cur.rowcount
+            conn.commit()
+            logger.info(f"Deleted {feature_type} of {deleted} {entity_type} entities")
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error deleting features: {e}")
+            raise
+        finally:
+            cur.close()
+
+    def database_now(self) -> datetime:
+        """Current database time in UTC, comparable with the Rails timestamp columns"""
+        cur = self.connect().cursor()
+        try:
+            cur.execute("SELECT NOW() AT TIME ZONE 'UTC'")
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
     def get_features(self, entity_type: str, entity_id: int,
                     feature_type: Optional[str] = None) -> pd.DataFrame:
         """
-        Retrieve features for an entity
+        Retrieve the current features for an entity
+
+        There is one row per feature type, found through the
+        (feature_type, entity_type, entity_id) unique index. In columnar mode
+        a feature_type with a schema is read from its typed table instead,
+        with one column per feature.
         """
+        if feature_type and self._columnar(feature_type):
+            schema = get_feature_schema(feature_type)
+            query = f"""
+            SELECT * FROM {schema['table']}
+            WHERE {schema['entity_id_column']} = %s
+            """
+            return pd.read_sql_query(query, self.connect(), params=[entity_id])
+
         where_clause = "entity_type = %s AND entity_id = %s"
         params = [entity_type, entity_id]
 
@@ -182,14 +750,330 @@ class FeatureStore:
         df = pd.read_sql_query(query, self.connect(), params=params)
         return df
 
+    def _features_frame(self, rows: List[tuple]) -> pd.DataFrame:
+        """
+        Expand (entity_id, computed_at, features_json) rows into a wide DataFrame
+
+        All JSON documents are decoded with a single json.loads call and the
+        feature keys become typed columns.
+        """
+        if not rows:
+            return pd.DataFrame(columns=['entity_id', 'computed_at'])
+
+        entity_ids, computed_ats, documents = zip(*rows)
+        features_df = pd.DataFrame(json.loads('[' + ','.join(documents) + ']'))
+
+        features_df.insert(0, 'entity_id', entity_ids)
+        features_df.insert(1, 'computed_at', pd.to_datetime(list(computed_ats)))
+        return features_df.infer_objects()
+
+    def get_computed_at(self, feature_type: str, entity_type: str) -> pd.DataFrame:
+        """
+        When the stored features of each entity were last computed
+
+        Returns:
+            DataFrame with entity_id, computed_at
+        """
+        if self._columnar(feature_type):
+            schema = get_feature_schema(feature_type)
+            query = f"""
+            SELECT {schema['entity_id_column']} AS entity_id, computed_at
+            FROM {schema['table']}
+            """
+            params = None
+        else:
+            query = f"""
+            SELECT entity_id, computed_at
+            FROM {FEATURES_TABLE}
+            WHERE feature_type = %s AND entity_type = %s
+            """
+            params = [feature_type, entity_type]
+
+        return pd.read_sql_query(query, self.connect(), params=params)
+
+    def _columns_frame(self, rows: List[tuple], description) -> pd.DataFrame:
+        """Build a DataFrame from typed feature table rows (no decoding needed)"""
+        return pd.DataFrame.from_records(rows, columns=[column[0] for column in description],
+                                         coerce_float=True)
+
+    def iter_features(self, feature_type: str, entity_type: str,
+                      entity_ids: Optional[Iterable[int]] = None,
+                      chunk_size: int = FEATURE_READ_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Iterate over current features as wide DataFrame chunks
+
+        Args:
+            feature_type: Type of features (e.g., 'price_features')
+            entity_type: Type of entity (e.g., 'pricebook_item')
+            entity_ids: Entities to fetch; all entities of the type if None
+            chunk_size: Entities per chunk (and per query when ids are given)
+
+        Yields:
+            DataFrames with entity_id, computed_at and one column per feature
+        """
+        if self._columnar(feature_type):
+            schema = get_feature_schema(feature_type)
+            id_column = schema['entity_id_column']
+            query = f"""
+            SELECT {id_column} AS entity_id, computed_at, {id_column},
+                   {', '.join(schema['columns'])}
+            FROM {schema['table']}
+            WHERE TRUE
+            {{id_clause}}
+            ORDER BY {id_column}
+            """
+            params = ()
+            id_clause = f"AND {id_column} = ANY(%s)"
+            to_frame = self._columns_frame
+        else:
+            query = f"""
+            SELECT entity_id, computed_at, features::text
+            FROM {FEATURES_TABLE}
+            WHERE feature_type = %s AND entity_type = %s
+            {{id_clause}}
+            ORDER BY entity_id
+            """
+            params = (feature_type, entity_type)
+            id_clause = "AND entity_id = ANY(%s)"
+            to_frame = lambda rows, description: self._features_frame(rows)
+
+        conn = self.connect()
+
+        if entity_ids is not None:
+            entity_ids = [int(entity_id) for entity_id in entity_ids]
+            chunk_query = query.format(id_clause=id_clause)
+
+            for start in range(0, len(entity_ids), chunk_size):
+                cur = conn.cursor()
+                try:
+                    cur.execute(chunk_query, params + (entity_ids[start:start + chunk_size],))
+                    rows = cur.fetchall()
+                    description = cur.description
+                finally:
+                    cur.close()
+                yield to_frame(rows, description)
+            return
+
+        # All entities: stream through a server-side cursor
+        cur = conn.cursor(name=f"ml_features_{uuid.uuid4().hex}")
+        cur.itersize = chunk_size
+        try:
+            cur.execute(query.format(id_clause=""), params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield to_frame(rows, cur.description)
+        finally:
+            cur.close()
+            conn.rollback()
+
+    def get_features_bulk(self, feature_type: str, entity_type: str,
+                          entity_ids: Optional[Iterable[int]] = None,
+                          chunk_size: int = FEATURE_READ_CHUNK_SIZE) -> pd.DataFrame:
+        """
+        Retrieve current features for many entities as one wide DataFrame
+
+        One query per chunk_size entities instead of one per entity, with
+        the JSONB documents expanded into typed columns (or, in columnar
+        mode, read straight from the typed feature table).
+
+        Args:
+            feature_type: Type of features (e.g., 'price_features')
+            entity_type: Type of entity (e.g., 'pricebook_item')
+            entity_ids: Entities to fetch; all entities of the type if None
+            chunk_size: Entities per query
+
+        Returns:
+            DataFrame with entity_id, computed_at and one column per feature
+        """
+        chunks = list(self.iter_features(feature_type, entity_type, entity_ids, chunk_size))
+        chunks = [chunk for chunk in chunks if len(chunk) > 0]
+
+        if not chunks:
+            return pd.DataFrame(columns=['entity_id', 'computed_at'])
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
+
+    def update_price_stats(self, line_items_df: pd.DataFrame,
+                           record_since: Optional[datetime] = None,
+                           batch_size: int = FEATURE_WRITE_BATCH_SIZE) -> int:
+        """
+        Merge new line items into the running per-item price statistics
+
+        Each item's count, mean and M2 are combined with the stored ones
+        using Welford's update (generalised to batches, Chan et al.), so
+        the cost depends on the new line items only, never on the history.
+        Line items must be passed once; use refresh_price_stats() to feed
+        them from the database.
+
+        Args:
+            line_items_df: id, pricebook_item_id, unit_price, quantity, created_at
+            record_since: Record the ids of line items created at or after
+                this time, in the same transaction, so a refresh re-reading
+                them skips them (see get_merged_line_item_ids); None records none
+
+        Returns:
+            Number of items updated
+        """
+        line_items_df = line_items_df[line_items_df['pricebook_item_id'].notna()]
+        if len(line_items_df) == 0:
+            return 0
+
+        partials = _price_partials(line_items_df).reset_index()
+
+        # Missing prices: no min/max yet (LEAST/GREATEST skip NULLs)
+        columns = ['pricebook_item_id', 'purchase_count', 'price_count', 'price_mean', 'price_m2',
+                   'min_price', 'max_price', 'total_quantity', 'first_purchase_at',
+                   'last_purchase_at']
+        values = partials[columns].astype(object)
+        values = values.where(partials[columns].notna(), None)
+        values['pricebook_item_id'] = partials['pricebook_item_id'].astype(int).astype(object)
+        rows = list(values.itertuples(index=False, name=None))
+
+        query = f"""
+        INSERT INTO {PRICE_STATS_TABLE} AS s
+        ({', '.join(columns)})
+        VALUES %s
+        ON CONFLICT (pricebook_item_id) DO UPDATE SET
+            purchase_count = s.purchase_count + EXCLUDED.purchase_count,
+            price_count = s.price_count + EXCLUDED.price_count,
+            price_mean = CASE WHEN s.price_count + EXCLUDED.price_count = 0 THEN 0
+                ELSE s.price_mean + (EXCLUDED.price_mean - s.price_mean)
+                    * EXCLUDED.price_count / (s.price_count + EXCLUDED.price_count) END,
+            price_m2 = CASE WHEN s.price_count + EXCLUDED.price_count = 0 THEN 0
+                ELSE s.price_m2 + EXCLUDED.price_m2 + (EXCLUDED.price_mean - s.price_mean) ^ 2
+                    * s.price_count * EXCLUDED.price_count / (s.price_count + EXCLUDED.price_count) END,
+            min_price = LEAST(s.min_price, EXCLUDED.min_price),
+            max_price = GREATEST(s.max_price, EXCLUDED.max_price),
+            total_quantity = s.total_quantity + EXCLUDED.total_quantity,
+            first_purchase_at = LEAST(s.first_purchase_at, EXCLUDED.first_purchase_at),
+            last_purchase_at = GREATEST(s.last_purchase_at, EXCLUDED.last_purchase_at),
+            updated_at = NOW()
+        """
+
+        recorded = (line_items_df[line_items_df['created_at'] >= record_since]
+                    if record_since is not None else line_items_df.iloc[:0])
+        merged_rows = list(zip(recorded['id'].astype(int).tolist(), recorded['created_at'].tolist()))
+        merged_query = f"""
+        INSERT INTO {PRICE_STATS_TABLE}_line_items (line_item_id, created_at)
+        VALUES %s
+        ON CONFLICT (line_item_id) DO NOTHING
+        """
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            execute_values(cur, query, rows, page_size=batch_size)
+            if merged_rows:
+                execute_values(cur, merged_query, merged_rows, page_size=batch_size)
+            conn.commit()
+            logger.debug(f"Updated price stats for {len(rows)} items")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error updating price stats: {e}")
+            raise
+        finally:
+            cur.close()
+
+        return len(rows)
+
+    def get_price_stats_watermark(self) -> Optional[datetime]:
+        """Latest created_at of the line items merged into the price statistics"""
+        cur = self.connect().cursor()
+        try:
+            cur.execute(f"SELECT MAX(last_purchase_at) FROM {PRICE_STATS_TABLE}")
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def get_merged_line_item_ids(self, created_since: datetime) -> Set[int]:
+        """Ids of line items created since created_since that are already merged"""
+        cur = self.connect().cursor()
+        try:
+            cur.execute(f"SELECT line_item_id FROM {PRICE_STATS_TABLE}_line_items WHERE created_at >= %s",
+                        (created_since,))
+            return {row[0] for row in cur.fetchall()}
+        finally:
+            cur.close()
+
+    def prune_merged_line_items(self, created_before: datetime) -> int:
+        """Forget merged line item ids older than the refresh overlap window"""
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"DELETE FROM {PRICE_STATS_TABLE}_line_items WHERE created_at < %s",
+                        (created_before,))
+            deleted = cur.rowcount
+            conn.commit()
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error pruning merged line items: {e}")
+            raise
+        finally:
+            cur.close()
+
+    def get_price_stats(self, item_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        """
+        Read the running per-item price statistics
+
+        Returns the columns of DatabaseExtractor.extract_price_feature_aggregates
+        (over each item's full history rather than the lookback window), so the
+        result can be passed to price_features_from_aggregates().
+
+        Args:
+            item_ids: Items to read; all items if None
+        """
+        params = None
+        item_clause = ""
+        if item_ids is not None:
+            item_clause = "WHERE pricebook_item_id = ANY(%s)"
+            params = [[int(item_id) for item_id in item_ids]]
+
+        query = f"""
+        SELECT
+            pricebook_item_id,
+            purchase_count,
+            price_count,
+            CASE WHEN price_count > 0 THEN price_mean END AS mean_price,
+            CASE WHEN price_count > 1 THEN SQRT(price_m2 / (price_count - 1)) END AS std_price,
+            min_price,
+            max_price,
+            total_quantity,
+            first_purchase_at,
+            last_purchase_at
+        FROM {PRICE_STATS_TABLE}
+        {item_clause}
+        ORDER BY pricebook_item_id
+        """
+
+        return pd.read_sql_query(query, self.connect(), params=params)
+
+    def rebuild_price_stats(self):
+        """Discard the running price statistics so the next refresh starts over"""
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"TRUNCATE {PRICE_STATS_TABLE}, {PRICE_STATS_TABLE}_line_items")
+            conn.commit()
+            logger.info("Cleared price stats")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error clearing price stats: {e}")
+            raise
+        finally:
+            cur.close()
+
     def store_prediction(self, model_name: str, model_version: str,
                         entity_id: int, entity_type: str,
                         prediction_value: Dict, confidence_score: float = None):
         """
         Store model prediction
-        """
-        import json
 
+        NaN and infinite values in prediction_value are stored as null.
+        """
         query = f"""
         INSERT INTO {PREDICTIONS_TABLE}
         (model_name, model_version, entity_id, entity_type, prediction_value, confidence_score, predicted_at)
@@ -204,7 +1088,7 @@ class FeatureStore:
                 model_version,
                 entity_id,
                 entity_type,
-                json.dumps(prediction_value),
+                dumps(prediction_value),
                 confidence_score,
                 datetime.now()
             ))
@@ -217,13 +1101,81 @@ class FeatureStore:
         finally:
             cur.close()
 
+    def store_predictions(self, model_name: str, model_version: str,
+                          predictions_df: pd.DataFrame,
+                          entity_type: Optional[str] = None,
+                          entity_id_column: Optional[str] = None,
+                          confidence_column: str = 'confidence',
+                          batch_size: int = FEATURE_WRITE_BATCH_SIZE) -> int:
+        """
+        Store a DataFrame of model predictions in one transaction
+
+        Each row becomes one prediction: the entity id column identifies the
+        entity, confidence_column (if present) is stored as confidence_score
+        and the remaining columns form prediction_value.
+
+        Args:
+            model_name: Name of the model (e.g., 'price_anomaly_detector')
+            model_version: Model version
+            predictions_df: Output of a model's predict()
+            entity_type: Type of entity; inferred from the id column if None
+            entity_id_column: Column holding the entity id; inferred if None
+            confidence_column: Column holding the confidence score
+            batch_size: Rows per INSERT statement
+
+        Returns:
+            Number of predictions written
+        """
+        rows = prediction_rows(predictions_df, entity_type, entity_id_column, confidence_column)
+        self.insert_prediction_rows(model_name, model_version, rows, batch_size)
+        return len(rows)
+
+    def insert_prediction_rows(self, model_name: str, model_version: str,
+                               rows: List[tuple],
+                               batch_size: int = FEATURE_WRITE_BATCH_SIZE):
+        """
+        Insert prepared (entity_id, entity_type, prediction_json, confidence)
+        rows with multi-row INSERTs and a single commit
+        """
+        if not rows:
+            return
+
+        query = f"""
+        INSERT INTO {PREDICTIONS_TABLE}
+        (model_name, model_version, entity_id, entity_type, prediction_value, confidence_score, predicted_at)
+        VALUES %s
+        """
+        template = "(%s, %s, %s, %s, %s, %s, %s)"
+        predicted_at = datetime.now()
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            for start in range(0, len(rows), batch_size):
+                values = [
+                    (model_name, model_version, entity_id, entity_type,
+                     prediction_json, confidence, predicted_at)
+                    for entity_id, entity_type, prediction_json, confidence
+                    in rows[start:start + batch_size]
+                ]
+                execute_values(cur, query, values, template=template, page_size=batch_size)
+            conn.commit()
+            logger.info(f"Stored {len(rows)} predictions for {model_name} {model_version}")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error storing predictions: {e}")
+            raise
+        finally:
+            cur.close()
+
     def get_predictions(self, model_name: str, entity_type: Optional[str] = None,
                        days_back: int = 30) -> pd.DataFrame:
         """
         Retrieve recent predictions from a model
         """
-        where_clause = "model_name = %s AND predicted_at >= NOW() - INTERVAL '%s days'"
-        params = [model_name, days_back]
+        # A literal cutoff lets the planner prune monthly partitions
+        where_clause = "model_name = %s AND predicted_at >= %s"
+        params = [model_name, datetime.now() - timedelta(days=days_back)]
 
         if entity_type:
             where_clause += " AND entity_type = %s"
@@ -239,10 +1191,326 @@ class FeatureStore:
         return df
 
 
-def compute_price_features(po_line_items_df: pd.DataFrame) -> pd.DataFrame:
+def changed_entity_ids(changes_df: pd.DataFrame, computed_df: pd.DataFrame) -> List[int]:
+    """
+    Entities with a change newer than their stored features
+
+    Args:
+        changes_df: entity_id, changed_at (DatabaseExtractor.extract_changed_entities)
+        computed_df: entity_id, computed_at (FeatureStore.get_computed_at)
+
+    Returns:
+        Sorted entity ids that were changed after their features were
+        computed, or that have no stored features yet
+    """
+    merged = changes_df.merge(computed_df, on='entity_id', how='left')
+    stale = merged['computed_at'].isna() | (
+        pd.to_datetime(merged['changed_at']) > pd.to_datetime(merged['computed_at'])
+    )
+    return sorted(merged.loc[stale, 'entity_id'].astype(int).tolist())
+
+
+def prediction_rows(predictions_df: pd.DataFrame,
+                    entity_type: Optional[str] = None,
+                    entity_id_column: Optional[str] = None,
+                    confidence_column: str = 'confidence') -> List[tuple]:
+    """
+    Convert predict() output into (entity_id, entity_type, prediction_json,
+    confidence) rows for FeatureStore.insert_prediction_rows
+    """
+    if len(predictions_df) == 0:
+        return []
+
+    if entity_id_column is None:
+        if entity_type is not None:
+            entity_id_column = ENTITY_ID_COLUMNS[entity_type]
+        else:
+            matches = [(etype, column) for etype, column in ENTITY_ID_COLUMNS.items()
+                       if column in predictions_df.columns]
+            if not matches:
+                raise ValueError("Cannot infer entity id column; pass entity_type or entity_id_column")
+            entity_type, entity_id_column = matches[0]
+    elif entity_type is None:
+        raise ValueError("entity_type is required with a custom entity_id_column")
+
+    entity_ids = predictions_df[entity_id_column].astype(int).tolist()
+
+    if confidence_column in predictions_df.columns:
+        confidences = predictions_df[confidence_column].astype(float)
+        confidences = confidences.astype(object).where(np.isfinite(confidences), None).tolist()
+        values_df = predictions_df.drop(columns=[entity_id_column, confidence_column])
+    else:
+        confidences = [None] * len(predictions_df)
+        values_df = predictions_df.drop(columns=[entity_id_column])
+
+    documents = dumps_records(values_df)
+
+    return [
+        (entity_id, entity_type, document, confidence)
+        for entity_id, document, confidence in zip(entity_ids, documents, confidences)
+    ]
+
+
+class PredictionWriter:
+    """
+    Write-behind buffer for model predictions
+
+    Predictions are encoded as they are added and written in bulk once
+    max_rows are buffered, or by a background thread once the oldest
+    buffered row is max_seconds old. Call flush() or close(), or use it as
+    a context manager, to write whatever is left. Safe to share between
+    threads: rows are added while a write is in progress, and one write
+    runs at a time.
+
+    Rows from a failed write are kept for the next one, up to
+    max_retained_rows; beyond that the oldest are dropped (and logged).
+
+    Example:
+        with FeatureStore() as fs, PredictionWriter(fs, 'price_anomaly_detector', 'v1') as writer:
+            for chunk in chunks:
+                writer.add(detector.predict_features(chunk))
+    """
+
+    def __init__(self, feature_store: FeatureStore, model_name: str, model_version: str,
+                 entity_type: Optional[str] = None,
+                 max_rows: int = PREDICTION_BUFFER_ROWS,
+                 max_seconds: float = PREDICTION_BUFFER_SECONDS,
+                 max_retained_rows: int = PREDICTION_BUFFER_MAX_RETAINED_ROWS):
+        self.feature_store = feature_store
+        self.model_name = model_name
+        self.model_version = model_version
+        self.entity_type = entity_type
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.max_retained_rows = max_retained_rows
+        self.dropped_rows = 0
+        self._rows = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_when_due,
+                                       name=f'prediction-writer-{model_name}', daemon=True)
+        self._timer.start()
+
+    def add(self, predictions_df: pd.DataFrame, confidence_column: str = 'confidence'):
+        """Buffer a DataFrame of predictions"""
+        rows = prediction_rows(predictions_df, self.entity_type,
+                               confidence_column=confidence_column)
+        self._append(rows)
+
+    def add_one(self, entity_id: int, entity_type: str, prediction_value: Dict,
+                confidence_score: Optional[float] = None):
+        """Buffer a single prediction"""
+        document = dumps(prediction_value)
+        self._append([(int(entity_id), entity_type, document, confidence_score)])
+
+    def _append(self, rows: List[tuple]):
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            due = len(self._rows) >= self.max_rows
+
+        if due:
+            # If a write is already running, these rows go with the next one
+            self._flush(wait=False)
+
+    def _flush_when_due(self):
+        """Background thread: flush once the oldest buffered row is max_seconds old"""
+        wait = self.max_seconds
+        while not self._closed.wait(wait):
+            with self._lock:
+                oldest = self._oldest
+            age = time.monotonic() - oldest if oldest is not None else 0.0
+            if oldest is not None and age >= self.max_seconds:
+                try:
+                    self._flush(wait=True)
+                except Exception as e:
+                    logger.error(f"Background flush of {self.model_name} predictions failed: {e}")
+                wait = self.max_seconds
+            else:
+                wait = self.max_seconds - age
+
+    def _flush(self, wait: bool) -> int:
+        if not self._write_lock.acquire(blocking=wait):
+            return 0
+        try:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._oldest = None
+            if not rows:
+                return 0
+
+            # Write without holding _lock, so producers keep adding meanwhile
+            try:
+                self.feature_store.insert_prediction_rows(self.model_name, self.model_version, rows)
+            except Exception:
+                # Keep the rows so a later flush can retry, within the cap
+                with self._lock:
+                    self._rows = rows + self._rows
+                    overflow = len(self._rows) - self.max_retained_rows
+                    if overflow > 0:
+                        del self._rows[:overflow]
+                        self.dropped_rows += overflow
+                        logger.error(f"Dropped {overflow} unwritten {self.model_name} predictions "
+                                     f"(more than {self.max_retained_rows} awaiting retry)")
+                    self._oldest = time.monotonic()
+                raise
+            return len(rows)
+        finally:
+            self._write_lock.release()
+
+    def flush(self) -> int:
+        """Write all buffered predictions; returns the number written"""
+        return self._flush(wait=True)
+
+    def close(self):
+        """Stop the background flush and write what is left"""
+        self._closed.set()
+        self._timer.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _price_partials(po_line_items_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce a chunk of line items to mergeable per-item price statistics
+
+    Prices are summarised as (price_count, price_mean, price_m2) so that
+    partials from different chunks can be merged exactly (Chan et al.).
+    """
+    df = po_line_items_df[['pricebook_item_id', 'unit_price', 'quantity', 'created_at']]
+    grouped = df.groupby('pricebook_item_id')
+    prices = grouped['unit_price']
+
+    partials = pd.DataFrame({
+        'purchase_count': grouped.size(),
+        'price_count': prices.count(),
+        'price_mean': prices.mean(),
+        'price_m2': prices.var(ddof=0) * prices.count(),
+        'min_price': prices.min(),
+        'max_price': prices.max(),
+        'total_quantity': grouped['quantity'].sum(),
+        'first_purchase_at': grouped['created_at'].min(),
+        'last_purchase_at': grouped['created_at'].max(),
+    })
+
+    # Items whose prices are all missing contribute rows but no price moments
+    partials[['price_mean', 'price_m2']] = partials[['price_mean', 'price_m2']].fillna(0.0)
+    return partials
+
+
+def _merge_price_partials(partials: List[pd.DataFrame]) -> pd.DataFrame:
+    """Merge per-chunk price partials into one row per pricebook item"""
+    parts = pd.concat(partials)
+    grouped = parts.groupby(level=0)
+
+    price_count = grouped['price_count'].sum()
+    weighted_sum = (parts['price_mean'] * parts['price_count']).groupby(level=0).sum()
+    price_mean = (weighted_sum / price_count.where(price_count > 0)).fillna(0.0)
+
+    delta = parts['price_mean'] - price_mean.reindex(parts.index).values
+    price_m2 = (parts['price_m2'] + parts['price_count'] * delta ** 2).groupby(level=0).sum()
+
+    return pd.DataFrame({
+        'purchase_count': grouped['purchase_count'].sum(),
+        'price_count': price_count,
+        'price_mean': price_mean,
+        'price_m2': price_m2,
+        'min_price': grouped['min_price'].min(),
+        'max_price': grouped['max_price'].max(),
+        'total_quantity': grouped['total_quantity'].sum(),
+        'first_purchase_at': grouped['first_purchase_at'].min(),
+        'last_purchase_at': grouped['last_purchase_at'].max(),
+    })
+
+
+def _price_aggregates(po_line_items_df: pd.DataFrame) -> pd.DataFrame:
+    """Compute per-item price aggregates with a single groupby"""
+    df = po_line_items_df[['pricebook_item_id', 'unit_price', 'quantity', 'created_at']]
+    aggregates_df = df.groupby('pricebook_item_id').agg(
+        purchase_count=('unit_price', 'size'),
+        price_count=('unit_price', 'count'),
+        mean_price=('unit_price', 'mean'),
+        std_price=('unit_price', 'std'),
+        min_price=('unit_price', 'min'),
+        max_price=('unit_price', 'max'),
+        total_quantity=('quantity', 'sum'),
+        first_purchase_at=('created_at', 'min'),
+        last_purchase_at=('created_at', 'max'),
+    )
+    return aggregates_df.reset_index()
+
+
+def _aggregates_from_partials(partials: pd.DataFrame) -> pd.DataFrame:
+    """Convert merged price partials into per-item price aggregates"""
+    price_count = partials['price_count']
+    return pd.DataFrame({
+        'pricebook_item_id': partials.index,
+        'purchase_count': partials['purchase_count'].values,
+        'price_count': price_count.values,
+        'mean_price': partials['price_mean'].values,
+        # Sample standard deviation; undefined (NaN) for a single price
+        'std_price': np.sqrt(partials['price_m2'] / (price_count - 1).where(price_count > 1)).values,
+        'min_price': partials['min_price'].values,
+        'max_price': partials['max_price'].values,
+        'total_quantity': partials['total_quantity'].values,
+        'first_purchase_at': partials['first_purchase_at'].values,
+        'last_purchase_at': partials['last_purchase_at'].values,
+    })
+
+
+def price_features_from_aggregates(aggregates_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build price features from per-item price aggregates
+
+    aggregates_df has one row per pricebook item with purchase_count,
+    price_count, mean_price, std_price (sample std, NULL/NaN for a single
+    price), min_price, max_price, total_quantity, first_purchase_at and
+    last_purchase_at, as returned by
+    DatabaseExtractor.extract_price_feature_aggregates(). The output matches
+    compute_price_features on the same line items.
+    """
+    aggregates_df = aggregates_df[
+        aggregates_df['pricebook_item_id'].notna() & (aggregates_df['price_count'] > 0)
+    ].sort_values('pricebook_item_id')
+    now = datetime.now()
+
+    mean_price = aggregates_df['mean_price'].astype(float)
+    std_raw = aggregates_df['std_price'].astype(float)
+
+    features_df = pd.DataFrame({
+        'pricebook_item_id': aggregates_df['pricebook_item_id'].astype(int).values,
+        'mean_price': mean_price.values,
+        'std_price': std_raw.fillna(0.0).values,
+        'min_price': aggregates_df['min_price'].astype(float).values,
+        'max_price': aggregates_df['max_price'].astype(float).values,
+        'price_range': (aggregates_df['max_price'] - aggregates_df['min_price']).astype(float).values,
+        'coefficient_variation': (std_raw / mean_price).where(mean_price > 0, 0.0).values,
+        'purchase_count': aggregates_df['purchase_count'].astype(int).values,
+        'total_quantity': aggregates_df['total_quantity'].astype(float).values,
+        'days_since_first_purchase': (now - pd.to_datetime(aggregates_df['first_purchase_at'])).dt.days.values,
+        'days_since_last_purchase': (now - pd.to_datetime(aggregates_df['last_purchase_at'])).dt.days.values,
+    })
+    return features_df
+
+
+def compute_price_features(po_line_items_df: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> pd.DataFrame:
     """
     Compute price-related features from purchase order line items
 
+    Accepts a single DataFrame or an iterable of DataFrame chunks (e.g. from
+    DatabaseExtractor.extract_purchase_order_line_items(chunk_size=...)).
+    Chunks are reduced to per-item partial statistics as they arrive, so the
+    full set of line items is never held in memory. A single DataFrame is
+    aggregated in one vectorized groupby.
+
     Features:
     - mean_price: Average unit price per item
     - std_price: Price standard deviation
@@ -257,39 +1525,100 @@ def compute_price_features(po_line_items_df: pd.DataFrame) -> pd.DataFrame:
     """
     logger.info("Computing price features")
 
-    features = []
+    if not isinstance(po_line_items_df, pd.DataFrame):
+        merged = None
+        for chunk in po_line_items_df:
+            if len(chunk) == 0:
+                continue
+            partials = _price_partials(chunk)
+            merged = partials if merged is None else _merge_price_partials([merged, partials])
 
-    # Group by pricebook item
-    for item_id, group in po_line_items_df.groupby('pricebook_item_id'):
-        if pd.isna(item_id):
-            continue
+        if merged is None:
+            logger.info("Computed features for 0 items")
+            return pd.DataFrame()
 
-        prices = group['unit_price'].dropna()
+        features_df = price_features_from_aggregates(_aggregates_from_partials(merged))
+        logger.info(f"Computed features for {len(features_df)} items")
+        return features_df
+
+    features_df = price_features_from_aggregates(_price_aggregates(po_line_items_df))
+    logger.info(f"Computed features for {len(features_df)} items")
+    return features_df
 
-        if len(prices) == 0:
-            continue
 
-        feature = {
-            'pricebook_item_id': int(item_id),
-            'mean_price': float(prices.mean()),
-            'std_price': float(prices.std()) if len(prices) > 1 else 0.0,
-            'min_price': float(prices.min()),
-            'max_price': float(prices.max()),
-            'price_range': float(prices.max() - prices.min()),
-            'coefficient_variation': float(prices.std() / prices.mean()) if prices.mean() > 0 else 0.0,
-            'purchase_count': len(group),
-            'total_quantity': float(group['quantity'].sum()),
-            'days_since_first_purchase': (datetime.now() - pd.to_datetime(group['created_at'].min())).days,
-            'days_since_last_purchase': (datetime.now() - pd.to_datetime(group['created_at'].max())).days,
-        }
+def refresh_price_stats(feature_store: Optional[FeatureStore] = None,
+                        chunk_size: int = EXTRACTION_CHUNK_SIZE) -> int:
+    """
+    Merge line items added since the last refresh into the price statistics
 
-        features.append(feature)
+    Line items are read from SNAPSHOT_OVERLAP_MINUTES before the latest
+    created_at already merged, so rows that committed late (after a newer
+    row was merged) are still picked up; ids merged within that window
+    are recorded and skipped, so each line item is counted once. Recorded
+    ids older than the window are pruned on every refresh. Edited or
+    deleted line items are not picked up; call
+    FeatureStore.rebuild_price_stats() first to recompute from scratch.
 
-    features_df = pd.DataFrame(features)
-    logger.info(f"Computed features for {len(features_df)} items")
+    Returns:
+        Number of line items merged
+    """
+    from data.extractors import DatabaseExtractor
+
+    overlap = timedelta(minutes=SNAPSHOT_OVERLAP_MINUTES)
+    fs = feature_store or FeatureStore()
+    num_line_items = 0
+    try:
+        watermark = fs.get_price_stats_watermark()
+        created_since = None
+        merged_ids: Set[int] = set()
+        if watermark is not None:
+            created_since = watermark - overlap
+            merged_ids = fs.get_merged_line_item_ids(created_since)
+
+        with DatabaseExtractor() as extractor:
+            for chunk in extractor.extract_line_items_since(created_since, chunk_size):
+                chunk = chunk[~chunk['id'].isin(merged_ids)]
+                if len(chunk) == 0:
+                    continue
+                # Line items arrive oldest first: only the newest are re-read next time
+                chunk_latest = chunk['created_at'].max()
+                watermark = chunk_latest if watermark is None else max(watermark, chunk_latest)
+                fs.update_price_stats(chunk, record_since=watermark - overlap)
+                num_line_items += len(chunk)
+
+        if watermark is not None:
+            fs.prune_merged_line_items(watermark - overlap)
+    finally:
+        if feature_store is None:
+            fs.close()
+
+    logger.info(f"Merged {num_line_items} line items into price stats")
+    return num_line_items
+
+
+def compute_price_features_from_stats(feature_store: FeatureStore,
+                                      item_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """
+    Compute price features from the running price statistics
+
+    Same columns as compute_price_features, without reading line items.
+    The statistics cover each item's full purchase history, so the values
+    match compute_price_features over all of an item's line items, not
+    over the LOOKBACK_DAYS window it is normally given: items with older
+    purchases get different mean/std/min/max, counts and first purchase.
+    """
+    features_df = price_features_from_aggregates(feature_store.get_price_stats(item_ids))
+    logger.info(f"Computed features for {len(features_df)} items from price stats")
     return features_df
 
 
+def _column(df: pd.DataFrame, name: str, default) -> pd.Series:
+    """A column of df, or default for every row if it is missing (like Series.get)"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index)
+
+
 def compute_supplier_features(suppliers_df: pd.DataFrame) -> pd.DataFrame:
     """
     Compute supplier performance features
@@ -303,22 +1632,20 @@ def compute_supplier_features(suppliers_df: pd.DataFrame) -> pd.DataFrame:
     """
     logger.info("Computing supplier features")
 
-    features = []
-
-    for _, supplier in suppliers_df.iterrows():
-        feature = {
-            'supplier_id': int(supplier['id']),
-            'total_po_value': float(supplier.get('total_po_value', 0)),
-            'avg_po_value': float(supplier.get('avg_po_value', 0)),
-            'total_purchase_orders': int(supplier.get('total_purchase_orders', 0)),
-            'response_rate': float(supplier.get('response_rate', 0)),
-            'rating': int(supplier.get('rating', 0)),
-            'is_active': bool(supplier.get('is_active', True))
-        }
+    if len(suppliers_df) == 0:
+        # Like the row-by-row version: no rows, no columns (and no 'id' needed)
+        return pd.DataFrame()
 
-        features.append(feature)
+    features_df = pd.DataFrame({
+        'supplier_id': suppliers_df['id'].astype(int).values,
+        'total_po_value': _column(suppliers_df, 'total_po_value', 0).astype(float).values,
+        'avg_po_value': _column(suppliers_df, 'avg_po_value', 0).astype(float).values,
+        'total_purchase_orders': _column(suppliers_df, 'total_purchase_orders', 0).astype(int).values,
+        'response_rate': _column(suppliers_df, 'response_rate', 0).astype(float).values,
+        'rating': _column(suppliers_df, 'rating', 0).astype(int).values,
+        'is_active': _column(suppliers_df, 'is_active', True).astype(bool).values
+    })
 
-    features_df = pd.DataFrame(features)
     logger.info(f"Computed features for {len(features_df)} suppliers")
     return features_df
 
@@ -337,27 +1664,27 @@ def compute_job_features(constructions_df: pd.DataFrame) -> pd.DataFrame:
     """
     logger.info("Computing job features")
 
-    features = []
+    if len(constructions_df) == 0:
+        return pd.DataFrame()
 
-    for _, job in constructions_df.iterrows():
-        contract_value = float(job.get('contract_value', 0))
-        total_po_value = float(job.get('total_po_value', 0))
+    contract_value = _column(constructions_df, 'contract_value', 0).astype(float)
+    total_po_value = _column(constructions_df, 'total_po_value', 0).astype(float)
 
-        feature = {
-            'construction_id': int(job['id']),
-            'contract_value': contract_value,
-            'live_profit': float(job.get('live_profit', 0)),
-            'profit_percentage': float(job.get('profit_percentage', 0)),
-            'total_po_value': total_po_value,
-            'purchase_orders_count': int(job.get('purchase_orders_count', 0)),
-            'po_to_contract_ratio': total_po_value / contract_value if contract_value > 0 else 0.0,
-            'stage': str(job.get('stage', '')),
-            'status': str(job.get('status', ''))
-        }
+    with np.errstate(divide='ignore', invalid='ignore'):
+        po_to_contract_ratio = np.where(contract_value > 0, total_po_value / contract_value, 0.0)
 
-        features.append(feature)
+    features_df = pd.DataFrame({
+        'construction_id': constructions_df['id'].astype(int).values,
+        'contract_value': contract_value.values,
+        'live_profit': _column(constructions_df, 'live_profit', 0).astype(float).values,
+        'profit_percentage': _column(constructions_df, 'profit_percentage', 0).astype(float).values,
+        'total_po_value': total_po_value.values,
+        'purchase_orders_count': _column(constructions_df, 'purchase_orders_count', 0).astype(int).values,
+        'po_to_contract_ratio': po_to_contract_ratio,
+        'stage': _column(constructions_df, 'stage', '').map(str).values,
+        'status': _column(constructions_df, 'status', '').map(str).values
+    })
 
-    features_df = pd.DataFrame(features)
     logger.info(f"Computed features for {len(features_df)} jobs")
     return features_df
 
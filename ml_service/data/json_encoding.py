@@ -0,0 +1,68 @@
+"""
+NaN-safe JSON encoding for features and predictions
+
+Shared by the feature store for every JSONB document it writes. Encoding
+uses orjson, which writes NaN and +/-inf as null and serializes numpy
+scalars directly, so DataFrames are encoded column by column without first
+converting each value to a Python object or walking each record to clean it.
+"""
+import orjson
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+from typing import Any, List
+
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    """Fallback for values orjson does not serialize natively"""
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> str:
+    """
+    Encode one document (e.g. a features or prediction dict)
+
+    NaN and +/-inf become null at any nesting depth.
+    """
+    return orjson.dumps(obj, default=_default, option=JSON_OPTIONS).decode()
+
+
+def _column_values(series: pd.Series) -> np.ndarray:
+    """Column values ready for orjson, with missing values as null"""
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'fiubO':
+        # NaN/inf in float columns are written as null by orjson itself
+        return series.to_numpy()
+    # Timestamps, nullable ints/bools, categoricals, ...
+    return series.to_numpy(dtype=object, na_value=None)
+
+
+def dumps_records(df: pd.DataFrame) -> List[str]:
+    """
+    Encode each DataFrame row as a JSON object
+
+    Equivalent to json.dumps(clean_nan_for_json(record)) for every record
+    of df.to_dict('records'), but missing values are handled once per
+    column and numpy values are passed to the encoder as they are.
+    """
+    if len(df) == 0:
+        return []
+
+    keys = [str(column) for column in df.columns]
+    columns = [_column_values(df.iloc[:, position]) for position in range(df.shape[1])]
+
+    return [
+        orjson.dumps(dict(zip(keys, row)), default=_default, option=JSON_OPTIONS).decode()
+        for row in zip(*columns)
+    ]
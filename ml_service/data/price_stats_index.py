@@ -0,0 +1,205 @@
+"""
+In-memory index of per-item price statistics
+
+Holds price count, mean and standard deviation for every pricebook item in
+sorted numpy arrays, so single-price checks are answered with a binary
+search instead of a database query. The index is rebuilt from the feature
+store's running price statistics (or a bulk aggregate query) on a schedule
+or when notified, and swapped in atomically.
+"""
+import numpy as np
+import pandas as pd
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+LOOKBACK_DAYS = config.LOOKBACK_DAYS
+PRICE_STATS_REFRESH_SECONDS = config.PRICE_STATS_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _PriceStatsArrays:
+    """One immutable generation of the index"""
+
+    def __init__(self, item_ids: np.ndarray, price_count: np.ndarray,
+                 mean_price: np.ndarray, std_price: np.ndarray):
+        self.item_ids = item_ids
+        self.price_count = price_count
+        self.mean_price = mean_price
+        self.std_price = std_price
+
+
+class PriceStatsIndex:
+    """
+    Per-item price statistics held in compact, sorted numpy arrays
+
+    Lookups never touch the database. Call refresh() to rebuild from the
+    database, start() to rebuild every refresh_seconds in a background
+    thread, and notify() to trigger an early rebuild (e.g. after
+    refresh_price_stats()).
+
+    Args:
+        source: 'stats' to read FeatureStore.get_price_stats() (full
+            history), or 'aggregates' to run
+            DatabaseExtractor.extract_price_feature_aggregates() (the
+            LOOKBACK_DAYS window)
+        refresh_seconds: Background refresh interval
+    """
+
+    def __init__(self, source: str = 'stats',
+                 refresh_seconds: float = PRICE_STATS_REFRESH_SECONDS):
+        if source not in ('stats', 'aggregates'):
+            raise ValueError(f"Unknown price stats source: {source}")
+
+        self.source = source
+        self.refresh_seconds = refresh_seconds
+        self.loaded_at: Optional[float] = None
+        self._arrays = _PriceStatsArrays(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                                         np.empty(0), np.empty(0))
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._arrays.item_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index arrays"""
+        arrays = self._arrays
+        return (arrays.item_ids.nbytes + arrays.price_count.nbytes
+                + arrays.mean_price.nbytes + arrays.std_price.nbytes)
+
+    def load_frame(self, stats_df: pd.DataFrame):
+        """
+        Replace the index contents with per-item statistics
+
+        Args:
+            stats_df: pricebook_item_id, price_count, mean_price, std_price
+                (the FeatureStore.get_price_stats() columns)
+        """
+        stats_df = stats_df[stats_df['pricebook_item_id'].notna() & (stats_df['price_count'] > 0)]
+        stats_df = stats_df.sort_values('pricebook_item_id')
+
+        arrays = _PriceStatsArrays(
+            item_ids=stats_df['pricebook_item_id'].to_numpy(dtype=np.int64),
+            price_count=stats_df['price_count'].to_numpy(dtype=np.int64),
+            mean_price=stats_df['mean_price'].to_numpy(dtype=np.float64),
+            std_price=pd.to_numeric(stats_df['std_price']).to_numpy(dtype=np.float64),
+        )
+
+        # Readers see either the old or the new generation, never a mix
+        self._arrays = arrays
+        self.loaded_at = time.time()
+
+    def _fetch(self) -> pd.DataFrame:
+        if self.source == 'stats':
+            from data.feature_store import FeatureStore
+            with FeatureStore() as fs:
+                return fs.get_price_stats()
+
+        from data.extractors import DatabaseExtractor
+        with DatabaseExtractor() as extractor:
+            return extractor.extract_price_feature_aggregates(days_back=LOOKBACK_DAYS)
+
+    def refresh(self):
+        """Rebuild the index from the database"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            self.load_frame(self._fetch())
+            logger.info(f"Loaded price stats index: {len(self)} items "
+                        f"in {time.perf_counter() - start:.2f}s")
+
+    def lookup(self, item_id: int) -> Optional[Tuple[int, float, float]]:
+        """
+        Statistics for one item
+
+        Returns:
+            (price_count, mean_price, std_price), or None if the item is
+            not in the index. std_price is NaN for a single price.
+        """
+        arrays = self._arrays
+        position = np.searchsorted(arrays.item_ids, item_id)
+        if position == len(arrays.item_ids) or arrays.item_ids[position] != item_id:
+            return None
+        return (int(arrays.price_count[position]),
+                float(arrays.mean_price[position]),
+                float(arrays.std_price[position]))
+
+    def lookup_many(self, item_ids) -> pd.DataFrame:
+        """
+        Statistics for many items at once
+
+        Returns:
+            DataFrame aligned with item_ids: found, price_count, mean_price,
+            std_price (zero count and NaN statistics where not found)
+        """
+        arrays = self._arrays
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+
+        if len(arrays.item_ids) == 0:
+            found = np.zeros(len(item_ids), dtype=bool)
+            positions = np.zeros(len(item_ids), dtype=np.int64)
+            arrays = _PriceStatsArrays(np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64),
+                                       np.full(1, np.nan), np.full(1, np.nan))
+        else:
+            positions = np.minimum(np.searchsorted(arrays.item_ids, item_ids),
+                                   len(arrays.item_ids) - 1)
+            found = arrays.item_ids[positions] == item_ids
+
+        return pd.DataFrame({
+            'found': found,
+            'price_count': np.where(found, arrays.price_count[positions], 0),
+            'mean_price': np.where(found, arrays.mean_price[positions], np.nan),
+            'std_price': np.where(found, arrays.std_price[positions], np.nan),
+        })
+
+    def notify(self):
+        """Request an early refresh (synchronous if the background thread isn't running)"""
+        if self._thread is not None and self._thread.is_alive():
+            self._wakeup.set()
+        else:
+            self.refresh()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.refresh_seconds)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the previous generation
+                logger.error(f"Price stats index refresh failed: {e}")
+
+    def start(self, load: bool = True):
+        """
+        Refresh in a background thread every refresh_seconds
+
+        Args:
+            load: Load the index before returning
+        """
+        if load:
+            self.refresh()
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='price-stats-index', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
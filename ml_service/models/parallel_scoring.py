@@ -0,0 +1,145 @@
+"""
+Parallel model scoring with a process pool
+
+Splits a feature matrix into row slices and scores them across worker
+processes. Scoring is row-independent for the models here, so results are
+identical to single-process scoring.
+
+Where the platform can fork, workers are forked from the process that
+already holds the loaded estimator and inherit it: its arrays stay in
+pages shared copy-on-write with the parent until something writes to
+them, and no worker reads or unpickles the model file. Where processes
+can't be forked, scoring runs in the calling process instead: spawned
+workers would each unpickle a private copy of the model (tree arrays are
+copied on load even from a memory-mapped file).
+"""
+import numpy as np
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+from typing import Dict, List, Sequence
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+SCORING_WORKERS = config.SCORING_WORKERS
+SCORING_SLICES_PER_WORKER = config.SCORING_SLICES_PER_WORKER
+
+logger = logging.getLogger(__name__)
+
+# Estimators of open scorers, by scorer key; forked workers find theirs here
+_fork_estimators: Dict[int, object] = {}
+_scorer_keys = count()
+
+# Estimator used by this worker process (see _init_worker)
+_worker_estimator = None
+
+
+def _init_worker(key: int):
+    """Take the estimator inherited from the parent process"""
+    global _worker_estimator
+    _worker_estimator = _fork_estimators[key]
+
+    # Parallelism comes from the pool; don't start threads inside workers
+    if hasattr(_worker_estimator, 'n_jobs'):
+        _worker_estimator.n_jobs = 1
+
+
+def _worker_pid(_) -> int:
+    return os.getpid()
+
+
+def _score_slice(methods: Sequence[str], X: np.ndarray) -> List[np.ndarray]:
+    return [getattr(_worker_estimator, method)(X) for method in methods]
+
+
+class ParallelScorer:
+    """
+    Score an estimator across a pool of worker processes
+
+    The workers are started when the scorer is created and inherit the
+    estimator, so create the scorer before starting threads in the calling
+    process. Where fork is unavailable no workers are started and the
+    estimator is called in-process.
+
+    Args:
+        estimator: Loaded estimator (the model's .model)
+        workers: Number of worker processes
+        slices_per_worker: Row slices per worker; more slices balance load
+            better at the cost of more inter-process messages
+
+    Example:
+        with ParallelScorer(detector.model, workers=8) as scorer:
+            predictions = detector.predict_features(features_df, scorer=scorer)
+    """
+
+    def __init__(self, estimator, workers: int = SCORING_WORKERS,
+                 slices_per_worker: int = SCORING_SLICES_PER_WORKER):
+        self.workers = workers
+        self.slices_per_worker = slices_per_worker
+        self.forked = 'fork' in multiprocessing.get_all_start_methods()
+        self._estimator = estimator
+        self._executor = None
+
+        if not self.forked:
+            logger.warning("Worker processes can't be forked here; scoring in-process")
+            return
+
+        self._key = next(_scorer_keys)
+        _fork_estimators[self._key] = estimator
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(self._key,)
+        )
+
+        # Start every worker now, while the estimator is registered
+        try:
+            list(self._executor.map(_worker_pid, range(workers)))
+        except Exception:
+            self.close()
+            raise
+        logger.info(f"Started {workers} scoring workers")
+
+    def score(self, X: np.ndarray, methods: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Call estimator methods (e.g. 'predict', 'score_samples') on X in parallel
+
+        Returns:
+            method name -> results for all rows, in row order
+        """
+        X = np.asarray(X)
+        if len(X) == 0:
+            return {method: np.empty(0) for method in methods}
+        if self._executor is None:
+            return {method: getattr(self._estimator, method)(X) for method in methods}
+
+        num_slices = min(len(X), self.workers * self.slices_per_worker)
+        slices = np.array_split(X, num_slices)
+
+        results = list(self._executor.map(_score_slice, [methods] * num_slices, slices))
+        return {
+            method: np.concatenate([result[i] for result in results])
+            for i, method in enumerate(methods)
+        }
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.score(X, ['predict'])['predict']
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        return self.score(X, ['score_samples'])['score_samples']
+
+    def close(self):
+        """Shut the worker processes down"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            _fork_estimators.pop(self._key, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
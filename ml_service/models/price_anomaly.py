@@ -13,8 +13,9 @@ from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 import joblib
 import logging
+import psycopg2
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Iterable, Union
 import os
 
 import sys
@@ -23,12 +24,99 @@ import config
 MODELS_DIR = config.MODELS_DIR
 ISOLATION_FOREST_PARAMS = config.ISOLATION_FOREST_PARAMS
 MIN_SAMPLES_FOR_TRAINING = config.MIN_SAMPLES_FOR_TRAINING
+ANOMALY_SCORE_QUANTILES = config.ANOMALY_SCORE_QUANTILES
+MIN_OTHER_PRICES_FOR_LINE_ITEM_CHECK = config.MIN_OTHER_PRICES_FOR_LINE_ITEM_CHECK
 from data.extractors import DatabaseExtractor
-from data.feature_store import compute_price_features, FeatureStore
+from data.feature_store import compute_price_features, price_features_from_aggregates, FeatureStore
+from data.price_stats_index import PriceStatsIndex
+from models.parallel_scoring import ParallelScorer
 
 logger = logging.getLogger(__name__)
 
 
+def read_price_stats(item_ids: List[int]) -> Optional[pd.DataFrame]:
+    """
+    Running price statistics for items, or None if they were never built
+
+    The statistics table only exists once the feature store tables have
+    been created; until then callers fall back to the purchase history.
+    """
+    try:
+        with FeatureStore() as fs:
+            return fs.get_price_stats(item_ids)
+    except (psycopg2.errors.UndefinedTable, pd.errors.DatabaseError) as e:
+        # pandas wraps driver errors (and has already rolled back)
+        cause = e if isinstance(e, psycopg2.errors.UndefinedTable) else e.__cause__
+        if not isinstance(cause, psycopg2.errors.UndefinedTable):
+            raise
+        logger.warning(f"No running price statistics ({cause.diag.message_primary}); "
+                       f"scanning purchase history")
+        return None
+
+
+def price_check(new_price: float, mean_price: float, std_price: float,
+                num_prices: int) -> Dict:
+    """
+    Z-score check of a price against an item's price statistics
+
+    Flags prices more than 3 standard deviations from the mean; with no
+    spread (single or identical prices) any difference is flagged.
+    """
+    # Z-score based anomaly detection (simple heuristic)
+    if std_price > 0:
+        z_score = abs((new_price - mean_price) / std_price)
+        is_anomaly = z_score > 3  # 3 sigma rule
+        confidence = min(z_score / 3, 1.0)
+    else:
+        is_anomaly = abs(new_price - mean_price) > 0
+        confidence = 1.0 if is_anomaly else 0.0
+
+    return {
+        'is_anomaly': bool(is_anomaly),
+        'z_score': float(z_score) if std_price > 0 else 0.0,
+        'confidence': float(confidence),
+        'mean_price': float(mean_price),
+        'std_price': float(std_price),
+        'num_historical_prices': num_prices,
+        'price_deviation': float(new_price - mean_price),
+        'price_deviation_pct': float((new_price - mean_price) / mean_price * 100) if mean_price > 0 else 0.0
+    }
+
+
+def price_checks(new_prices, mean_prices, std_prices, num_prices) -> pd.DataFrame:
+    """
+    Vectorized price_check over arrays of prices and item statistics
+
+    Returns:
+        DataFrame with the price_check fields, one row per price
+    """
+    new_prices = np.asarray(new_prices, dtype=float)
+    mean_prices = np.asarray(mean_prices, dtype=float)
+    std_prices = np.asarray(std_prices, dtype=float)
+
+    deviation = new_prices - mean_prices
+    has_spread = std_prices > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_scores = np.where(has_spread, np.abs(deviation / std_prices), 0.0)
+        deviation_pct = np.where(mean_prices > 0, deviation / mean_prices * 100, 0.0)
+
+    # 3 sigma rule; with no spread any difference is flagged
+    is_anomaly = np.where(has_spread, z_scores > 3, np.abs(deviation) > 0)
+    confidence = np.where(has_spread, np.minimum(z_scores / 3, 1.0), is_anomaly.astype(float))
+
+    return pd.DataFrame({
+        'is_anomaly': is_anomaly,
+        'z_score': z_scores,
+        'confidence': confidence,
+        'mean_price': mean_prices,
+        'std_price': std_prices,
+        'num_historical_prices': np.asarray(num_prices, dtype=np.int64),
+        'price_deviation': deviation,
+        'price_deviation_pct': deviation_pct,
+    })
+
+
 class PriceAnomalyDetector:
     """
     Isolation Forest model for detecting price anomalies
@@ -37,10 +125,15 @@ class PriceAnomalyDetector:
     and flags purchases that fall outside this distribution.
     """
 
-    def __init__(self, model_version: str = "v1"):
+    def __init__(self, model_version: str = "v1",
+                 stats_index: Optional[PriceStatsIndex] = None):
         self.model_version = model_version
         self.model = None
+        # Optional in-memory price stats for detect_single_price
+        self.stats_index = stats_index
         self.scaler = StandardScaler()
+        # Training anomaly score quantiles, for batch-independent confidence
+        self.score_quantiles = None
         self.feature_names = [
             'mean_price',
             'std_price',
@@ -71,12 +164,13 @@ class PriceAnomalyDetector:
 
         return X
 
-    def train(self, po_line_items_df: pd.DataFrame) -> Dict:
+    def train(self, po_line_items_df: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> Dict:
         """
         Train Isolation Forest on historical purchase data
 
         Args:
-            po_line_items_df: DataFrame of purchase order line items
+            po_line_items_df: DataFrame of purchase order line items,
+                or an iterable of DataFrame chunks
 
         Returns:
             Dictionary with training metrics
@@ -85,7 +179,19 @@ class PriceAnomalyDetector:
 
         # Compute features
         features_df = compute_price_features(po_line_items_df)
+        return self.train_features(features_df)
 
+    def train_features(self, features_df: pd.DataFrame) -> Dict:
+        """
+        Train Isolation Forest on precomputed price features
+
+        Args:
+            features_df: DataFrame from compute_price_features() or
+                price_features_from_aggregates()
+
+        Returns:
+            Dictionary with training metrics
+        """
         if len(features_df) < MIN_SAMPLES_FOR_TRAINING:
             raise ValueError(
                 f"Insufficient data for training. "
@@ -111,6 +217,8 @@ class PriceAnomalyDetector:
         num_anomalies = (predictions == -1).sum()
         anomaly_rate = num_anomalies / len(predictions)
 
+        self.score_quantiles = np.quantile(anomaly_scores, np.linspace(0, 1, ANOMALY_SCORE_QUANTILES))
+
         metrics = {
             'model_version': self.model_version,
             'trained_at': datetime.now().isoformat(),
@@ -125,12 +233,13 @@ class PriceAnomalyDetector:
         logger.info(f"Training complete. Detected {num_anomalies} anomalies ({anomaly_rate:.2%})")
         return metrics
 
-    def predict(self, po_line_items_df: pd.DataFrame) -> pd.DataFrame:
+    def predict(self, po_line_items_df: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> pd.DataFrame:
         """
         Predict anomalies in new purchase data
 
         Args:
-            po_line_items_df: DataFrame of purchase order line items
+            po_line_items_df: DataFrame of purchase order line items,
+                or an iterable of DataFrame chunks
 
         Returns:
             DataFrame with predictions:
@@ -146,28 +255,50 @@ class PriceAnomalyDetector:
 
         # Compute features
         features_df = compute_price_features(po_line_items_df)
+        return self.predict_features(features_df)
+
+    def predict_features(self, features_df: pd.DataFrame,
+                         scorer: Optional[ParallelScorer] = None) -> pd.DataFrame:
+        """
+        Predict anomalies from precomputed price features
+
+        Args:
+            features_df: DataFrame from compute_price_features() or
+                price_features_from_aggregates()
+            scorer: Score on a pool of worker processes holding this
+                model's estimator (same results)
+
+        Returns:
+            DataFrame with predictions (see predict())
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train() first or load a trained model.")
 
         # Prepare features
         X = self.prepare_features(features_df)
 
+        if len(X) == 0:
+            return pd.DataFrame(columns=['pricebook_item_id', 'is_anomaly', 'anomaly_score', 'confidence'])
+
         # Scale features
         X_scaled = self.scaler.transform(X)
 
         # Predict
-        predictions = self.model.predict(X_scaled)
-        anomaly_scores = self.model.score_samples(X_scaled)
+        if scorer is not None:
+            scores = scorer.score(X_scaled, ['predict', 'score_samples'])
+            predictions, anomaly_scores = scores['predict'], scores['score_samples']
+        else:
+            predictions = self.model.predict(X_scaled)
+            anomaly_scores = self.model.score_samples(X_scaled)
 
         # Convert predictions to binary (1 = anomaly, 0 = normal)
         is_anomaly = (predictions == -1).astype(int)
 
-        # Compute confidence (normalize anomaly scores to 0-1)
-        # Lower scores = more anomalous, so invert for confidence
-        min_score = anomaly_scores.min()
-        max_score = anomaly_scores.max()
-        confidence = 1 - (anomaly_scores - min_score) / (max_score - min_score)
+        confidence = self.confidence(anomaly_scores)
 
         results_df = pd.DataFrame({
-            'pricebook_item_id': features_df['pricebook_item_id'].values,
+            # prepare_features may drop rows, so align ids on X's index
+            'pricebook_item_id': features_df.loc[X.index, 'pricebook_item_id'].values,
             'is_anomaly': is_anomaly,
             'anomaly_score': anomaly_scores,
             'confidence': confidence
@@ -178,10 +309,94 @@ class PriceAnomalyDetector:
 
         return results_df
 
+    def confidence(self, anomaly_scores: np.ndarray) -> np.ndarray:
+        """
+        Map anomaly scores to confidence (0-1, higher = more anomalous)
+
+        Confidence is the share of training scores above the score, read
+        off the quantiles saved at training time, so it is a fixed per-row
+        mapping: the same item gets the same confidence whether it is
+        scored alone, in chunks or in one batch.
+        """
+        anomaly_scores = np.asarray(anomaly_scores, dtype=float)
+
+        if self.score_quantiles is not None:
+            levels = np.linspace(0, 1, len(self.score_quantiles))
+            return 1 - np.interp(anomaly_scores, self.score_quantiles, levels)
+
+        # Models saved before calibration: normalize within the batch
+        # Lower scores = more anomalous, so invert for confidence
+        min_score = anomaly_scores.min() if len(anomaly_scores) else 0.0
+        score_range = anomaly_scores.max() - min_score if len(anomaly_scores) else 0.0
+        if score_range == 0:
+            return np.zeros(len(anomaly_scores))
+        return 1 - (anomaly_scores - min_score) / score_range
+
+    def score_line_items(self, po_line_items_df: pd.DataFrame,
+                         min_other_prices: int = MIN_OTHER_PRICES_FOR_LINE_ITEM_CHECK) -> pd.DataFrame:
+        """
+        Score each line item against the other purchases of the same item
+
+        Unlike predict(), which scores one aggregate row per pricebook
+        item, every line item gets its own z-score, computed against the
+        mean and sample std of the item's other prices (leave-one-out, so
+        an outlier does not inflate its own baseline). Group statistics
+        come from groupby().transform, in a single vectorized pass.
+
+        Args:
+            po_line_items_df: id, pricebook_item_id, unit_price
+            min_other_prices: Other prices of the item needed to score a
+                line item; with one, there is no spread to judge against
+
+        Returns:
+            DataFrame aligned with the input: line_item_id,
+            pricebook_item_id, unit_price and the price_check fields
+            (num_historical_prices counts the other prices). Line items
+            without a price or item, or with fewer than min_other_prices
+            other prices, are not scored (NaN z_score, not an anomaly);
+            those without a price or item also get NaN deviations.
+        """
+        item_ids = po_line_items_df['pricebook_item_id']
+        unit_prices = po_line_items_df['unit_price'].astype(float)
+        # Prices of line items without an item stay out of the statistics
+        prices = unit_prices.where(item_ids.notna())
+
+        grouped = prices.groupby(item_ids)
+        count = grouped.transform('count').fillna(0)
+        mean = grouped.transform('mean')
+        m2 = ((prices - mean) ** 2).groupby(item_ids).transform('sum')
+
+        # Remove each price from its group's moments (reverse Welford step)
+        other_count = count - prices.notna()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            other_mean = ((count * mean - prices) / other_count).where(other_count > 0)
+            other_m2 = (m2 - (prices - mean) * (prices - other_mean)).clip(lower=0)
+            other_std = np.sqrt(other_m2 / (other_count - 1)).where(other_count > 1)
+
+        results = price_checks(prices, other_mean, other_std, other_count)
+        unscored = (prices.isna() | (other_count < min_other_prices)).to_numpy()
+        results.loc[unscored, 'is_anomaly'] = False
+        results.loc[unscored, ['z_score', 'confidence']] = np.nan
+        results.loc[prices.isna().to_numpy(), ['price_deviation', 'price_deviation_pct']] = np.nan
+
+        results.insert(0, 'line_item_id', po_line_items_df['id'].to_numpy())
+        results.insert(1, 'pricebook_item_id', item_ids.to_numpy())
+        results.insert(2, 'unit_price', unit_prices.to_numpy())
+        results.index = po_line_items_df.index
+
+        logger.info(f"Scored {int(prices.notna().sum())} line items, "
+                    f"{int(results['is_anomaly'].sum())} anomalies")
+        return results
+
     def detect_single_price(self, item_id: int, new_price: float) -> Dict:
         """
         Check if a single price is anomalous for a given item
 
+        Uses the detector's stats_index when it has the item, otherwise
+        the item's running price statistics (see
+        FeatureStore.update_price_stats); the purchase history is only
+        scanned for items without statistics.
+
         Args:
             item_id: Pricebook item ID
             new_price: Price to check
@@ -194,45 +409,115 @@ class PriceAnomalyDetector:
             - mean_price (float)
             - std_price (float)
         """
-        # Extract historical data for this item
-        with DatabaseExtractor() as extractor:
-            history = extractor.get_item_purchase_history(pricebook_item_id=item_id)
-
-        if len(history) == 0:
-            logger.warning(f"No historical data for item {item_id}")
-            return {
-                'is_anomaly': False,
-                'anomaly_score': 0.0,
-                'confidence': 0.0,
-                'mean_price': None,
-                'std_price': None,
-                'message': 'No historical data available'
-            }
-
-        # Compute simple statistical check
-        prices = history['unit_price'].dropna()
-        mean_price = prices.mean()
-        std_price = prices.std()
-
-        # Z-score based anomaly detection (simple heuristic)
-        if std_price > 0:
-            z_score = abs((new_price - mean_price) / std_price)
-            is_anomaly = z_score > 3  # 3 sigma rule
-            confidence = min(z_score / 3, 1.0)
+        # In-memory statistics first: no database round trip
+        stats = self.stats_index.lookup(item_id) if self.stats_index is not None else None
+
+        if stats is not None:
+            num_prices, mean_price, std_price = stats
         else:
-            is_anomaly = abs(new_price - mean_price) > 0
-            confidence = 1.0 if is_anomaly else 0.0
-
-        return {
-            'is_anomaly': bool(is_anomaly),
-            'z_score': float(z_score) if std_price > 0 else 0.0,
-            'confidence': float(confidence),
-            'mean_price': float(mean_price),
-            'std_price': float(std_price),
-            'num_historical_prices': len(prices),
-            'price_deviation': float(new_price - mean_price),
-            'price_deviation_pct': float((new_price - mean_price) / mean_price * 100) if mean_price > 0 else 0.0
-        }
+            # Running statistics for this item, if they have been built
+            stats = read_price_stats([item_id])
+
+            if stats is not None and len(stats) > 0 and stats['price_count'].iloc[0] > 0:
+                num_prices = int(stats['price_count'].iloc[0])
+                mean_price = float(stats['mean_price'].iloc[0])
+                std_price = float(stats['std_price'].iloc[0]) if pd.notna(stats['std_price'].iloc[0]) else np.nan
+            else:
+                # Fall back to scanning the item's purchase history
+                with DatabaseExtractor() as extractor:
+                    history = extractor.get_item_purchase_history(pricebook_item_id=item_id)
+
+                if len(history) == 0:
+                    logger.warning(f"No historical data for item {item_id}")
+                    return {
+                        'is_anomaly': False,
+                        'anomaly_score': 0.0,
+                        'confidence': 0.0,
+                        'mean_price': None,
+                        'std_price': None,
+                        'message': 'No historical data available'
+                    }
+
+                # Compute simple statistical check
+                prices = history['unit_price'].dropna()
+                num_prices = len(prices)
+                mean_price = prices.mean()
+                std_price = prices.std()
+
+        return price_check(new_price, mean_price, std_price, num_prices)
+
+    def detect_prices(self, items: pd.DataFrame, item_id_column: str = 'item_id',
+                      price_column: str = 'price') -> pd.DataFrame:
+        """
+        Check many prices at once (e.g. an imported invoice or PO)
+
+        Statistics for all distinct items are gathered in bulk, in the
+        same order as detect_single_price: the stats_index, then one
+        running price stats query, then one history aggregate query for
+        the remaining items. Z-scores are computed vectorized.
+
+        Args:
+            items: DataFrame with an item id and a price per row
+            item_id_column: Column holding the pricebook item id
+            price_column: Column holding the price to check
+
+        Returns:
+            DataFrame aligned with items: item_id, price and the
+            detect_single_price fields (message is set for items without
+            historical prices, and for rows without an item id)
+        """
+        item_column = items[item_id_column]
+        has_id = item_column.notna().to_numpy()
+        # Rows without an item id are answered like items without history
+        item_ids = item_column.fillna(0).astype(np.int64).to_numpy()
+        prices = items[price_column].astype(float).to_numpy()
+        distinct_ids = np.unique(item_ids[has_id])
+
+        columns = ['pricebook_item_id', 'price_count', 'mean_price', 'std_price']
+        stats = pd.DataFrame(columns=columns)
+
+        if self.stats_index is not None and len(distinct_ids) > 0:
+            indexed = self.stats_index.lookup_many(distinct_ids)
+            indexed.insert(0, 'pricebook_item_id', distinct_ids)
+            stats = indexed.loc[indexed['found'], columns]
+
+        missing = np.setdiff1d(distinct_ids, stats['pricebook_item_id'].to_numpy(dtype=np.int64))
+        if len(missing) > 0:
+            stored = read_price_stats(missing.tolist())
+            if stored is not None:
+                stored = stored.loc[stored['price_count'] > 0, columns]
+                stats = pd.concat([stats, stored], ignore_index=True) if len(stats) > 0 else stored
+
+        missing = np.setdiff1d(distinct_ids, stats['pricebook_item_id'].to_numpy(dtype=np.int64))
+        if len(missing) > 0:
+            with DatabaseExtractor() as extractor:
+                history = extractor.extract_item_price_summaries(missing.tolist())
+            history = history.loc[history['price_count'] > 0, columns]
+            stats = pd.concat([stats, history], ignore_index=True) if len(stats) > 0 else history
+
+        stats = stats.astype({'pricebook_item_id': np.int64}).set_index('pricebook_item_id')
+        stats = stats.reindex(item_ids)
+        has_history = stats['price_count'].notna().to_numpy() & has_id
+
+        results = price_checks(prices, stats['mean_price'].to_numpy(dtype=float),
+                               stats['std_price'].to_numpy(dtype=float),
+                               stats['price_count'].fillna(0).to_numpy())
+        results.insert(0, 'item_id', item_ids if has_id.all() else item_column.to_numpy())
+        results.insert(1, 'price', prices)
+
+        # Same answer as detect_single_price for items without history
+        results.loc[~has_history, ['is_anomaly']] = False
+        results.loc[~has_history, ['z_score', 'confidence']] = 0.0
+        results.loc[~has_history, ['price_deviation', 'price_deviation_pct']] = np.nan
+        results['message'] = np.where(has_history, None, 'No historical data available')
+
+        if (~has_history & has_id).any():
+            logger.warning(f"No historical data for {len(np.unique(item_ids[~has_history & has_id]))} items")
+        if not has_id.all():
+            logger.warning(f"{int((~has_id).sum())} prices without an item id")
+
+        results.index = items.index
+        return results
 
     def save(self, filename: Optional[str] = None):
         """Save trained model to disk"""
@@ -240,7 +525,7 @@ class PriceAnomalyDetector:
             raise ValueError("No model to save. Train the model first.")
 
         if filename is None:
-            filename = f"price_anomaly_detector_{self.model_version}_{datetime.now().strftime('%Y%m%d')}.pkl"
+            filename = f"price_anomaly_detector_{self.model_version}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pkl"
 
         filepath = os.path.join(MODELS_DIR, filename)
 
@@ -249,6 +534,7 @@ class PriceAnomalyDetector:
             'scaler': self.scaler,
             'feature_names': self.feature_names,
             'model_version': self.model_version,
+            'score_quantiles': self.score_quantiles,
             'saved_at': datetime.now().isoformat()
         }
 
@@ -264,6 +550,11 @@ class PriceAnomalyDetector:
         self.scaler = model_data['scaler']
         self.feature_names = model_data['feature_names']
         self.model_version = model_data['model_version']
+        self.score_quantiles = model_data.get('score_quantiles')
+
+        if self.score_quantiles is None:
+            logger.warning("Model has no score calibration; confidence is relative to each batch. "
+                           "Retrain to calibrate.")
 
         logger.info(f"Model loaded from {filepath}")
         logger.info(f"Model version: {self.model_version}")
@@ -278,21 +569,16 @@ def train_and_save_model() -> Tuple[PriceAnomalyDetector, Dict]:
     """
     logger.info("Starting price anomaly model training pipeline")
 
-    # Extract data
+    # Aggregate line items in the database; only one row per item is transferred
     with DatabaseExtractor() as extractor:
-        po_line_items = extractor.extract_purchase_order_line_items()
-
-    logger.info(f"Extracted {len(po_line_items)} purchase order line items")
+        price_aggregates = extractor.extract_price_feature_aggregates()
 
-    if len(po_line_items) < MIN_SAMPLES_FOR_TRAINING:
-        raise ValueError(
-            f"Insufficient data for training. "
-            f"Need at least {MIN_SAMPLES_FOR_TRAINING} PO line items, got {len(po_line_items)}"
-        )
+    features_df = price_features_from_aggregates(price_aggregates)
+    logger.info(f"Computed price features for {len(features_df)} items")
 
     # Train model
     detector = PriceAnomalyDetector()
-    metrics = detector.train(po_line_items)
+    metrics = detector.train_features(features_df)
 
     # Save model
     filepath = detector.save()
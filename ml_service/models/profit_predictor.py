@@ -13,7 +13,7 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import logging
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 import joblib
 import os
 from datetime import datetime
@@ -25,6 +25,7 @@ MODELS_DIR = config.MODELS_DIR
 MIN_SAMPLES_FOR_TRAINING = config.MIN_SAMPLES_FOR_TRAINING
 from data.extractors import DatabaseExtractor
 from data.feature_store import compute_job_features
+from models.parallel_scoring import ParallelScorer
 
 logger = logging.getLogger(__name__)
 
@@ -147,12 +148,15 @@ class ProfitPredictor:
         logger.info(f"Training complete. Test R2: {test_score:.3f}, MAE: {mae:.2f}%")
         return metrics
 
-    def predict(self, constructions_df: pd.DataFrame) -> pd.DataFrame:
+    def predict(self, constructions_df: pd.DataFrame,
+                scorer: Optional[ParallelScorer] = None) -> pd.DataFrame:
         """
         Predict profit percentages for jobs
 
         Args:
             constructions_df: DataFrame of construction jobs
+            scorer: Score on a pool of worker processes holding this
+                model's estimator (same results)
 
         Returns:
             DataFrame with predictions
@@ -168,12 +172,21 @@ class ProfitPredictor:
         # Prepare features
         X, y = self.prepare_features(features_df)
 
+        if len(X) == 0:
+            logger.info("Generated predictions for 0 jobs")
+            return pd.DataFrame(columns=['construction_id', 'actual_profit_pct',
+                                         'predicted_profit_pct', 'prediction_error'])
+
         # Scale and predict
         X_scaled = self.scaler.transform(X)
-        predictions = self.model.predict(X_scaled)
+        if scorer is not None:
+            predictions = scorer.predict(X_scaled)
+        else:
+            predictions = self.model.predict(X_scaled)
 
         results_df = pd.DataFrame({
-            'construction_id': features_df['construction_id'].values,
+            # prepare_features drops jobs without a target, so align on X's index
+            'construction_id': features_df.loc[X.index, 'construction_id'].values,
             'actual_profit_pct': y.values,
             'predicted_profit_pct': predictions,
             'prediction_error': predictions - y.values
@@ -188,7 +201,7 @@ class ProfitPredictor:
             raise ValueError("No model to save.")
 
         if filename is None:
-            filename = f"profit_predictor_{self.model_version}_{datetime.now().strftime('%Y%m%d')}.pkl"
+            filename = f"profit_predictor_{self.model_version}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pkl"
 
         filepath = os.path.join(MODELS_DIR, filename)
 
@@ -0,0 +1,310 @@
+"""
+Model Registry
+
+A JSON manifest in MODELS_DIR records every published model file: its
+path, version, training metrics, feature names and SHA-256 checksum, and
+which one is current for each model. Training publishes models here;
+loaders resolve "the current model" through the manifest rather than by
+globbing filenames.
+
+Long-running processes hold a ModelHandle per model. A handle checks the
+manifest at most every MODEL_RELOAD_CHECK_SECONDS and loads a newly
+published model on a background thread, then swaps it in, so a server
+picks up retrained models without a restart or a stalled request.
+"""
+import fcntl
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import orjson
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+MODELS_DIR = config.MODELS_DIR
+MODEL_REGISTRY_PATH = config.MODEL_REGISTRY_PATH
+MODEL_REGISTRY_HISTORY = config.MODEL_REGISTRY_HISTORY
+MODEL_RELOAD_CHECK_SECONDS = config.MODEL_RELOAD_CHECK_SECONDS
+from data.json_encoding import dumps
+from models.price_anomaly import PriceAnomalyDetector
+from models.supplier_predictor import SupplierPricePredictor
+from models.profit_predictor import ProfitPredictor
+
+logger = logging.getLogger(__name__)
+
+MODEL_CLASSES = {
+    'price_anomaly_detector': PriceAnomalyDetector,
+    'supplier_predictor': SupplierPricePredictor,
+    'profit_predictor': ProfitPredictor,
+}
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_model_file(model_name: str, path: str, sha256: Optional[str] = None):
+    """
+    Load a saved model, verifying its checksum when one is given
+
+    Raises:
+        ValueError: Unknown model name, or the file does not match sha256
+    """
+    if model_name not in MODEL_CLASSES:
+        raise ValueError(f"Unknown model: {model_name} (expected one of {', '.join(MODEL_CLASSES)})")
+    if sha256 is not None and file_sha256(path) != sha256:
+        raise ValueError(f"Checksum mismatch for {path}: file changed since it was published")
+
+    model = MODEL_CLASSES[model_name]()
+    model.load(path)
+    return model
+
+
+class ModelRegistry:
+    """
+    Manifest of published models (MODEL_REGISTRY_PATH)
+
+    Reads are cached until the manifest file changes; publish() takes a
+    file lock and replaces the manifest atomically, so concurrent readers
+    always see a complete manifest.
+    """
+
+    def __init__(self, path: str = MODEL_REGISTRY_PATH):
+        self.path = path
+        self.models_dir = os.path.dirname(path)
+        self._cache_key = None
+        self._manifest: Dict = {'models': {}}
+
+    def _resolve_path(self, path: str) -> str:
+        # Paths inside the models directory are stored relative to it
+        return path if os.path.isabs(path) else os.path.join(self.models_dir, path)
+
+    def _read(self) -> Dict:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {'models': {}}
+
+        cache_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if cache_key != self._cache_key:
+            with open(self.path, 'rb') as f:
+                self._manifest = orjson.loads(f.read())
+            self._cache_key = cache_key
+        return self._manifest
+
+    def publish(self, model_name: str, model_path: str, model_version: str,
+                metrics: Optional[Dict] = None, feature_names: Optional[List[str]] = None) -> Dict:
+        """
+        Record a saved model file and make it the current one for its name
+
+        Args:
+            model_name: One of MODEL_CLASSES
+            model_path: File written by the model's save()
+            model_version: Model version string
+            metrics: Training metrics to keep with the entry
+            feature_names: Features the model was trained on
+
+        Returns:
+            The manifest entry
+        """
+        if model_name not in MODEL_CLASSES:
+            raise ValueError(f"Unknown model: {model_name} (expected one of {', '.join(MODEL_CLASSES)})")
+
+        model_path = os.path.abspath(model_path)
+        stored_path = (os.path.relpath(model_path, self.models_dir)
+                       if os.path.dirname(model_path) == os.path.abspath(self.models_dir) else model_path)
+        entry = {
+            'model_name': model_name,
+            'model_version': model_version,
+            'path': stored_path,
+            'sha256': file_sha256(model_path),
+            'size_bytes': os.path.getsize(model_path),
+            'feature_names': list(feature_names) if feature_names is not None else None,
+            'metrics': {key: value for key, value in (metrics or {}).items() if key != 'model_path'},
+            'published_at': datetime.now().isoformat(),
+        }
+
+        with open(self.path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            manifest = self._read()
+            models = dict(manifest.get('models', {}))
+            history = [entry] + models.get(model_name, {}).get('history', [])
+            models[model_name] = {'current': entry, 'history': history[:MODEL_REGISTRY_HISTORY]}
+
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                f.write(dumps({'updated_at': entry['published_at'], 'models': models}))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+
+        logger.info(f"Published {model_name} {model_version} ({stored_path})")
+        return entry
+
+    def current(self, model_name: str) -> Optional[Dict]:
+        """Current manifest entry for a model (with an absolute path), or None"""
+        entry = self._read().get('models', {}).get(model_name, {}).get('current')
+        if entry is None:
+            return None
+        return dict(entry, path=self._resolve_path(entry['path']))
+
+    def history(self, model_name: str) -> List[Dict]:
+        """Published entries for a model, newest first"""
+        return [dict(entry, path=self._resolve_path(entry['path']))
+                for entry in self._read().get('models', {}).get(model_name, {}).get('history', [])]
+
+    def current_path(self, model_name: str) -> str:
+        """
+        File of the current model
+
+        Falls back to the most recently saved file for models that were
+        never published (saved before the registry existed).
+        """
+        entry = self.current(model_name)
+        if entry is not None:
+            return entry['path']
+
+        paths = glob.glob(os.path.join(self.models_dir, f"{model_name}_*.pkl"))
+        if not paths:
+            raise FileNotFoundError(f"No saved {model_name} model in {self.models_dir}")
+        return max(paths, key=os.path.getmtime)
+
+
+class ModelHandle:
+    """
+    Cached handle to the current model for a name, reloaded when a new one is published
+
+    get() returns the loaded model straight away and, at most every
+    check_seconds, starts a background check of the registry; a newly
+    published model is loaded there (checksum verified) and swapped in for
+    later get() calls. If loading fails the previous model keeps serving.
+
+    Args:
+        model_name: One of MODEL_CLASSES
+        registry: Registry to follow (None: serve model as given, never reload)
+        model: Already loaded model (required without a registry)
+        check_seconds: Minimum time between registry checks
+    """
+
+    def __init__(self, model_name: str, registry: Optional[ModelRegistry] = None,
+                 model=None, check_seconds: float = MODEL_RELOAD_CHECK_SECONDS):
+        if registry is None and model is None:
+            raise ValueError("A ModelHandle needs a registry or a model")
+
+        self.model_name = model_name
+        self.registry = registry
+        self.check_seconds = check_seconds
+        self.entry: Optional[Dict] = None
+        self.loaded_at: Optional[datetime] = datetime.now() if model is not None else None
+        self._model = model
+        self._loaded_key = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reloader: Optional[threading.Thread] = None
+        self._reload_callbacks: List[Callable] = []
+
+        if self._model is None:
+            self._reload(initial=True)
+
+    def _current(self) -> Dict:
+        entry = self.registry.current(self.model_name)
+        if entry is None:
+            # Never published: follow the newest saved file
+            entry = {'model_name': self.model_name, 'path': self.registry.current_path(self.model_name),
+                     'sha256': None}
+        return entry
+
+    def _reload(self, initial: bool = False):
+        entry = self._current()
+        key = (entry['path'], entry['sha256'])
+        if key == self._loaded_key:
+            return
+
+        try:
+            model = load_model_file(self.model_name, entry['path'], entry['sha256'])
+            for callback in self._reload_callbacks:
+                callback(model)
+        except Exception as e:
+            if initial:
+                raise
+            logger.error(f"Keeping {self.model_name} {self.model.model_version}: "
+                         f"loading {entry['path']} failed: {e}")
+            # Don't retry the same file on every check
+            self._loaded_key = key
+            return
+
+        # Readers see either the old or the new model, never a half-loaded one
+        self._model = model
+        self.entry = entry
+        self._loaded_key = key
+        self.loaded_at = datetime.now()
+        if not initial:
+            logger.info(f"Reloaded {self.model_name}: now {model.model_version} from {entry['path']}")
+
+    def _check(self):
+        try:
+            self._reload()
+        except Exception as e:
+            logger.error(f"Checking the registry for {self.model_name} failed: {e}")
+        finally:
+            self._lock.release()
+
+    def get(self):
+        """The current model (never waits for a reload)"""
+        if self.registry is not None and time.monotonic() - self._checked_at >= self.check_seconds:
+            # One background check at a time; callers keep the loaded model meanwhile
+            if self._lock.acquire(blocking=False):
+                self._checked_at = time.monotonic()
+                self._reloader = threading.Thread(target=self._check, daemon=True,
+                                                  name=f'model-reload-{self.model_name}')
+                self._reloader.start()
+        return self._model
+
+    def wait_for_reload(self, timeout: Optional[float] = None):
+        """Wait for a registry check started by get() to finish"""
+        if self._reloader is not None:
+            self._reloader.join(timeout)
+
+    @property
+    def model(self):
+        """The loaded model, without checking for a newer one"""
+        return self._model
+
+    def on_reload(self, callback: Callable):
+        """
+        Call callback(model) on each newly loaded model before it is swapped in
+
+        Use it to attach shared state (e.g. a PriceStatsIndex) or to
+        rebuild anything derived from the model. It is also applied to the
+        model already loaded.
+        """
+        self._reload_callbacks.append(callback)
+        callback(self._model)
+
+
+_handles: Dict[str, ModelHandle] = {}
+_handles_lock = threading.Lock()
+
+
+def get_model_handle(model_name: str, registry: Optional[ModelRegistry] = None) -> ModelHandle:
+    """Process-wide cached handle to the current model for a name"""
+    with _handles_lock:
+        if model_name not in _handles:
+            _handles[model_name] = ModelHandle(model_name, registry or ModelRegistry())
+        return _handles[model_name]
+
+
+def load_current_model(model_name: str):
+    """The current model for a name, loaded once per process and kept up to date"""
+    return get_model_handle(model_name).get()
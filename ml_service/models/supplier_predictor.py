@@ -106,6 +106,14 @@ class SupplierPricePredictor:
 
             trends.append(trend)
 
+        if not trends:
+            logger.info("Analyzed trends for 0 suppliers")
+            return pd.DataFrame(columns=[
+                'supplier_id', 'avg_price_increase_pct', 'price_increase_frequency',
+                'num_price_changes', 'num_increases', 'num_decreases',
+                'days_since_last_change', 'trend_direction', 'risk_score'
+            ])
+
         trends_df = pd.DataFrame(trends)
         trends_df = trends_df.sort_values('risk_score', ascending=False)
 
@@ -161,7 +169,7 @@ class SupplierPricePredictor:
     def save(self, filename: str = None):
         """Save model to disk"""
         if filename is None:
-            filename = f"supplier_predictor_{self.model_version}_{datetime.now().strftime('%Y%m%d')}.pkl"
+            filename = f"supplier_predictor_{self.model_version}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pkl"
 
         filepath = os.path.join(MODELS_DIR, filename)
 
@@ -0,0 +1 @@
+# Model scoring server
@@ -0,0 +1,166 @@
+"""
+Micro-batching of concurrent scoring requests
+
+Requests handled on different threads are queued and scored together: the
+batching thread takes the first waiting request, collects whatever else
+arrives within a few milliseconds (up to a row limit), scores the combined
+rows in one vectorized call and hands each request back its own rows.
+"""
+import numpy as np
+import pandas as pd
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+SCORING_BATCH_MAX_ROWS = config.SCORING_BATCH_MAX_ROWS
+SCORING_BATCH_MAX_WAIT_MS = config.SCORING_BATCH_MAX_WAIT_MS
+SCORING_REQUEST_TIMEOUT_SECONDS = config.SCORING_REQUEST_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Queued to stop the batching thread
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Score rows from concurrent callers in shared batches
+
+    Args:
+        name: Name used in logs and thread names
+        score_fn: Scores a DataFrame of rows (with a RangeIndex) and returns
+            results indexed by input row position, in row order. Rows may
+            be left out (e.g. rows a model cannot score).
+        max_batch_rows: Stop collecting once a batch has this many rows
+        max_wait_ms: Stop collecting this long after the first request
+
+    Example:
+        batcher = MicroBatcher('price_check', score_fn)
+        results_df = batcher.submit(rows_df)  # from any thread
+    """
+
+    def __init__(self, name: str, score_fn: Callable[[pd.DataFrame], pd.DataFrame],
+                 max_batch_rows: int = SCORING_BATCH_MAX_ROWS,
+                 max_wait_ms: float = SCORING_BATCH_MAX_WAIT_MS):
+        self.name = name
+        self.score_fn = score_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_seconds = max_wait_ms / 1000
+
+        self.batches = 0
+        self.batched_requests = 0
+        self.batched_rows = 0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f'batcher-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, rows_df: pd.DataFrame,
+               timeout: Optional[float] = SCORING_REQUEST_TIMEOUT_SECONDS) -> pd.DataFrame:
+        """
+        Score rows as part of the next batch (blocks until scored)
+
+        Returns:
+            The score_fn results for these rows, indexed by position in
+            rows_df. Scoring errors are raised in the caller's thread.
+        """
+        future: Future = Future()
+        self._queue.put((rows_df, future))
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            # Still queued: the batching thread skips it. Already being
+            # scored: cancel() has no effect and the result is discarded.
+            future.cancel()
+            raise
+
+    def _collect(self, first: Tuple[pd.DataFrame, Future]) -> Tuple[List, bool]:
+        """Requests for one batch, and whether stop was requested meanwhile"""
+        batch = [first]
+        num_rows = len(first[0])
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        while num_rows < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+            num_rows += len(request[0])
+
+        return batch, False
+
+    def _score(self, batch: List[Tuple[pd.DataFrame, Future]]):
+        # Requests whose caller gave up (timed out) are skipped
+        batch = [(rows_df, future) for rows_df, future in batch
+                 if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        sizes = [len(rows_df) for rows_df, _ in batch]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+
+        try:
+            combined = pd.concat([rows_df for rows_df, _ in batch], ignore_index=True)
+            results = self.score_fn(combined)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Score requests one by one, so a bad request only fails itself
+            logger.warning(f"{self.name}: scoring a batch of {len(batch)} requests failed, "
+                           f"retrying them separately: {e}")
+            for rows_df, future in batch:
+                try:
+                    future.set_result(self.score_fn(rows_df.reset_index(drop=True)))
+                except Exception as request_error:
+                    future.set_exception(request_error)
+            return
+
+        self.batches += 1
+        self.batched_requests += len(batch)
+        self.batched_rows += int(offsets[-1])
+
+        # Results are in row order, so each request's rows are one slice
+        bounds = np.searchsorted(results.index.to_numpy(), offsets)
+        for i, (_, future) in enumerate(batch):
+            part = results.iloc[bounds[i]:bounds[i + 1]]
+            part.index = part.index - offsets[i]
+            future.set_result(part)
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is _STOP:
+                break
+
+            batch, stopping = self._collect(request)
+            self._score(batch)
+            if stopping:
+                break
+
+    def stats(self) -> Dict:
+        """Batch counters for metrics"""
+        return {
+            'batches': self.batches,
+            'mean_batch_requests': round(self.batched_requests / self.batches, 2) if self.batches else 0.0,
+            'mean_batch_rows': round(self.batched_rows / self.batches, 1) if self.batches else 0.0,
+            'queued_requests': self._queue.qsize(),
+        }
+
+    def stop(self):
+        """Score what is already queued, then stop the batching thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
@@ -0,0 +1,124 @@
+"""
+Client for the model scoring server
+
+Keeps one HTTP/1.1 connection open, so repeated calls skip connection
+setup. A client is not thread-safe; use one per thread.
+
+Example:
+    with ScoringClient() as client:
+        result = client.check_price(item_id=123, price=45.0)
+        predictions = client.score('profit', constructions_df.to_dict('records'))
+"""
+import http.client
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import orjson
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+SCORING_SERVER_HOST = config.SCORING_SERVER_HOST
+SCORING_SERVER_PORT = config.SCORING_SERVER_PORT
+SCORING_REQUEST_TIMEOUT_SECONDS = config.SCORING_REQUEST_TIMEOUT_SECONDS
+from data.json_encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = f"http://{SCORING_SERVER_HOST}:{SCORING_SERVER_PORT}"
+
+# endpoint -> model it needs (kept here so callers can list endpoints
+# without importing the server and its models)
+ENDPOINT_MODELS = {
+    'price_check': 'price_anomaly_detector',
+    'price_anomaly': 'price_anomaly_detector',
+    'profit': 'profit_predictor',
+    'supplier_risk': 'supplier_predictor',
+}
+
+
+class ScoringServerError(Exception):
+    """Error response from the scoring server"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class ScoringClient:
+    """
+    Call the scoring server's endpoints
+
+    Args:
+        url: Server URL (defaults to SCORING_SERVER_HOST/PORT)
+        timeout: Socket timeout in seconds
+    """
+
+    def __init__(self, url: str = DEFAULT_URL, timeout: float = SCORING_REQUEST_TIMEOUT_SECONDS):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._connection: Optional[http.client.HTTPConnection] = None
+
+    def _request(self, method: str, path: str, body: Optional[str] = None) -> Dict:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+
+        # Retry once on a fresh connection if the kept-alive one was closed
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                payload = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt == 1:
+                    raise
+
+        result = orjson.loads(payload)
+        if response.status != 200:
+            raise ScoringServerError(response.status, result.get('error', ''))
+        return result
+
+    def score(self, endpoint: str, rows: List[Dict]) -> List[Dict]:
+        """
+        Score rows on an endpoint (price_check, price_anomaly, profit,
+        supplier_risk)
+
+        Returns:
+            One prediction dict per scored row
+        """
+        return self._request('POST', f'/score/{endpoint}', dumps({'rows': rows}))['predictions']
+
+    def check_price(self, item_id: int, price: float) -> Dict:
+        """Server-side detect_single_price()"""
+        return self.score('price_check', [{'item_id': item_id, 'price': price}])[0]
+
+    def check_prices(self, items: List[Dict]) -> List[Dict]:
+        """Check many {'item_id': ..., 'price': ...} at once"""
+        return self.score('price_check', items)
+
+    def supplier_risk(self, supplier_ids: List[int]) -> List[Dict]:
+        return self.score('supplier_risk', [{'supplier_id': supplier_id} for supplier_id in supplier_ids])
+
+    def health(self) -> Dict:
+        return self._request('GET', '/health')
+
+    def metrics(self) -> Dict:
+        return self._request('GET', '/metrics')
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,129 @@
+"""
+Load test for the model scoring server
+
+Runs concurrent clients against a running server for a fixed time, each
+sending requests of synthetic rows back to back, and reports throughput,
+client-side latency percentiles and the server's micro-batch sizes.
+
+Usage:
+    python serving/load_test.py
+    python serving/load_test.py --endpoint price_anomaly --clients 32 --rows 10 --duration 30
+    python serving/load_test.py --url http://scoring-host:8500 --max-item-id 50000
+"""
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from serving.client import DEFAULT_URL, ENDPOINT_MODELS, ScoringClient, ScoringServerError
+
+
+def make_rows(endpoint: str, num_rows: int, max_id: int, rng: np.random.Generator) -> List[Dict]:
+    """Synthetic request rows for an endpoint"""
+    ids = rng.integers(1, max_id + 1, num_rows).tolist()
+
+    if endpoint == 'price_check':
+        prices = rng.gamma(2.0, 50.0, num_rows).round(2).tolist()
+        return [{'item_id': item_id, 'price': price} for item_id, price in zip(ids, prices)]
+
+    if endpoint == 'price_anomaly':
+        mean_price = rng.gamma(2.0, 50.0, num_rows)
+        std_price = mean_price * rng.uniform(0, 0.3, num_rows)
+        return [{
+            'pricebook_item_id': ids[i],
+            'mean_price': float(mean_price[i]),
+            'std_price': float(std_price[i]),
+            'price_range': float(std_price[i] * 4),
+            'coefficient_variation': float(std_price[i] / mean_price[i]),
+            'purchase_count': int(rng.integers(1, 50)),
+            'days_since_last_purchase': int(rng.integers(0, 365)),
+        } for i in range(num_rows)]
+
+    if endpoint == 'profit':
+        contract_value = rng.uniform(10_000, 500_000, num_rows)
+        return [{
+            'id': ids[i],
+            'contract_value': float(contract_value[i]),
+            'total_po_value': float(contract_value[i] * rng.uniform(0.3, 1.1)),
+            'purchase_orders_count': int(rng.integers(1, 40)),
+            'profit_percentage': float(rng.normal(20, 10)),
+        } for i in range(num_rows)]
+
+    return [{'supplier_id': supplier_id} for supplier_id in ids]
+
+
+def run_client(url: str, endpoint: str, num_rows: int, max_id: int, deadline: float,
+               seed: int, latencies: List[float], errors: List[str]):
+    rng = np.random.default_rng(seed)
+
+    with ScoringClient(url) as client:
+        while time.perf_counter() < deadline:
+            rows = make_rows(endpoint, num_rows, max_id, rng)
+            start = time.perf_counter()
+            try:
+                client.score(endpoint, rows)
+            except (ScoringServerError, OSError) as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the scoring server")
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINT_MODELS), default='price_check')
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent clients")
+    parser.add_argument('--rows', type=int, default=1, help="Rows per request")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    parser.add_argument('--max-item-id', type=int, default=10_000,
+                        help="Ids are drawn from 1..max (use ids that exist for realistic lookups)")
+    args = parser.parse_args(argv)
+
+    with ScoringClient(args.url) as client:
+        health = client.health()
+    print(f"Server {args.url}: {health['status']}")
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    deadline = time.perf_counter() + args.duration
+
+    threads = [
+        threading.Thread(target=run_client, args=(args.url, args.endpoint, args.rows,
+                                                  args.max_item_id, deadline, seed,
+                                                  latencies, errors))
+        for seed in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with ScoringClient(args.url) as client:
+        server_metrics = client.metrics()['endpoints'][args.endpoint]
+
+    print("\n" + "=" * 60)
+    print(f"LOAD TEST: {args.endpoint}, {args.clients} clients x {args.rows} rows/request")
+    print("=" * 60)
+    print(f"  requests: {len(latencies)} ok, {len(errors)} failed in {elapsed:.1f}s")
+    print(f"  throughput: {len(latencies) / elapsed:,.0f} requests/s, "
+          f"{len(latencies) * args.rows / elapsed:,.0f} rows/s")
+    if latencies:
+        p50, p90, p99 = np.percentile(np.array(latencies) * 1000, [50, 90, 99])
+        print(f"  client latency: p50 {p50:.2f}ms, p90 {p90:.2f}ms, p99 {p99:.2f}ms")
+    if 'mean_batch_requests' in server_metrics:
+        print(f"  server batches: {server_metrics['batches']}, "
+              f"{server_metrics['mean_batch_requests']} requests / "
+              f"{server_metrics['mean_batch_rows']} rows per batch")
+    if errors:
+        print(f"  first error: {errors[0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+"""
+Resident Model Scoring Server
+
+Loads the price anomaly, supplier and profit models once and serves
+predictions over HTTP, so callers don't pay for imports and unpickling on
+every request. Concurrent requests for the same model are scored together
+in micro-batches (see MicroBatcher). Models are followed through the model
+registry: a newly published model is picked up without a restart.
+
+Endpoints:
+    GET  /health                 Loaded models, their versions and checksums
+    GET  /metrics                Request counts, errors, latency p50/p99, batch sizes
+    POST /score/price_check      {"rows": [{"item_id": 1, "price": 12.5}, ...]}
+    POST /score/price_anomaly    {"rows": [<price features>, ...]}
+    POST /score/profit           {"rows": [<construction>, ...]}
+    POST /score/supplier_risk    {"rows": [{"supplier_id": 7}, ...]}
+
+Responses are {"model": ..., "model_version": ..., "predictions": [...]}.
+
+Usage:
+    python serving/server.py
+    python serving/server.py --port 8500 --no-stats-index
+"""
+import argparse
+import collections
+import logging
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+import orjson
+import pandas as pd
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+SCORING_SERVER_HOST = config.SCORING_SERVER_HOST
+SCORING_SERVER_PORT = config.SCORING_SERVER_PORT
+SCORING_LATENCY_WINDOW = config.SCORING_LATENCY_WINDOW
+from data.feature_store import compute_job_features
+from data.json_encoding import dumps
+from data.price_stats_index import PriceStatsIndex
+from models.registry import ModelHandle, get_model_handle
+from serving.batching import MicroBatcher
+from serving.client import ENDPOINT_MODELS
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> id field of each request row
+ENDPOINT_ID_FIELDS = {
+    'price_check': 'item_id',
+    'price_anomaly': 'pricebook_item_id',
+    'profit': 'id',
+    'supplier_risk': 'supplier_id',
+}
+
+# Numeric construction fields read by compute_job_features()
+PROFIT_NUMERIC_FIELDS = ['contract_value', 'live_profit', 'profit_percentage',
+                         'total_po_value', 'purchase_orders_count']
+
+# SupplierPricePredictor.analyze_supplier_trends() columns
+SUPPLIER_TREND_COLUMNS = ['supplier_id', 'avg_price_increase_pct', 'price_increase_frequency',
+                          'num_price_changes', 'num_increases', 'num_decreases',
+                          'days_since_last_change', 'trend_direction', 'risk_score']
+
+
+class BadRequest(ValueError):
+    """Request the client has to fix (HTTP 400)"""
+
+
+class EndpointMetrics:
+    """Request counters and a rolling window of latencies for one endpoint"""
+
+    def __init__(self, window: int = SCORING_LATENCY_WINDOW):
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, num_rows: int, error: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.rows += num_rows
+            self.errors += int(error)
+            self._latencies.append(seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies_ms = np.array(self._latencies) * 1000
+
+        snapshot = {'requests': self.requests, 'errors': self.errors, 'rows': self.rows}
+        if len(latencies_ms) > 0:
+            p50, p90, p99 = np.percentile(latencies_ms, [50, 90, 99])
+            snapshot.update({
+                'latency_p50_ms': round(float(p50), 2),
+                'latency_p90_ms': round(float(p90), 2),
+                'latency_p99_ms': round(float(p99), 2),
+                'latency_max_ms': round(float(latencies_ms.max()), 2),
+            })
+        return snapshot
+
+
+class ScoringService:
+    """
+    Current models, one micro-batcher per batched endpoint, and metrics
+
+    Args:
+        models: model name -> loaded model, to serve given models (never
+            reloaded) instead of the registry's current ones
+        stats_index: Keep a PriceStatsIndex in memory for price_check
+    """
+
+    def __init__(self, models: Optional[Dict] = None, stats_index: bool = True):
+        self.started_at = datetime.now()
+        self.handles = (self._load_handles() if models is None else
+                        {name: ModelHandle(name, model=model) for name, model in models.items()})
+        self.metrics = {endpoint: EndpointMetrics() for endpoint in ENDPOINT_MODELS}
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self.stats_index: Optional[PriceStatsIndex] = None
+        self._supplier_trends: Optional[pd.DataFrame] = None
+
+        if 'price_anomaly_detector' in self.handles:
+            handle = self.handles['price_anomaly_detector']
+            if stats_index and handle.model.stats_index is None:
+                self.stats_index = self._start_stats_index()
+                handle.on_reload(self._attach_stats_index)
+            self.batchers['price_check'] = MicroBatcher('price_check', self._check_prices)
+            self.batchers['price_anomaly'] = MicroBatcher('price_anomaly', self._score_price_features)
+
+        if 'profit_predictor' in self.handles:
+            self.batchers['profit'] = MicroBatcher('profit', self._predict_profit)
+
+        if 'supplier_predictor' in self.handles:
+            self.handles['supplier_predictor'].on_reload(self._index_supplier_trends)
+
+    @staticmethod
+    def _load_handles() -> Dict[str, ModelHandle]:
+        handles = {}
+        for model_name in sorted(set(ENDPOINT_MODELS.values())):
+            try:
+                handles[model_name] = get_model_handle(model_name)
+                logger.info(f"Loaded {model_name} {handles[model_name].model.model_version}")
+            except FileNotFoundError as e:
+                # Serve the other models; this one's endpoints return 503
+                logger.warning(f"Not serving {model_name}: {e}")
+        return handles
+
+    @staticmethod
+    def _start_stats_index() -> PriceStatsIndex:
+        index = PriceStatsIndex()
+        try:
+            index.start()
+        except Exception as e:
+            # Price checks fall back to database lookups until a refresh succeeds
+            logger.warning(f"Could not load price stats index, will retry in the background: {e}")
+            index.start(load=False)
+        return index
+
+    def _attach_stats_index(self, detector):
+        detector.stats_index = self.stats_index
+
+    def _index_supplier_trends(self, supplier_predictor):
+        # Risk lookups are a reindex; no batching needed
+        trends = supplier_predictor.supplier_trends
+        if not isinstance(trends, pd.DataFrame) or 'supplier_id' not in trends.columns:
+            trends = pd.DataFrame(columns=SUPPLIER_TREND_COLUMNS)
+        self._supplier_trends = trends.set_index('supplier_id')
+
+    def model(self, model_name: str):
+        """Current model for a name (reloaded when a new one is published)"""
+        return self.handles[model_name].get()
+
+    def _check_prices(self, rows_df: pd.DataFrame) -> pd.DataFrame:
+        return self.model('price_anomaly_detector').detect_prices(rows_df)
+
+    def _score_price_features(self, features_df: pd.DataFrame) -> pd.DataFrame:
+        detector = self.model('price_anomaly_detector')
+        results = detector.predict_features(features_df)
+        # Rows prepare_features drops (all-zero features) are not scored
+        results.index = detector.prepare_features(features_df).index
+        return results
+
+    def _predict_profit(self, constructions_df: pd.DataFrame) -> pd.DataFrame:
+        predictor = self.model('profit_predictor')
+        results = predictor.predict(constructions_df)
+        # Jobs with a missing profit_percentage are not scored
+        X, _ = predictor.prepare_features(compute_job_features(constructions_df))
+        results.index = X.index
+        return results
+
+    def _supplier_risk(self, rows_df: pd.DataFrame) -> pd.DataFrame:
+        self.model('supplier_predictor')  # Picks up a newly published model
+        supplier_ids = rows_df['supplier_id'].astype(np.int64)
+        results = self._supplier_trends.reindex(supplier_ids.to_numpy()).reset_index()
+        results['has_history'] = results['risk_score'].notna()
+        return results
+
+    def _numeric_columns(self, endpoint: str) -> List[str]:
+        if endpoint == 'price_check':
+            return ['price']
+        if endpoint == 'price_anomaly':
+            return self.model('price_anomaly_detector').feature_names
+        if endpoint == 'profit':
+            return PROFIT_NUMERIC_FIELDS
+        return []
+
+    def _required_columns(self, endpoint: str) -> List[str]:
+        required = [ENDPOINT_ID_FIELDS[endpoint]]
+        if endpoint != 'profit':
+            required += self._numeric_columns(endpoint)
+        return required
+
+    def _coerce_numeric(self, endpoint: str, rows: List[Dict], rows_df: pd.DataFrame) -> pd.DataFrame:
+        """Rows with numeric fields as numbers; ids must be present integers"""
+        id_field = ENDPOINT_ID_FIELDS[endpoint]
+        for column in [id_field] + self._numeric_columns(endpoint):
+            if column not in rows_df.columns:
+                continue
+            values = pd.to_numeric(rows_df[column], errors='coerce')
+            invalid = values.isna() & rows_df[column].notna()
+            if column == id_field:
+                invalid |= values.isna() | (values % 1 != 0)
+            if invalid.any():
+                row = int(np.flatnonzero(invalid.to_numpy())[0])
+                kind = 'an integer' if column == id_field else 'a number'
+                raise BadRequest(f"'{column}' must be {kind} (row {row}: {rows[row].get(column)!r})")
+            rows_df[column] = values.astype(np.int64) if column == id_field else values
+        return rows_df
+
+    def score(self, endpoint: str, rows: List[Dict]) -> pd.DataFrame:
+        """
+        Score request rows on an endpoint
+
+        Raises:
+            KeyError: Unknown endpoint
+            LookupError: The endpoint's model is not loaded
+            BadRequest: Malformed rows
+        """
+        model_name = ENDPOINT_MODELS[endpoint]
+        if model_name not in self.handles:
+            raise LookupError(f"{model_name} is not loaded")
+
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise BadRequest("'rows' must be a list of objects")
+        if not rows:
+            return pd.DataFrame()
+
+        rows_df = pd.DataFrame(rows)
+        missing = [column for column in self._required_columns(endpoint) if column not in rows_df.columns]
+        if missing:
+            raise BadRequest(f"Missing fields: {', '.join(missing)}")
+        rows_df = self._coerce_numeric(endpoint, rows, rows_df)
+
+        if endpoint == 'supplier_risk':
+            return self._supplier_risk(rows_df)
+        return self.batchers[endpoint].submit(rows_df)
+
+    def health(self) -> Dict:
+        models = {}
+        for model_name in sorted(set(ENDPOINT_MODELS.values())):
+            handle = self.handles.get(model_name)
+            models[model_name] = {
+                'loaded': handle is not None,
+                'model_version': handle.model.model_version if handle else None,
+                'sha256': handle.entry['sha256'] if handle and handle.entry else None,
+                'loaded_at': handle.loaded_at.isoformat() if handle and handle.loaded_at else None,
+            }
+        health = {
+            'status': 'ok' if all(model['loaded'] for model in models.values()) else 'degraded',
+            'started_at': self.started_at.isoformat(),
+            'models': models,
+        }
+        if self.stats_index is not None:
+            health['price_stats_index'] = {
+                'items': len(self.stats_index),
+                'loaded_at': (datetime.fromtimestamp(self.stats_index.loaded_at).isoformat()
+                              if self.stats_index.loaded_at else None),
+            }
+        return health
+
+    def metrics_snapshot(self) -> Dict:
+        snapshot = {}
+        for endpoint, metrics in self.metrics.items():
+            snapshot[endpoint] = metrics.snapshot()
+            if endpoint in self.batchers:
+                snapshot[endpoint].update(self.batchers[endpoint].stats())
+        return {'uptime_seconds': round((datetime.now() - self.started_at).total_seconds(), 1),
+                'endpoints': snapshot}
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.stop()
+        if self.stats_index is not None:
+            self.stats_index.stop()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP/1.1 (keep-alive) in front of a ScoringService"""
+
+    protocol_version = 'HTTP/1.1'
+    service: ScoringService = None  # Set by make_server()
+
+    def _send_json(self, status: int, body: str):
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, dumps({'error': message}))
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, dumps(self.service.health()))
+        elif self.path == '/metrics':
+            self._send_json(200, dumps(self.service.metrics_snapshot()))
+        else:
+            self._send_error(404, f"Unknown path: {self.path}")
+
+    def do_POST(self):
+        start = time.perf_counter()
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        endpoint = self.path[len('/score/'):] if self.path.startswith('/score/') else None
+        if endpoint not in ENDPOINT_MODELS:
+            self._send_error(404, f"Unknown path: {self.path}")
+            return
+
+        num_rows = 0
+        status, response = 200, None
+        try:
+            request = orjson.loads(body)
+            if not isinstance(request, dict) or 'rows' not in request:
+                raise BadRequest("Request body must be an object with 'rows'")
+            num_rows = len(request['rows']) if isinstance(request['rows'], list) else 0
+
+            results = self.service.score(endpoint, request['rows'])
+            model = self.service.handles[ENDPOINT_MODELS[endpoint]].model
+            response = dumps({
+                'model': ENDPOINT_MODELS[endpoint],
+                'model_version': model.model_version,
+                'predictions': results.to_dict('records'),
+            })
+        except (orjson.JSONDecodeError, BadRequest) as e:
+            status, response = 400, dumps({'error': str(e)})
+        except LookupError as e:
+            status, response = 503, dumps({'error': str(e)})
+        except Exception as e:
+            logger.error(f"Error scoring {endpoint}: {e}")
+            status, response = 500, dumps({'error': str(e)})
+
+        self.service.metrics[endpoint].record(time.perf_counter() - start, num_rows, error=status != 200)
+        self._send_json(status, response)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+def make_server(service: ScoringService, host: str = SCORING_SERVER_HOST,
+                port: int = SCORING_SERVER_PORT) -> ThreadingHTTPServer:
+    """HTTP server (one thread per connection) for a scoring service"""
+    handler = type('BoundScoringRequestHandler', (ScoringRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the trained models over HTTP")
+    parser.add_argument('--host', default=SCORING_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SCORING_SERVER_PORT)
+    parser.add_argument('--no-stats-index', action='store_true',
+                        help="Look price statistics up in the database instead of memory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=getattr(logging, config.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    service = ScoringService(stats_index=not args.no_stats_index)
+    server = make_server(service, args.host, args.port)
+    logger.info(f"Scoring server listening on http://{args.host}:{server.server_port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Tests for the JSON encoding of feature and prediction documents, including
+the empty frames an extraction with no rows produces
+"""
+import numpy as np
+import orjson
+import pandas as pd
+
+from data.feature_store import compute_job_features, compute_supplier_features, prediction_rows
+from data.json_encoding import dumps, dumps_records
+
+
+def test_missing_values_become_null():
+    df = pd.DataFrame({
+        'price': [1.5, np.nan, np.inf],
+        'count': pd.array([1, None, 3], dtype='Int64'),
+        'seen_at': pd.to_datetime(['2025-01-01', None, '2025-01-03']),
+        'label': ['a', None, 'c'],
+    })
+
+    records = [orjson.loads(document) for document in dumps_records(df)]
+
+    assert records == [
+        {'price': 1.5, 'count': 1, 'seen_at': '2025-01-01T00:00:00', 'label': 'a'},
+        {'price': None, 'count': None, 'seen_at': None, 'label': None},
+        {'price': None, 'count': 3, 'seen_at': '2025-01-03T00:00:00', 'label': 'c'},
+    ]
+    assert dumps({'scores': [np.float64('nan'), 2.0], 'z': np.float32(np.inf)}) == '{"scores":[null,2.0],"z":null}'
+
+
+def test_empty_frames():
+    # An extraction with no rows comes back without any columns
+    empty = pd.DataFrame()
+
+    assert dumps_records(empty) == []
+    assert dumps_records(pd.DataFrame(columns=['id', 'score'])) == []
+    assert dumps(dumps_records(empty)) == '[]'
+    assert prediction_rows(empty) == []
+    assert len(compute_supplier_features(empty)) == 0
+    assert len(compute_job_features(empty)) == 0
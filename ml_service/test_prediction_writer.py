@@ -0,0 +1,98 @@
+"""
+Tests for the write-behind PredictionWriter, against a fake insert
+"""
+import threading
+import time
+
+import pytest
+
+from data.feature_store import PredictionWriter
+
+
+class FakeFeatureStore:
+    """Records the rows of each insert_prediction_rows call; fails while fail is set"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.fail = False
+        self.inserts = []
+
+    def insert_prediction_rows(self, model_name, model_version, rows):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('database unavailable')
+        self.inserts.append([row[0] for row in rows])
+
+    @property
+    def written(self):
+        return [entity_id for insert in self.inserts for entity_id in insert]
+
+
+def add_ids(writer, entity_ids):
+    for entity_id in entity_ids:
+        writer.add_one(entity_id, 'pricebook_item', {'is_anomaly': False}, 0.5)
+
+
+def test_flushes_at_max_rows():
+    fs = FakeFeatureStore()
+    writer = PredictionWriter(fs, 'price_anomaly_detector', 'v1', max_rows=3, max_seconds=60)
+
+    add_ids(writer, [1, 2])
+    assert fs.inserts == []
+    add_ids(writer, [3, 4])
+    assert fs.inserts == [[1, 2, 3]]
+
+    writer.close()
+    assert fs.inserts == [[1, 2, 3], [4]]
+
+
+def test_flushes_after_max_seconds():
+    fs = FakeFeatureStore()
+    writer = PredictionWriter(fs, 'price_anomaly_detector', 'v1', max_rows=100, max_seconds=0.1)
+    add_ids(writer, [1, 2])
+
+    deadline = time.monotonic() + 2
+    while not fs.inserts and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert fs.inserts == [[1, 2]]
+    writer.close()
+    assert fs.inserts == [[1, 2]]
+
+
+def test_failed_rows_are_retried_up_to_the_cap():
+    fs = FakeFeatureStore()
+    fs.fail = True
+    writer = PredictionWriter(fs, 'price_anomaly_detector', 'v1', max_rows=100, max_seconds=60,
+                              max_retained_rows=5)
+
+    add_ids(writer, [1, 2, 3, 4])
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    assert writer.dropped_rows == 0
+
+    # The oldest unwritten rows are dropped first
+    add_ids(writer, [5, 6, 7, 8])
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    assert writer.dropped_rows == 3
+
+    fs.fail = False
+    writer.close()
+    assert fs.written == [4, 5, 6, 7, 8]
+
+
+def test_close_writes_every_row():
+    fs = FakeFeatureStore(delay=0.005)
+    writer = PredictionWriter(fs, 'price_anomaly_detector', 'v1', max_rows=7, max_seconds=0.02)
+
+    producers = [threading.Thread(target=add_ids, args=(writer, range(i * 100, i * 100 + 50)))
+                 for i in range(8)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    writer.close()
+
+    assert sorted(fs.written) == [i * 100 + j for i in range(8) for j in range(50)]
+    assert writer.dropped_rows == 0
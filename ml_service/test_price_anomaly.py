@@ -0,0 +1,83 @@
+"""
+Tests for bulk price checks: detect_prices against per-row detect_single_price
+
+Statistics come from an in-memory PriceStatsIndex; the database lookups
+for items outside it are replaced by fakes that find no history.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import models.price_anomaly as price_anomaly
+from data.price_stats_index import PriceStatsIndex
+from models.price_anomaly import PriceAnomalyDetector
+
+CHECK_FIELDS = ['is_anomaly', 'z_score', 'confidence', 'mean_price', 'std_price',
+                'num_historical_prices', 'price_deviation', 'price_deviation_pct']
+
+
+class NoHistoryExtractor:
+    """DatabaseExtractor stand-in for items without purchase history"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def get_item_purchase_history(self, pricebook_item_id):
+        return pd.DataFrame(columns=['unit_price'])
+
+    def extract_item_price_summaries(self, item_ids):
+        return pd.DataFrame(columns=['pricebook_item_id', 'price_count', 'mean_price', 'std_price'])
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setattr(price_anomaly, 'read_price_stats', lambda item_ids: None)
+    monkeypatch.setattr(price_anomaly, 'DatabaseExtractor', NoHistoryExtractor)
+
+    stats_index = PriceStatsIndex()
+    stats_index.load_frame(pd.DataFrame({
+        'pricebook_item_id': [1, 2, 3, 4],
+        'price_count': [10, 5, 1, 3],
+        'mean_price': [100.0, 20.0, 7.5, 0.0],
+        'std_price': [10.0, 0.0, np.nan, 0.0],
+    }))
+    return PriceAnomalyDetector(stats_index=stats_index)
+
+
+def test_matches_single_price_checks(detector):
+    items = pd.DataFrame({
+        'item_id': [1, 1, 2, 2, 3, 4, 99, np.nan, 1],
+        'price': [105.0, 140.0, 20.0, 21.0, 9.0, 1.0, 50.0, 12.0, 100.0],
+    }, index=[10, 11, 12, 13, 14, 15, 16, 17, 18])
+
+    results = detector.detect_prices(items)
+
+    assert results.index.equals(items.index)
+    assert results['price'].tolist() == items['price'].tolist()
+    for index, row in items.iterrows():
+        result = results.loc[index]
+        if pd.isna(row['item_id']):
+            assert pd.isna(result['item_id'])
+            expected = {'is_anomaly': False, 'confidence': 0.0, 'message': 'No historical data available'}
+        else:
+            assert result['item_id'] == row['item_id']
+            expected = detector.detect_single_price(int(row['item_id']), row['price'])
+
+        if 'message' in expected:
+            assert result['is_anomaly'] == expected['is_anomaly']
+            assert result['confidence'] == expected['confidence']
+            assert result['message'] == expected['message']
+        else:
+            assert pd.isna(result['message'])
+            for field in CHECK_FIELDS:
+                assert result[field] == pytest.approx(expected[field], nan_ok=True), (index, field)
+
+
+def test_integer_item_ids_stay_integers(detector):
+    results = detector.detect_prices(pd.DataFrame({'item_id': [1, 2], 'price': [100.0, 20.0]}))
+
+    assert results['item_id'].dtype == np.int64
+    assert results['is_anomaly'].tolist() == [False, False]
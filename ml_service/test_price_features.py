@@ -0,0 +1,98 @@
+"""
+Regression test: vectorized compute_price_features against the original loop
+
+Runs both on a small fixed set of line items (missing item ids and prices,
+a single-purchase item, an item without any price) with the clock pinned,
+so the day counts are deterministic too. Features from the running price
+statistics are checked against compute_price_features over the same (full)
+history.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data.feature_store as feature_store
+import benchmarks.bench_price_features as bench_price_features
+from data.feature_store import (
+    compute_price_features, compute_price_features_from_stats, _price_partials, _merge_price_partials
+)
+from benchmarks.bench_price_features import legacy_compute_price_features
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 7, 1, 12, 30)
+
+
+@pytest.fixture
+def line_items(monkeypatch):
+    monkeypatch.setattr(feature_store, 'datetime', FixedDatetime)
+    monkeypatch.setattr(bench_price_features, 'datetime', FixedDatetime)
+
+    return pd.DataFrame({
+        'pricebook_item_id': [3, 1, 1, 2, 1, np.nan, 2, 4, 3, 2, 5],
+        'unit_price': [20.0, 10.0, 12.5, 100.0, np.nan, 7.0, 80.0, 3.25, 20.0, 90.0, np.nan],
+        'quantity': [1.0, 2.0, 4.0, 1.0, 3.0, 1.0, 2.0, 10.0, 5.0, 1.0, 1.0],
+        'created_at': pd.to_datetime([
+            '2025-01-03 08:00', '2025-02-10 09:15', '2025-03-01 17:45', '2024-12-31 23:59',
+            '2025-06-30 13:00', '2025-05-05 10:00', '2025-04-15 06:30', '2025-06-01 12:00',
+            '2025-06-20 18:20', '2025-01-20 11:11', '2025-03-03 03:03',
+        ]),
+    })
+
+
+def test_matches_legacy_loop(line_items):
+    expected = legacy_compute_price_features(line_items)
+    result = compute_price_features(line_items)
+
+    assert result['pricebook_item_id'].tolist() == [1, 2, 3, 4]
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+
+
+def test_chunks_match_legacy_loop(line_items):
+    expected = legacy_compute_price_features(line_items)
+    chunks = [line_items.iloc[:4], line_items.iloc[4:9], line_items.iloc[9:]]
+    result = compute_price_features(iter(chunks))
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+
+
+class StatsFeatureStore:
+    """FeatureStore stand-in holding running price statistics"""
+
+    def __init__(self):
+        self.stats = None
+
+    def update_price_stats(self, line_items_df):
+        # Same pairwise merge of (count, mean, M2) as the SQL upsert
+        partials = _price_partials(line_items_df[line_items_df['pricebook_item_id'].notna()])
+        self.stats = partials if self.stats is None else _merge_price_partials([self.stats, partials])
+
+    def get_price_stats(self, item_ids=None):
+        stats = self.stats
+        price_count = stats['price_count']
+        return pd.DataFrame({
+            'pricebook_item_id': stats.index,
+            'purchase_count': stats['purchase_count'].values,
+            'price_count': price_count.values,
+            'mean_price': stats['price_mean'].where(price_count > 0).values,
+            'std_price': np.sqrt(stats['price_m2'] / (price_count - 1)).where(price_count > 1).values,
+            'min_price': stats['min_price'].values,
+            'max_price': stats['max_price'].values,
+            'total_quantity': stats['total_quantity'].values,
+            'first_purchase_at': stats['first_purchase_at'].values,
+            'last_purchase_at': stats['last_purchase_at'].values,
+        })
+
+
+def test_stats_match_full_history(line_items):
+    fs = StatsFeatureStore()
+    for batch in (line_items.iloc[:3], line_items.iloc[3:7], line_items.iloc[7:]):
+        fs.update_price_stats(batch)
+
+    result = compute_price_features_from_stats(fs)
+    pd.testing.assert_frame_equal(result, compute_price_features(line_items),
+                                  check_exact=False, rtol=1e-12)
@@ -0,0 +1,145 @@
+"""
+Tests for the model registry and model handles
+
+Models are small price anomaly detectors saved to a temporary models
+directory, with the manifest beside them.
+"""
+import os
+
+import numpy as np
+import orjson
+import pandas as pd
+import pytest
+
+import models.price_anomaly as price_anomaly
+from models.price_anomaly import PriceAnomalyDetector
+from models.registry import ModelHandle, ModelRegistry, load_model_file
+
+MODEL_NAME = 'price_anomaly_detector'
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_anomaly, 'MODELS_DIR', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(scope='module')
+def price_features():
+    rng = np.random.default_rng(0)
+    n = 200
+    features = pd.DataFrame({
+        'pricebook_item_id': np.arange(1, n + 1),
+        'mean_price': rng.gamma(2.0, 50.0, n),
+        'purchase_count': rng.integers(1, 50, n),
+        'days_since_last_purchase': rng.integers(0, 365, n),
+    })
+    features['std_price'] = features['mean_price'] * rng.uniform(0, 0.3, n)
+    features['price_range'] = features['std_price'] * 4
+    features['coefficient_variation'] = features['std_price'] / features['mean_price']
+    return features
+
+
+def save_detector(version, features, filename=None):
+    detector = PriceAnomalyDetector(model_version=version)
+    detector.train_features(features)
+    return detector.save(filename or f'{MODEL_NAME}_{version}.pkl')
+
+
+def test_publish_stores_relative_paths(models_dir, price_features):
+    registry = ModelRegistry(str(models_dir / 'registry.json'))
+    path_v1 = save_detector('v1', price_features)
+    path_v2 = save_detector('v2', price_features)
+
+    registry.publish(MODEL_NAME, path_v1, 'v1')
+    entry = registry.publish(MODEL_NAME, path_v2, 'v2', metrics={'model_path': path_v2, 'n': 200})
+
+    # Written through a temporary file that replaces the manifest
+    assert sorted(os.listdir(models_dir)) == sorted([
+        'registry.json', 'registry.json.lock', os.path.basename(path_v1), os.path.basename(path_v2)
+    ])
+
+    manifest = orjson.loads((models_dir / 'registry.json').read_bytes())
+    stored = manifest['models'][MODEL_NAME]
+    assert stored['current']['path'] == os.path.basename(path_v2)
+    assert [e['path'] for e in stored['history']] == [os.path.basename(path_v2), os.path.basename(path_v1)]
+    assert entry['metrics'] == {'n': 200}
+
+    # Read back as absolute paths, also from a fresh registry
+    reader = ModelRegistry(str(models_dir / 'registry.json'))
+    assert reader.current(MODEL_NAME)['path'] == path_v2
+    assert reader.current(MODEL_NAME)['model_version'] == 'v2'
+    assert [e['path'] for e in reader.history(MODEL_NAME)] == [path_v2, path_v1]
+
+
+def test_publish_keeps_absolute_paths_outside_models_dir(models_dir, price_features, tmp_path_factory):
+    path = save_detector('v1', price_features)
+    registry = ModelRegistry(str(tmp_path_factory.mktemp('manifest') / 'registry.json'))
+
+    entry = registry.publish(MODEL_NAME, path, 'v1')
+
+    assert entry['path'] == path
+    assert registry.current_path(MODEL_NAME) == path
+
+
+def test_checksum_mismatch_is_rejected(models_dir, price_features):
+    registry = ModelRegistry(str(models_dir / 'registry.json'))
+    path = save_detector('v1', price_features)
+    entry = registry.publish(MODEL_NAME, path, 'v1')
+    assert load_model_file(MODEL_NAME, path, entry['sha256']).model_version == 'v1'
+
+    with open(path, 'ab') as f:
+        f.write(b'changed')
+
+    with pytest.raises(ValueError, match='Checksum mismatch'):
+        load_model_file(MODEL_NAME, path, entry['sha256'])
+    with pytest.raises(ValueError, match='Checksum mismatch'):
+        ModelHandle(MODEL_NAME, registry)
+
+
+def test_current_path_falls_back_to_newest_file(models_dir, price_features):
+    registry = ModelRegistry(str(models_dir / 'registry.json'))
+    with pytest.raises(FileNotFoundError):
+        registry.current_path(MODEL_NAME)
+
+    old_path = save_detector('v1', price_features)
+    new_path = save_detector('v2', price_features)
+    os.utime(old_path, (2_000_000_000, 2_000_000_000))
+    os.utime(new_path, (1_000_000_000, 1_000_000_000))
+
+    assert registry.current(MODEL_NAME) is None
+    assert registry.current_path(MODEL_NAME) == old_path
+
+    handle = ModelHandle(MODEL_NAME, registry)
+    assert handle.model.model_version == 'v1'
+    assert handle.entry['sha256'] is None
+
+
+def test_handle_reloads_published_model(models_dir, price_features):
+    registry = ModelRegistry(str(models_dir / 'registry.json'))
+    registry.publish(MODEL_NAME, save_detector('v1', price_features), 'v1')
+    handle = ModelHandle(MODEL_NAME, registry, check_seconds=0)
+
+    reloaded = []
+    handle.on_reload(lambda model: reloaded.append(model.model_version))
+    assert reloaded == ['v1']
+
+    registry.publish(MODEL_NAME, save_detector('v2', price_features), 'v2')
+    assert handle.get().model_version == 'v1'  # Never waits for the reload
+    handle.wait_for_reload()
+
+    assert handle.get().model_version == 'v2'
+    assert handle.entry['model_version'] == 'v2'
+    assert reloaded == ['v1', 'v2']
+    handle.wait_for_reload()
+
+    # A file that fails its checksum is not swapped in
+    path_v3 = save_detector('v3', price_features)
+    registry.publish(MODEL_NAME, path_v3, 'v3')
+    with open(path_v3, 'ab') as f:
+        f.write(b'changed')
+    handle.get()
+    handle.wait_for_reload()
+
+    assert handle.get().model_version == 'v2'
+    assert reloaded == ['v1', 'v2']
@@ -0,0 +1,95 @@
+"""
+Tests for chunked batch scoring: key-aligned re-cutting of chunks, and
+chunked scoring matching one predict over the whole frame
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data.feature_store as feature_store
+from data.feature_store import compute_price_features
+from models.price_anomaly import PriceAnomalyDetector
+from training.score_batch import key_aligned_chunks, score_batch
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 7, 1, 12, 30)
+
+
+class ListSink:
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+
+    def write(self, predictions_df):
+        self.frames.append(predictions_df)
+
+    def close(self):
+        self.closed = True
+
+
+def split(df, chunk_size):
+    return [df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size)]
+
+
+@pytest.fixture
+def line_items(monkeypatch):
+    monkeypatch.setattr(feature_store, 'datetime', FixedDatetime)
+
+    rng = np.random.default_rng(0)
+    # Item group sizes from 1 to 40 rows, so groups span several chunks
+    item_ids = np.repeat(np.arange(1, 301), rng.integers(1, 41, 300))
+    n = len(item_ids)
+    base_prices = rng.gamma(2.0, 50.0, 301)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'pricebook_item_id': item_ids,
+        'unit_price': base_prices[item_ids] * rng.normal(1.0, 0.1, n),
+        'quantity': rng.integers(1, 20, n).astype(float),
+        'created_at': pd.Timestamp('2025-06-30') - pd.to_timedelta(rng.integers(0, 365 * 24, n), unit='h'),
+    })
+
+
+@pytest.mark.parametrize('chunk_size', [5, 64, 1000, 100000])
+def test_chunks_never_split_a_key(line_items, chunk_size):
+    # Rows without an item sort last and are dropped
+    df = pd.concat([line_items, pd.DataFrame({'pricebook_item_id': [np.nan, np.nan]})], ignore_index=True)
+
+    chunks = list(key_aligned_chunks(split(df, chunk_size), 'pricebook_item_id'))
+
+    keys_per_chunk = [set(chunk['pricebook_item_id']) for chunk in chunks]
+    assert sum(len(keys) for keys in keys_per_chunk) == line_items['pricebook_item_id'].nunique()
+    assert all(len(chunk) > 0 for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True)[line_items.columns],
+                                  line_items, check_dtype=False)
+
+
+def test_unsorted_chunks_are_rejected():
+    chunks = [pd.DataFrame({'supplier_id': [1, 2]}), pd.DataFrame({'supplier_id': [1, 3]})]
+
+    with pytest.raises(ValueError, match='sorted by supplier_id'):
+        list(key_aligned_chunks(chunks, 'supplier_id'))
+
+
+def test_chunked_scoring_matches_full_frame(line_items):
+    full_features = compute_price_features(line_items)
+    detector = PriceAnomalyDetector()
+    detector.train_features(full_features)
+    expected = detector.predict_features(full_features)
+
+    sink = ListSink()
+    stats = score_batch('price_anomaly_detector', split(line_items, 97), sink, model=detector)
+    result = pd.concat(sink.frames, ignore_index=True)
+
+    assert sink.closed
+    assert stats['num_rows'] == len(line_items)
+    assert stats['num_predictions'] == len(expected)
+    pd.testing.assert_frame_equal(
+        result.sort_values('pricebook_item_id', ignore_index=True),
+        expected.sort_values('pricebook_item_id', ignore_index=True),
+        check_exact=False, rtol=1e-12
+    )
@@ -0,0 +1,147 @@
+"""
+Tests for the micro-batcher and the scoring server
+
+The server runs in-process on a free port with a price anomaly detector
+whose price statistics are held in memory, so no database is needed.
+"""
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.price_stats_index import PriceStatsIndex
+from models.price_anomaly import PriceAnomalyDetector
+from serving.batching import MicroBatcher
+from serving.client import ScoringClient, ScoringServerError
+from serving.server import ScoringService, make_server
+
+
+class RecordingScorer:
+    """score_fn that doubles x and records the size of every call"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, rows_df):
+        self.calls.append(len(rows_df))
+        time.sleep(self.delay)
+        return pd.DataFrame({'y': rows_df['x'] * 2})
+
+
+def submit_concurrently(batcher, requests):
+    results = [None] * len(requests)
+
+    def submit(i):
+        results[i] = batcher.submit(requests[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_batch_flushes_at_max_rows():
+    # Long wait: only the row limit can close a batch early
+    scorer = RecordingScorer()
+    batcher = MicroBatcher('test', scorer, max_batch_rows=4, max_wait_ms=2000)
+    requests = [pd.DataFrame({'x': [i, i + 10]}) for i in range(4)]
+
+    start = time.monotonic()
+    results = submit_concurrently(batcher, requests)
+    batcher.stop()
+
+    assert time.monotonic() - start < 2
+    assert scorer.calls == [4, 4]
+    for request, result in zip(requests, results):
+        assert result['y'].tolist() == (request['x'] * 2).tolist()
+        assert result.index.tolist() == [0, 1]
+
+
+def test_batch_flushes_after_max_wait():
+    scorer = RecordingScorer()
+    batcher = MicroBatcher('test', scorer, max_batch_rows=1000, max_wait_ms=50)
+
+    start = time.monotonic()
+    result = batcher.submit(pd.DataFrame({'x': [1, 2, 3]}))
+    elapsed = time.monotonic() - start
+    batcher.stop()
+
+    assert 0.05 <= elapsed < 1
+    assert scorer.calls == [3]
+    assert result['y'].tolist() == [2, 4, 6]
+    assert batcher.stats()['batches'] == 1
+
+
+def test_timed_out_request_is_not_scored():
+    # The first request holds the batching thread; the second times out in the queue
+    scorer = RecordingScorer(delay=0.5)
+    batcher = MicroBatcher('test', scorer, max_wait_ms=1)
+    first = threading.Thread(target=batcher.submit, args=(pd.DataFrame({'x': [1]}),))
+    first.start()
+    time.sleep(0.1)
+
+    with pytest.raises(TimeoutError):
+        batcher.submit(pd.DataFrame({'x': [2, 3]}), timeout=0.1)
+
+    first.join()
+    batcher.stop()
+    assert scorer.calls == [1]
+
+
+@pytest.fixture
+def server_url():
+    stats_index = PriceStatsIndex()
+    stats_index.load_frame(pd.DataFrame({
+        'pricebook_item_id': np.arange(1, 11),
+        'price_count': 10,
+        'mean_price': 100.0,
+        'std_price': 10.0,
+    }))
+    detector = PriceAnomalyDetector(stats_index=stats_index)
+
+    # No profit or supplier model: their endpoints are unavailable
+    service = ScoringService(models={'price_anomaly_detector': detector})
+    server = make_server(service, '127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_port}'
+
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def test_price_check(server_url):
+    with ScoringClient(server_url) as client:
+        results = client.check_prices([{'item_id': 1, 'price': 100.0}, {'item_id': '2', 'price': '200'}])
+
+    assert [result['item_id'] for result in results] == [1, 2]
+    assert [result['is_anomaly'] for result in results] == [False, True]
+    assert results[1]['z_score'] == pytest.approx(10.0)
+
+
+def test_non_numeric_field_is_bad_request(server_url):
+    with ScoringClient(server_url) as client:
+        with pytest.raises(ScoringServerError) as error:
+            client.check_prices([{'item_id': 1, 'price': 'abc'}])
+
+    assert error.value.status == 400
+    assert "'price' must be a number" in str(error.value)
+
+
+def test_model_not_loaded_is_unavailable(server_url):
+    with ScoringClient(server_url) as client:
+        with pytest.raises(ScoringServerError) as error:
+            client.score('profit', [{'id': 1, 'contract_value': 1000.0}])
+        health = client.health()
+
+    assert error.value.status == 503
+    assert health['status'] == 'degraded'
+    assert health['models']['profit_predictor']['loaded'] is False
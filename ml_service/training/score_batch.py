@@ -0,0 +1,321 @@
+"""
+Chunked Batch Scoring for All Models
+
+Scores a trained model over data streamed in chunks:
+1. Stream source rows from the database (or any DataFrame iterator)
+2. Compute features, scale and score each chunk
+3. Hand each chunk's predictions to a sink (feature store or CSV)
+
+Only one chunk (plus its features and predictions) is in memory at a time,
+so peak memory depends on the chunk size, not on the number of rows.
+Models scored per supplier or item get chunks re-cut so none is split,
+which also keeps the largest supplier or item whole in memory.
+
+Usage:
+    python training/score_batch.py price_anomaly_detector
+    python training/score_batch.py profit_predictor --sink csv --output profit.csv
+    python training/score_batch.py supplier_predictor --chunk-size 20000
+    python training/score_batch.py price_anomaly_detector --workers 8
+"""
+import argparse
+import itertools
+import logging
+import resource
+import sys
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.extractors import DatabaseExtractor
+from data.feature_store import FeatureStore, PredictionWriter, compute_price_features, price_features_from_aggregates
+from models.parallel_scoring import ParallelScorer
+from models.registry import MODEL_CLASSES, ModelRegistry, load_model_file
+from config import LOOKBACK_DAYS, EXTRACTION_CHUNK_SIZE, SCORING_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_model(model_name: str, model_path: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    File and checksum of the model to score with
+
+    The registry is read once, so the path and checksum belong to the same
+    published model even if another one is published meanwhile.
+
+    Returns:
+        (path, sha256); sha256 is None for a given path or an unpublished model
+    """
+    if model_path is not None:
+        return model_path, None
+
+    registry = ModelRegistry()
+    entry = registry.current(model_name)
+    if entry is not None:
+        return entry['path'], entry['sha256']
+    return registry.current_path(model_name), None
+
+
+def load_model(model_name: str, model_path: Optional[str] = None):
+    """Load a trained model (the current published one by default, checksum verified)"""
+    return load_model_file(model_name, *resolve_model(model_name, model_path))
+
+
+def key_aligned_chunks(chunks: Iterable[pd.DataFrame], key: str) -> Iterator[pd.DataFrame]:
+    """
+    Re-cut chunks of rows sorted by key so no key value spans two chunks
+
+    Rows of the last key value in each chunk are held back and prepended
+    to the next chunk. Rows with a missing key are dropped. All rows of one
+    key value are held in memory together, however many chunks they span:
+    memory is bounded by the largest key group, not by the chunk size.
+
+    Raises:
+        ValueError: The rows are not sorted by key
+    """
+    carry = None
+
+    for chunk in chunks:
+        chunk = chunk[chunk[key].notna()]
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if len(chunk) == 0:
+            continue
+        if not chunk[key].is_monotonic_increasing:
+            raise ValueError(f"Chunks must be sorted by {key} to be re-cut by it")
+
+        last_key = chunk[key].iloc[-1]
+        is_last_key = (chunk[key] == last_key).to_numpy()
+        carry = chunk[is_last_key]
+        complete = chunk[~is_last_key]
+
+        if len(complete) > 0:
+            yield complete
+
+    if carry is not None and len(carry) > 0:
+        yield carry
+
+
+def alignment_key(model_name: str, chunk: pd.DataFrame) -> Optional[str]:
+    """
+    Column a model's chunks must not split, if any
+
+    Supplier trends and line-item price features are computed per
+    supplier or item, so a key split across chunks would be scored as two
+    partial groups. Per-item aggregates and constructions are one row each.
+    """
+    if model_name == 'supplier_predictor':
+        return 'supplier_id'
+    if model_name == 'price_anomaly_detector' and 'price_count' not in chunk.columns:
+        return 'pricebook_item_id'
+    return None
+
+
+def aligned_chunks(model_name: str, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Chunks re-cut with key_aligned_chunks where the model needs it (see alignment_key)"""
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+
+    chunks = itertools.chain([first], chunks)
+    key = alignment_key(model_name, first)
+    if key is None:
+        yield from chunks
+    else:
+        yield from key_aligned_chunks(chunks, key)
+
+
+def source_chunks(model_name: str, extractor: DatabaseExtractor,
+                  chunk_size: int = EXTRACTION_CHUNK_SIZE,
+                  days_back: int = LOOKBACK_DAYS) -> Iterator[pd.DataFrame]:
+    """
+    Stream the scoring input for a model from the database
+
+    - price_anomaly_detector: per-item price aggregates (computed in SQL)
+    - profit_predictor: constructions
+    - supplier_predictor: price history, ordered by supplier
+    """
+    if model_name == 'price_anomaly_detector':
+        return extractor.extract_price_feature_aggregates(days_back, chunk_size=chunk_size)
+    if model_name == 'profit_predictor':
+        return extractor.extract_constructions(days_back, chunk_size=chunk_size)
+    if model_name == 'supplier_predictor':
+        return extractor.extract_price_history(days_back, chunk_size=chunk_size, by_supplier=True)
+    raise ValueError(f"Unknown model: {model_name}")
+
+
+def chunk_scorer(model_name: str, model,
+                 scorer: Optional[ParallelScorer] = None) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """
+    Function scoring one chunk of source rows with a loaded model
+
+    Price anomaly chunks may be per-item aggregates or line items; line
+    item and supplier chunks must not split an item or supplier
+    (score_batch re-cuts them, see alignment_key). With a scorer, estimator calls run on its worker processes (the supplier
+    predictor has no estimator and always runs in-process).
+    """
+    if model_name == 'price_anomaly_detector':
+        def score_price_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+            if 'price_count' in chunk.columns:
+                features_df = price_features_from_aggregates(chunk)
+            else:
+                features_df = compute_price_features(chunk)
+            return model.predict_features(features_df, scorer=scorer)
+        return score_price_chunk
+
+    if model_name == 'profit_predictor':
+        return lambda chunk: model.predict(chunk, scorer=scorer)
+    if model_name == 'supplier_predictor':
+        return model.analyze_supplier_trends
+    raise ValueError(f"Unknown model: {model_name}")
+
+
+class PredictionSink:
+    """Write predictions to the feature store through a PredictionWriter"""
+
+    def __init__(self, model_name: str, model_version: str):
+        self.feature_store = FeatureStore()
+        self.writer = PredictionWriter(self.feature_store, model_name, model_version)
+
+    def write(self, predictions_df: pd.DataFrame):
+        self.writer.add(predictions_df)
+
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            self.feature_store.close()
+
+
+class CsvSink:
+    """Append predictions to a CSV file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._header_written = False
+
+    def write(self, predictions_df: pd.DataFrame):
+        predictions_df.to_csv(self.path, mode='a' if self._header_written else 'w',
+                              header=not self._header_written, index=False)
+        self._header_written = True
+
+    def close(self):
+        if not self._header_written:
+            # No predictions: still leave an (empty) output file
+            open(self.path, 'w').close()
+
+
+def score_batch(model_name: str, chunks: Iterable[pd.DataFrame], sink,
+                model=None, scorer: Optional[ParallelScorer] = None) -> Dict:
+    """
+    Score chunks of source rows and write each chunk's predictions to sink
+
+    Args:
+        model_name: One of MODEL_CLASSES
+        chunks: Iterable of source DataFrames (e.g. from source_chunks()).
+            Line item and supplier chunks must be sorted by their key
+            (see alignment_key); they are re-cut so no key spans two chunks.
+        sink: Object with write(predictions_df) and close()
+        model: Loaded model (the current published one by default)
+        scorer: Process pool for the estimator calls (see ParallelScorer)
+
+    Returns:
+        Dictionary with scoring statistics
+    """
+    model = model or load_model(model_name)
+    score_chunk = chunk_scorer(model_name, model, scorer)
+
+    start = time.perf_counter()
+    num_chunks = 0
+    num_rows = 0
+    num_predictions = 0
+
+    try:
+        for chunk in aligned_chunks(model_name, chunks):
+            if len(chunk) == 0:
+                continue
+            predictions_df = score_chunk(chunk)
+            if len(predictions_df) > 0:
+                sink.write(predictions_df)
+
+            num_chunks += 1
+            num_rows += len(chunk)
+            num_predictions += len(predictions_df)
+            logger.info(f"Scored chunk {num_chunks}: {len(chunk)} rows -> "
+                        f"{len(predictions_df)} predictions ({num_predictions} total)")
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'model_name': model_name,
+        'model_version': model.model_version,
+        'scored_at': datetime.now().isoformat(),
+        'num_chunks': num_chunks,
+        'num_rows': num_rows,
+        'num_predictions': num_predictions,
+        'elapsed_seconds': round(elapsed, 2),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_memory_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+    logger.info(f"Scored {num_rows} rows into {num_predictions} {model_name} predictions "
+                f"in {elapsed:.1f}s")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a trained model over streamed data in chunks")
+    parser.add_argument('model', choices=sorted(MODEL_CLASSES))
+    parser.add_argument('--model-path', help="Model file (defaults to the current published model)")
+    parser.add_argument('--sink', choices=['feature_store', 'csv'], default='feature_store')
+    parser.add_argument('--output', help="CSV path for --sink csv")
+    parser.add_argument('--chunk-size', type=int, default=EXTRACTION_CHUNK_SIZE)
+    parser.add_argument('--days-back', type=int, default=LOOKBACK_DAYS)
+    parser.add_argument('--workers', type=int, default=SCORING_WORKERS,
+                        help="Scoring processes (1 = score in-process)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    model = load_model(args.model, args.model_path)
+
+    # Supplier trends have no estimator to parallelize. Start the workers
+    # before any other threads, since they are forked from this process.
+    scorer = None
+    if args.workers > 1 and args.model != 'supplier_predictor':
+        scorer = ParallelScorer(model.model, workers=args.workers)
+
+    if args.sink == 'csv':
+        sink = CsvSink(args.output or f"{args.model}_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    else:
+        sink = PredictionSink(args.model, model.model_version)
+
+    try:
+        with DatabaseExtractor() as extractor:
+            chunks = source_chunks(args.model, extractor, args.chunk_size, args.days_back)
+            stats = score_batch(args.model, chunks, sink, model=model, scorer=scorer)
+    finally:
+        if scorer is not None:
+            scorer.close()
+
+    print("\n" + "=" * 60)
+    print("BATCH SCORING SUMMARY")
+    print("=" * 60)
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+    return stats
+
+
+if __name__ == '__main__':
+    main()
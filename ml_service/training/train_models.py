@@ -6,7 +6,7 @@ This script orchestrates the training of all models:
 2. Train price anomaly detector
 3. Train supplier price predictor
 4. Train job profitability predictor
-5. Save all models to disk
+5. Save all models to disk and publish them to the model registry
 6. Log metrics
 
 Run this weekly via cron/scheduler to keep models up-to-date
@@ -14,18 +14,25 @@ Run this weekly via cron/scheduler to keep models up-to-date
 import logging
 import sys
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import List, Optional
 import json
 
+import pandas as pd
+
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from data.extractors import extract_all_data, DatabaseExtractor
-from data.feature_store import FeatureStore, compute_price_features, compute_supplier_features, compute_job_features
+from data.feature_store import (
+    FeatureStore, ENTITY_ID_COLUMNS, compute_price_features, compute_supplier_features,
+    compute_job_features, changed_entity_ids, refresh_price_stats
+)
 from models.price_anomaly import PriceAnomalyDetector, train_and_save_model as train_price_anomaly
 from models.supplier_predictor import SupplierPricePredictor
 from models.profit_predictor import ProfitPredictor
-from config import MODELS_DIR, MIN_SAMPLES_FOR_TRAINING
+from models.registry import ModelRegistry
+from config import MODELS_DIR, MIN_SAMPLES_FOR_TRAINING, INCREMENTAL_FEATURES, FEATURE_FULL_REFRESH_DAYS
 
 # Configure logging
 logging.basicConfig(
@@ -41,60 +48,119 @@ logger = logging.getLogger(__name__)
 
 
 def setup_feature_store():
-    """Initialize feature store tables"""
+    """Initialize feature store tables, prune expired predictions and update price stats"""
     logger.info("Setting up feature store")
     with FeatureStore() as fs:
         fs.create_tables()
+        fs.prune_predictions()
+        refresh_price_stats(fs)
     logger.info("Feature store ready")
 
 
-def extract_and_store_features(data: dict):
+# (feature_type, entity_type, data key, entity id column in the data, compute function)
+FEATURE_SOURCES = [
+    ('price_features', 'pricebook_item', 'po_line_items', 'pricebook_item_id', compute_price_features),
+    ('supplier_features', 'supplier', 'suppliers', 'id', compute_supplier_features),
+    ('job_features', 'construction', 'constructions', 'id', compute_job_features),
+]
+
+
+def find_changed_entities(fs: FeatureStore, extractor: DatabaseExtractor,
+                          feature_type: str, entity_type: str) -> Optional[List[int]]:
+    """
+    Entities whose stored features are out of date
+
+    Returns None when everything should be recomputed: nothing is stored
+    yet, or the oldest stored features are over FEATURE_FULL_REFRESH_DAYS
+    old (which also picks up deletions that change detection cannot see).
+    """
+    computed_df = fs.get_computed_at(feature_type, entity_type)
+    if len(computed_df) == 0:
+        logger.info(f"No stored {feature_type}; computing all")
+        return None
+
+    # computed_at and the Rails updated_at columns are both database UTC times
+    since = pd.to_datetime(computed_df['computed_at']).min()
+    if extractor.database_now() - since >= timedelta(days=FEATURE_FULL_REFRESH_DAYS):
+        logger.info(f"Stored {feature_type} are older than {FEATURE_FULL_REFRESH_DAYS} days; computing all")
+        return None
+
+    changes_df = extractor.extract_changed_entities(entity_type, since.to_pydatetime())
+    return changed_entity_ids(changes_df, computed_df)
+
+
+def extract_and_store_features(data: dict, incremental: bool = INCREMENTAL_FEATURES,
+                               extracted_at: Optional[datetime] = None):
     """
     Extract features and store in feature store
 
+    With incremental, only entities changed since their features were last
+    computed (new or updated line items, purchase orders, suppliers and
+    constructions) are recomputed and upserted; the others are not written.
+    Their day-count features (days since first/last purchase) stay as of
+    computed_at until everything is recomputed, every
+    FEATURE_FULL_REFRESH_DAYS. Entities that are no longer in the data
+    (e.g. items whose line items have all left the lookback window) have
+    their stored features removed.
+
     Args:
         data: Dictionary of DataFrames from extract_all_data()
+        incremental: Recompute changed entities only
+        extracted_at: Database UTC time taken before data was extracted,
+            stored as computed_at (defaults to the time of storing)
     """
     logger.info("Computing and storing features")
 
-    with FeatureStore() as fs:
-        # Price features
-        price_features = compute_price_features(data['po_line_items'])
-        logger.info(f"Computed price features for {len(price_features)} items")
-
-        for _, row in price_features.iterrows():
-            fs.store_features(
-                feature_type='price_features',
-                entity_id=int(row['pricebook_item_id']),
-                entity_type='pricebook_item',
-                features=row.to_dict()
-            )
+    with FeatureStore() as fs, DatabaseExtractor() as extractor:
+        for feature_type, entity_type, data_key, id_column, compute_features in FEATURE_SOURCES:
+            source_df = data[data_key]
+
+            changed_ids = None
+            if incremental:
+                changed_ids = find_changed_entities(fs, extractor, feature_type, entity_type)
+                if changed_ids is not None:
+                    logger.info(f"{len(changed_ids)} {entity_type} entities changed since "
+                                f"their {feature_type} were computed")
+                    source_df = source_df[source_df[id_column].isin(changed_ids)]
+
+            features = compute_features(source_df)
+            logger.info(f"Computed {feature_type} for {len(features)} {entity_type} entities")
+            fs.store_features_bulk(feature_type, entity_type, features, computed_at=extracted_at)
+
+            # Changed (or, on a full run, stored) entities that produced no features
+            candidate_ids = (changed_ids if changed_ids is not None
+                             else fs.get_computed_at(feature_type, entity_type)['entity_id'])
+            computed_ids = (features[ENTITY_ID_COLUMNS[entity_type]] if len(features) > 0
+                            else pd.Series([], dtype='int64'))
+            gone_ids = pd.Index(candidate_ids).difference(pd.Index(computed_ids))
+            fs.delete_features(feature_type, entity_type, gone_ids.tolist())
 
-        # Supplier features
-        supplier_features = compute_supplier_features(data['suppliers'])
-        logger.info(f"Computed supplier features for {len(supplier_features)} suppliers")
+    logger.info("Features stored in feature store")
 
-        for _, row in supplier_features.iterrows():
-            fs.store_features(
-                feature_type='supplier_features',
-                entity_id=int(row['supplier_id']),
-                entity_type='supplier',
-                features=row.to_dict()
-            )
 
-        # Job features
-        job_features = compute_job_features(data['constructions'])
-        logger.info(f"Computed job features for {len(job_features)} jobs")
+def store_model_predictions(model_name: str, model_version: str, predict):
+    """
+    Score with a freshly trained model and persist the predictions in bulk
 
-        for _, row in job_features.iterrows():
-            fs.store_features(
-                feature_type='job_features',
-                entity_id=int(row['construction_id']),
-                entity_type='construction',
-                features=row.to_dict()
-            )
+    Failures are logged but do not fail the training run.
+
+    Args:
+        model_name: Name stored with the predictions
+        model_version: Model version
+        predict: Callable returning the predictions DataFrame
+    """
+    try:
+        predictions_df = predict()
+        with FeatureStore() as fs:
+            fs.store_predictions(model_name, model_version, predictions_df)
+    except Exception as e:
+        logger.warning(f"Failed to store {model_name} predictions: {e}")
 
-    logger.info("Features stored in feature store")
+
+def publish_model(model_name: str, model, model_path: str, metrics: dict):
+    """Record a saved model in the registry, making it the current one"""
+    ModelRegistry().publish(model_name, model_path, model.model_version, metrics=metrics,
+                            feature_names=getattr(model, 'feature_names', None))
 
 
 def train_all_models(data: dict) -> dict:
@@ -119,6 +185,12 @@ def train_all_models(data: dict) -> dict:
             detector, metrics = train_price_anomaly()
             all_metrics['price_anomaly'] = metrics
             logger.info(f"Price anomaly model saved to {metrics['model_path']}")
+            publish_model('price_anomaly_detector', detector, metrics['model_path'], metrics)
+
+            store_model_predictions(
+                'price_anomaly_detector', detector.model_version,
+                lambda: detector.predict_features(compute_price_features(data['po_line_items']))
+            )
         else:
             logger.warning(f"Skipping price anomaly training: insufficient data ({len(data['po_line_items'])} samples)")
             all_metrics['price_anomaly'] = {'status': 'skipped', 'reason': 'insufficient_data'}
@@ -134,9 +206,12 @@ def train_all_models(data: dict) -> dict:
     try:
         predictor = SupplierPricePredictor()
         metrics = predictor.train()
-        predictor.save()
+        model_path = predictor.save()
         all_metrics['supplier_predictor'] = metrics
         logger.info("Supplier predictor trained and saved")
+        # No price history: keep serving the current model
+        if metrics:
+            publish_model('supplier_predictor', predictor, model_path, metrics)
     except Exception as e:
         logger.error(f"Failed to train supplier predictor: {e}")
         all_metrics['supplier_predictor'] = {'status': 'failed', 'error': str(e)}
@@ -150,9 +225,15 @@ def train_all_models(data: dict) -> dict:
         if len(data['constructions']) >= MIN_SAMPLES_FOR_TRAINING:
             profit_predictor = ProfitPredictor()
             metrics = profit_predictor.train(data['constructions'])
-            profit_predictor.save()
+            model_path = profit_predictor.save()
             all_metrics['profit_predictor'] = metrics
             logger.info("Profit predictor trained and saved")
+            publish_model('profit_predictor', profit_predictor, model_path, metrics)
+
+            store_model_predictions(
+                'profit_predictor', profit_predictor.model_version,
+                lambda: profit_predictor.predict(data['constructions'])
+            )
         else:
             logger.warning(f"Skipping profit predictor training: insufficient data ({len(data['constructions'])} samples)")
             all_metrics['profit_predictor'] = {'status': 'skipped', 'reason': 'insufficient_data'}
@@ -199,6 +280,9 @@ def main():
 
         # Step 2: Extract data
         logger.info("Extracting data from database")
+        with DatabaseExtractor() as extractor:
+            # Changes after this point are picked up by the next incremental run
+            extracted_at = extractor.database_now()
         data = extract_all_data()
 
         logger.info("\nData extraction summary:")
@@ -206,7 +290,7 @@ def main():
             logger.info(f"  {name}: {len(df)} records")
 
         # Step 3: Compute and store features
-        extract_and_store_features(data)
+        extract_and_store_features(data, extracted_at=extracted_at)
 
         # Step 4: Train all models
         metrics = train_all_models(data)